@@ -1,440 +1,152 @@
 // actions/humanitarian-orgs/import-prepaid-transactions.ts
 "use server";
 
-import * as XLSX from 'xlsx';
+import { spawn } from 'child_process';
+import readline from 'readline';
+import os from 'os';
+import path from 'path';
+import fs from 'fs/promises';
 import { db } from '@/lib/db';
 import { auth } from '@/auth';
 import { revalidateTag } from "next/cache";
-interface PrepaidRow {
-  serviceName: string;
-  price: number;
-  dailyTransactions: {
-    date: Date;
-    count: number;
-    amount: number;
-  }[];
-  totalCount: number;
-  totalAmount: number;
-}
+import { pusherServer } from '@/lib/pusher';
+
+// Progress events of the processor (see scripts/ingestion/progress.py)
+type ProgressEvent = { event: string; file?: string; [key: string]: unknown };
 
 /**
- * Parse humanitarian prepaid Excel file (pivot table format)
- * 
- * Format:
- * - Sheet 4 contains prepaid data
- * - Header row has dates in columns (01.12.2024, 02.12.2024, etc.)
- * - Each service has 2 rows: "Broj" (count) and "Iznos" (amount)
- * - Service name in first column, price in second column
+ * Import a humanitarian prepaid report (pivot table format, sheet 4)
+ *
+ * The file is handed to the Python ingestion pipeline
+ * (scripts/humanitarian_prepaid_processor.py), which parses it with the same
+ * sheet parser as the VAS and parking reports and bulk-upserts the
+ * transactions. The upload goes to a private temporary directory, the
+ * counts come from the processor's final file_done event and the summary
+ * is read back from the rows the import wrote. A file whose content was
+ * imported before is reported as alreadyImported, summarized from the rows
+ * of that earlier import.
  */
 export async function importHumanitarianPrepaidTransactions(
   file: File,
   humanitarianOrgId: string,
   month: Date
 ) {
+  let tempDir: string | null = null;
   try {
     const session = await auth();
     if (!session?.user) {
       return { error: 'Unauthorized' };
     }
 
-    // Read Excel file
-    const arrayBuffer = await file.arrayBuffer();
-    const workbook = XLSX.read(arrayBuffer, { type: 'array' });
-
-    // Get 4th sheet (index 3) - prepaid data
-    const sheetName = workbook.SheetNames[3];
-    if (!sheetName) {
-      return { error: 'Sheet 4 not found in Excel file' };
-    }
-
-    const worksheet = workbook.Sheets[sheetName];
-    const rawData = XLSX.utils.sheet_to_json(worksheet, { header: 1 }) as any[][];
-
-    // Parse the data
-    const { services, dates } = parseHumanitarianPrepaidData(rawData);
-
-    // Pre-create all missing services
-    console.log('Ensuring all services exist...');
-    const ensureResults = await ensureServicesExist(services, humanitarianOrgId, session.user.id!);
-    console.log(`Services status: ${ensureResults.created} created, ${ensureResults.linked} linked, ${ensureResults.existing} existing`);
-
-    // Get service mapping
-    const serviceMap = await getHumanitarianServiceMapping(humanitarianOrgId);
-
-    // Import transactions (no ReportFile needed)
-    const transactions = [];
-    const errors = [];
+    const startedAt = new Date();
+    const fileName = `${startedAt.toISOString().replace(/[:.]/g, '-')}_${path.basename(file.name)}`;
+    tempDir = await fs.mkdtemp(path.join(os.tmpdir(), 'humanitarian-import-'));
+    const filePath = path.join(tempDir, fileName);
+    await fs.writeFile(filePath, Buffer.from(await file.arrayBuffer()));
+
+    const scriptPath = path.join(process.cwd(), 'scripts', 'humanitarian_prepaid_processor.py');
+    const { exitCode, errorOutput, fileDone } = await new Promise<{
+      exitCode: number | null;
+      errorOutput: string;
+      fileDone: ProgressEvent | null;
+    }>((resolve) => {
+      const pythonProcess = spawn('python', [
+        scriptPath,
+        '--progress',
+        '--entity', humanitarianOrgId,
+        session.user.id!,
+        filePath,
+      ], {
+        env: {
+          ...process.env,
+          SUPABASE_PASSWORD: process.env.SUPABASE_PASSWORD || '',
+        },
+      });
 
-    for (const service of services) {
-      // Match service
-      const serviceCode = extractServiceCode(service.serviceName);
-      let serviceId = serviceMap.get(service.serviceName);
-      
-      if (!serviceId && serviceCode) {
-        serviceId = serviceMap.get(serviceCode);
-      }
+      // stdout carries JSON-lines progress events, stderr the log
+      let errorOutput = '';
+      let fileDone: ProgressEvent | null = null;
+      readline.createInterface({ input: pythonProcess.stdout }).on('line', (line) => {
+        let event: ProgressEvent;
+        try {
+          event = JSON.parse(line);
+        } catch {
+          return;
+        }
+        if (event.event === 'file_done') fileDone = event;
+        pusherServer
+          .trigger(`user-${session.user.id}`, 'import-progress', event)
+          .catch((error: unknown) => console.warn('Could not forward import progress:', error));
+      });
+      readline.createInterface({ input: pythonProcess.stderr }).on('line', (line) => {
+        // Keep error records and anything that is not a log record (tracebacks), but not xlrd's warnings
+        const logRecord = /^\d{4}-\d{2}-\d{2} /.test(line) || line.startsWith('WARNING *** ');
+        if (line.includes(' - ERROR - ') || (!logRecord && line.trim())) {
+          errorOutput += line + '\n';
+        }
+      });
+      pythonProcess.on('close', (code) => resolve({ exitCode: code, errorOutput, fileDone }));
+      pythonProcess.on('error', (err) => resolve({ exitCode: null, errorOutput: err.message, fileDone: null }));
+    });
 
-      if (!serviceId) {
-        errors.push({
-          serviceName: service.serviceName,
-          price: service.price,
-          error: 'Service not found after auto-creation attempt',
-          suggestion: 'Check ensureServicesExist function logs',
-        });
-        continue;
-      }
+    if (exitCode !== 0 || !fileDone || fileDone.status === 'failed') {
+      console.error('Humanitarian prepaid import failed:', errorOutput);
+      const error = (fileDone?.error as string | undefined) || errorOutput.trim().split('\n').pop();
+      return { error: error || 'Failed to import transactions' };
+    }
+    if (fileDone.status === 'skipped') {
+      return { error: 'This file is already being imported' };
+    }
 
-      // Create transaction for each day with non-zero count
-      for (const day of service.dailyTransactions) {
-        if (day.count === 0) continue;
+    const alreadyImported = fileDone.status === 'already_imported';
+    const importedFileName = alreadyImported ? String(fileDone.imported_as) : fileName;
+    const [rows, servicesCreated, servicesLinked] = await Promise.all([
+      db.humanitarianTransaction.findMany({
+        where: { humanitarianOrgId, importedFileName },
+        orderBy: [{ date: 'asc' }, { serviceName: 'asc' }],
+      }),
+      db.service.count({ where: { type: 'HUMANITARIAN', createdAt: { gte: startedAt } } }),
+      db.serviceContract.count({ where: { contract: { humanitarianOrgId }, createdAt: { gte: startedAt } } }),
+    ]);
 
-        try {
-          const transaction = await db.humanitarianTransaction.create({
-            data: {
-              humanitarianOrgId,
-              serviceId,
-              date: day.date,
-              serviceName: service.serviceName,
-              serviceCode,
-              price: service.price,
-              quantity: day.count,
-              amount: day.amount,
-              billingType: 'PREPAID',
-              description: `${service.serviceName} @ ${service.price} RSD`,
-              // Import metadata
-              importedFileName: file.name,
-              importedById: session.user.id,
-            }
-          });
+    const imported = Number(fileDone.inserted ?? 0) + Number(fileDone.updated ?? 0);
+    const failed = Number(fileDone.errors ?? 0);
+    const totalServices = new Set(rows.map((row) => row.serviceName)).size;
+    const totalDays = new Set(rows.map((row) => row.date.getTime())).size;
 
-          transactions.push(transaction);
-        } catch (error: any) {
-          if (error.code === 'P2002') {
-            console.log(`Skipping duplicate: ${service.serviceName} @ ${service.price} on ${day.date.toISOString()}`);
-          } else {
-            errors.push({
-              serviceName: service.serviceName,
-              price: service.price,
-              date: day.date,
-              error: error.message
-            });
-          }
-        }
-      }
-    }
-    if (transactions.length > 0) {
+    if (imported > 0) {
       revalidateTag(`humanitarian-org-${humanitarianOrgId}`, "server");
     }
     return {
       success: true,
-      imported: transactions.length,
-      failed: errors.length,
-      transactions,
-      errors,
+      alreadyImported,
+      imported,
+      failed,
+      transactions: alreadyImported ? [] : rows,
+      errors: errorOutput ? [{ serviceName: fileName, error: errorOutput.trim() }] : [],
       summary: {
-        totalServices: services.length,
-        totalDays: dates.length,
+        totalServices,
+        totalDays,
         month: month.toISOString(),
         dateRange: {
-          start: dates[0],
-          end: dates[dates.length - 1],
+          start: rows.length ? rows[0].date : null,
+          end: rows.length ? rows[rows.length - 1].date : null,
         },
         fileName: file.name,
-        servicesCreated: ensureResults.created,
-        servicesLinked: ensureResults.linked,
-        servicesExisting: ensureResults.existing,
+        servicesCreated,
+        servicesLinked,
+        servicesExisting: Math.max(totalServices - servicesCreated, 0),
       }
     };
 
   } catch (error: any) {
     console.error('Error importing humanitarian prepaid transactions:', error);
     return { error: error.message || 'Failed to import transactions' };
-  }
-}
-
-/**
- * Parse pivot table format prepaid data
- * Stops when encountering postpaid section
- */
-function parseHumanitarianPrepaidData(rawData: any[][]) {
-  // First row is header with dates
-  const headerRow = rawData[0];
-  
-  // Extract dates from header (skip first 3 columns: service name, price, "Broj/Iznos")
-  const dates: Date[] = [];
-  for (let i = 3; i < headerRow.length - 1; i++) { // -1 to skip TOTAL column
-    const dateStr = headerRow[i];
-    if (dateStr && typeof dateStr === 'string') {
-      const date = parseDateFromHeader(dateStr);
-      if (date) {
-        dates.push(date);
-      }
-    }
-  }
-
-  // Parse service rows
-  const services: PrepaidRow[] = [];
-  
-  for (let i = 1; i < rawData.length; i++) {
-    const row = rawData[i];
-    
-    // STOP if we encounter postpaid section
-    if (row[0] && String(row[0]).includes('postpaid')) {
-      console.log('Reached postpaid section, stopping prepaid parsing');
-      break;
-    }
-    
-    // Skip empty rows
-    if (!row[0] || String(row[0]).trim() === '') {
-      continue;
-    }
-    
-    // Check if this is a service name row (has service name and price)
-    if (row[0] && row[1] && typeof row[1] === 'number') {
-      const serviceName = String(row[0]).trim();
-      const price = parseFloat(String(row[1]));
-      
-      // Next row should be "Broj" (count)
-      const brojRow = row;
-      const iznosRow = rawData[i + 1]; // Amount row
-      
-      if (!iznosRow) continue;
-
-      // Extract daily transactions
-      const dailyTransactions = [];
-      
-      for (let dayIndex = 0; dayIndex < dates.length; dayIndex++) {
-        const columnIndex = dayIndex + 3; // +3 to skip first 3 columns
-        
-        const countValue = brojRow[columnIndex];
-        const amountValue = iznosRow[columnIndex];
-        
-        // Parse count (handle both number and string)
-        const count = countValue ? parseFloat(String(countValue).replace(',', '')) : 0;
-        
-        // Parse amount (handle both number and string with commas)
-        const amount = amountValue ? parseFloat(String(amountValue).replace(',', '')) : 0;
-        
-        dailyTransactions.push({
-          date: dates[dayIndex],
-          count,
-          amount,
-        });
-      }
-
-      // Get totals from TOTAL column (last column)
-      const totalColumnIndex = row.length - 1;
-      const totalCount = brojRow[totalColumnIndex] ? 
-        parseFloat(String(brojRow[totalColumnIndex]).replace(',', '')) : 0;
-      const totalAmount = iznosRow[totalColumnIndex] ? 
-        parseFloat(String(iznosRow[totalColumnIndex]).replace(',', '')) : 0;
-
-      services.push({
-        serviceName,
-        price,
-        dailyTransactions,
-        totalCount,
-        totalAmount,
-      });
-
-      // Skip the "Iznos" row since we already processed it
-      i++;
+  } finally {
+    if (tempDir) {
+      await fs.rm(tempDir, { recursive: true, force: true }).catch(() => {});
     }
   }
-
-  console.log(`Parsed ${services.length} prepaid services`);
-  return { services, dates };
-}
-
-/**
- * Parse date from header format "01.12.\n2024."
- */
-function parseDateFromHeader(dateStr: string): Date | null {
-  try {
-    // Remove quotes and newlines
-    const cleaned = dateStr.replace(/["\n]/g, '').trim();
-    
-    // Format: "01.12.2024."
-    const match = cleaned.match(/(\d{2})\.(\d{2})\.(\d{4})/);
-    
-    if (match) {
-      const day = parseInt(match[1]);
-      const month = parseInt(match[2]) - 1; // 0-indexed
-      const year = parseInt(match[3]);
-      
-      return new Date(year, month, day);
-    }
-    
-    return null;
-  } catch (error) {
-    console.error('Error parsing date:', dateStr, error);
-    return null;
-  }
-}
-
-/**
- * Extract service code from service name
- * e.g., "360VRTube" might have code in another column or embedded
- */
-function extractServiceCode(serviceName: string): string | null {
-  // If service name starts with digits, extract them
-  const match = serviceName.match(/^(\d+)/);
-  return match ? match[1] : null;
-}
-
-/**
- * Pre-create all missing services before import (bulk operation)
- * This is more efficient than creating them one by one during import
- */
-async function ensureServicesExist(
-  services: PrepaidRow[],
-  humanitarianOrgId: string,
-  userId: string
-) {
-  const results = {
-    created: 0,
-    linked: 0,
-    existing: 0,
-    errors: [] as any[],
-  };
-
-  // Find active contract for this org
-  const activeContract = await db.contract.findFirst({
-    where: {
-      humanitarianOrgId,
-      status: {
-        in: ['ACTIVE', 'RENEWAL_IN_PROGRESS']
-      },
-      type: 'HUMANITARIAN',
-    },
-    include: {
-      services: {
-        include: {
-          service: true
-        }
-      }
-    },
-    orderBy: {
-      createdAt: 'desc'
-    }
-  });
-
-  if (!activeContract) {
-    console.warn(`No active contract found for org ${humanitarianOrgId}`);
-    return results;
-  }
-
-  // Get existing services in contract
-  const existingServiceNames = new Set(
-    activeContract.services.map(sc => sc.service.name)
-  );
-
-  // Get unique service names from import data
-  const uniqueServices = Array.from(
-    new Map(services.map(s => [s.serviceName, s])).values()
-  );
-
-  for (const service of uniqueServices) {
-    // Skip if already in contract
-    if (existingServiceNames.has(service.serviceName)) {
-      results.existing++;
-      continue;
-    }
-
-    try {
-      // Check if service exists in Service table
-      let existingService = await db.service.findFirst({
-        where: {
-          name: service.serviceName,
-          type: 'HUMANITARIAN',
-        }
-      });
-
-      // Create service if doesn't exist
-      if (!existingService) {
-        existingService = await db.service.create({
-          data: {
-            name: service.serviceName,
-            type: 'HUMANITARIAN',
-            description: `Auto-created from humanitarian report - ${service.price} RSD`,
-            isActive: true,
-            billingType: 'PREPAID',
-            createdById: userId,
-          }
-        });
-        
-        results.created++;
-        console.log(`Created service: ${service.serviceName}`);
-      }
-
-      // Link to contract
-      const existingLink = await db.serviceContract.findFirst({
-        where: {
-          contractId: activeContract.id,
-          serviceId: existingService.id,
-        }
-      });
-
-      if (!existingLink) {
-        await db.serviceContract.create({
-          data: {
-            contractId: activeContract.id,
-            serviceId: existingService.id,
-            specificTerms: `Auto-linked from report import. Base price: ${service.price} RSD`,
-          }
-        });
-
-        results.linked++;
-        console.log(`Linked service ${service.serviceName} to contract`);
-      }
-
-    } catch (error: any) {
-      results.errors.push({
-        serviceName: service.serviceName,
-        error: error.message,
-      });
-    }
-  }
-
-  return results;
-}
-
-/**
- * Get service mapping for humanitarian organization
- */
-async function getHumanitarianServiceMapping(humanitarianOrgId: string) {
-  const contracts = await db.contract.findMany({
-    where: {
-      humanitarianOrgId,
-      status: {
-        in: ['ACTIVE', 'RENEWAL_IN_PROGRESS']
-      }
-    },
-    include: {
-      services: {
-        include: {
-          service: true
-        }
-      }
-    }
-  });
-
-  const serviceMap = new Map<string, string>();
-
-  contracts.forEach(contract => {
-    contract.services.forEach(sc => {
-      // Map by service name
-      serviceMap.set(sc.service.name, sc.service.id);
-      
-      // Map by service code if exists
-      // Assuming Service model has a 'code' field - adjust if needed
-      // if (sc.service.code) {
-      //   serviceMap.set(sc.service.code, sc.service.id);
-      // }
-    });
-  });
-
-  return serviceMap;
 }
 
 /**
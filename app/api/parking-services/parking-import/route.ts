@@ -1,10 +1,21 @@
 // app/api/parking-services/parking-import/route.ts
 import { NextResponse } from "next/server";
 import { spawn } from "child_process";
+import readline from "readline";
 import path from "path";
 import fs from "fs/promises";
 import { auth } from "@/auth";
 import { db } from "@/lib/db";
+import { pusherServer } from "@/lib/pusher";
+
+// The processor runs with --progress: stdout carries one JSON event per line
+// (start, file, sheet, parsed, rows, file_done, summary; see
+// scripts/ingestion/progress.py) and the log goes to stderr. Events are
+// forwarded to the user's channel as they arrive; of the log only a bounded
+// tail is kept for the response.
+const LOG_TAIL_BYTES = 64 * 1024;
+
+type ProgressEvent = { event: string; file?: string; [key: string]: unknown };
 
 
 // app/api/parking-services/parking-import/route.ts
@@ -78,16 +89,15 @@ export async function POST(req: Request) {
       });
     }
 
-    // ────────────────────────────────────────────────
-    // Key change: Wait for python process using a Promise
-    // ────────────────────────────────────────────────
-    const { success, output, errorOutput, exitCode } = await new Promise<{
+    const { success, output, errorOutput, exitCode, summary, files } = await new Promise<{
       success: boolean;
       output: string;
       errorOutput: string;
       exitCode: number | null;
+      summary: ProgressEvent | null;
+      files: ProgressEvent[];
     }>((resolve) => {
-      const pythonProcess = spawn("python", [scriptPath, user.id], {
+      const pythonProcess = spawn("python", [scriptPath, "--progress", user.id], {
         env: {
           ...process.env,
           SUPABASE_PASSWORD: process.env.SUPABASE_PASSWORD || "",
@@ -95,35 +105,51 @@ export async function POST(req: Request) {
         },
       });
 
-      let combinedOutput = "";
+      let logTail = "";
       let errorOutput = "";
-
-      pythonProcess.stdout.on("data", (data) => {
-        combinedOutput += data.toString();
+      let summary: ProgressEvent | null = null;
+      const files: ProgressEvent[] = [];
+
+      readline.createInterface({ input: pythonProcess.stdout }).on("line", (line) => {
+        let event: ProgressEvent;
+        try {
+          event = JSON.parse(line);
+        } catch {
+          return;
+        }
+        if (event.event === "file_done") files.push(event);
+        if (event.event === "summary") summary = event;
+        pusherServer
+          .trigger(`user-${user.id}`, "import-progress", event)
+          .catch((error: unknown) => console.warn("Could not forward import progress:", error));
       });
 
-      pythonProcess.stderr.on("data", (data) => {
-        errorOutput += data.toString();
-        combinedOutput += data.toString();
+      readline.createInterface({ input: pythonProcess.stderr }).on("line", (line) => {
+        logTail = (logTail + line + "\n").slice(-LOG_TAIL_BYTES);
+        if (line.includes(" - ERROR - ") && errorOutput.length < LOG_TAIL_BYTES) {
+          errorOutput += line + "\n";
+        }
       });
 
       pythonProcess.on("close", (code) => {
-        const isSuccess = code === 0;
         resolve({
-          success: isSuccess,
-          output: combinedOutput,
+          success: code === 0,
+          output: logTail,
           errorOutput,
           exitCode: code,
+          summary,
+          files,
         });
       });
 
-      // Optional: handle error / spawn failure
       pythonProcess.on("error", (err) => {
         resolve({
           success: false,
           output: "",
           errorOutput: err.message,
           exitCode: null,
+          summary: null,
+          files: [],
         });
       });
     });
@@ -148,6 +174,8 @@ export async function POST(req: Request) {
       output,
       error: errorOutput,
       exitCode,
+      summary,
+      files,
       userId: user.id,
       userEmail,
       fileInfo
@@ -59,6 +59,7 @@ const sidebars: SidebarsConfig = {
       items: [
         "import-export/excel-import",
         "import-export/csv-import",
+        "import-export/email-import",
         "import-export/reports-export",
       ],
     },
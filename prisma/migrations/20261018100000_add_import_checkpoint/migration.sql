@@ -0,0 +1,27 @@
+-- CreateTable
+CREATE TABLE "public"."ImportCheckpoint" (
+    "id" TEXT NOT NULL,
+    "fileHash" TEXT NOT NULL,
+    "profile" TEXT NOT NULL,
+    "fileName" TEXT NOT NULL,
+    "filePath" TEXT NOT NULL,
+    "entityId" TEXT,
+    "stage" TEXT NOT NULL,
+    "group" TEXT,
+    "batchOffset" INTEGER NOT NULL DEFAULT 0,
+    "totalRows" INTEGER NOT NULL DEFAULT 0,
+    "status" TEXT NOT NULL,
+    "owner" TEXT,
+    "userId" TEXT,
+    "error" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ImportCheckpoint_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "ImportCheckpoint_fileHash_profile_key" ON "public"."ImportCheckpoint"("fileHash", "profile");
+
+-- CreateIndex
+CREATE INDEX "ImportCheckpoint_status_updatedAt_idx" ON "public"."ImportCheckpoint"("status", "updatedAt");
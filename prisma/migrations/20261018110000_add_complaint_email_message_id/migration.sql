@@ -0,0 +1,11 @@
+-- AlterTable
+ALTER TABLE "public"."Complaint" ADD COLUMN "emailMessageId" TEXT;
+
+-- AlterTable
+ALTER TABLE "public"."Comment" ADD COLUMN "emailMessageId" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Complaint_emailMessageId_key" ON "public"."Complaint"("emailMessageId");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Comment_emailMessageId_key" ON "public"."Comment"("emailMessageId");
@@ -0,0 +1,122 @@
+import os
+import re
+import sys
+import time
+import argparse
+import logging
+import statistics
+from email import policy
+from email.parser import BytesParser
+
+from mailparse.ingest import MAIL_FOLDER, list_mail_files
+from mailparse.parse import eml_body
+from mailparse.text import html_to_text
+from mailparse.clean import BodyCleaner, DEFAULT_RULES, load_rules
+
+sys.stdout.reconfigure(encoding='utf-8')
+logging.basicConfig(level=logging.ERROR)
+
+# The previous clean_body: every pattern matched against every stripped line
+LEGACY_PATTERNS = [
+    r"(?i)^--\s*$",
+    r"(?i)^Poverljive informacije.*",
+    r"(?i)^Skrećemo vam pažnju.*",
+    r"(?i)^Sačuvajmo drveće.*",
+    r"(?i)^Save a tree.*",
+    r"(?i)^\*{3,}.*",
+    r"(?i)^─────────────.*",
+    r"(?i)^Adresa:.*",
+    r"(?i)^• m:.*",
+    r"(?i)^http[s]?://.*",
+    r"(?i)^<mailto:.*>",
+    r"(?i)^Ako nije neophodno.*",
+    r"(?i)^Najlakši način.*",
+]
+
+def clean_legacy(text):
+    cleaned = []
+    for line in text.splitlines():
+        if any(re.match(pat, line.strip()) for pat in LEGACY_PATTERNS):
+            continue
+        if line.strip() == "":
+            continue
+        cleaned.append(line.strip())
+    return "\n".join(cleaned).strip()
+
+def raw_body(path):
+    """Uncleaned text body of a mail file"""
+    if path.lower().endswith(".msg"):
+        import extract_msg
+        msg = extract_msg.Message(path)
+        try:
+            return msg.body or html_to_text(msg.htmlBody)
+        finally:
+            msg.close()
+    with open(path, "rb") as f:
+        return eml_body(BytesParser(policy=policy.default).parse(f))
+
+def reply_chain(body, replies):
+    """A long reply chain: the body quoted under an Outlook header `replies` times"""
+    header = "\nFrom: Korisnički servis <support@example.com>\nSent: Thursday, April 10, 2025 1:23 PM\nSubject: RE: reklamacija\n\n"
+    return header.join([body] * (replies + 1))
+
+def time_cleaner(clean, text, repeat):
+    """Median seconds to clean one body"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        clean(text)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled body cleaner with the per-line pattern loop")
+    parser.add_argument("paths", nargs="*", help="mail files or folders (default: data/emails/)")
+    parser.add_argument("--rules", help="JSON rules file (default: built-in rules)")
+    parser.add_argument("--replies", type=int, default=50, help="also time a reply chain quoting each body this many times")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per cleaner and body (median is reported)")
+    args = parser.parse_args()
+
+    compiled = BodyCleaner(load_rules(args.rules) if args.rules else DEFAULT_RULES)
+    # Only the drop rules, for the same work as the legacy loop (which has no cut)
+    drop_only = BodyCleaner({"cut": [], "drop": (load_rules(args.rules) if args.rules else DEFAULT_RULES)["drop"]})
+    cleaners = {
+        "legacy": clean_legacy,
+        "drop only": drop_only.clean,
+        "cut + drop": compiled.clean,
+    }
+
+    samples = []
+    for path in list_mail_files(args.paths or [MAIL_FOLDER]):
+        body = raw_body(path)
+        if not body:
+            continue
+        label = os.path.basename(path)[-36:]
+        samples.append((label, body))
+        if args.replies:
+            samples.append((f"{label[-26:]} x{args.replies} thread", reply_chain(body, args.replies)))
+
+    if not samples:
+        print("No message bodies found")
+        return 1
+
+    totals = dict.fromkeys(cleaners, 0.0)
+    print(f"{'body':<40} {'KB':>7} {'cleaner':<11} {'ms':>9} {'MB/s':>7} {'speedup':>8}  lines out")
+    for label, body in samples:
+        size = len(body.encode("utf-8"))
+        reference = None
+        for name, clean in cleaners.items():
+            seconds = time_cleaner(clean, body, args.repeat)
+            reference = reference or seconds
+            lines = clean(body).count("\n") + 1
+            print(f"{label:<40} {size / 1024:>7.1f} {name:<11} {seconds * 1000:>9.3f} "
+                  f"{size / seconds / 1e6 if seconds else 0:>7.1f} {reference / seconds:>7.1f}x  {lines}")
+            totals[name] += seconds
+
+    print()
+    for name, seconds in totals.items():
+        print(f"{name:<11} total {seconds * 1000:9.2f} ms ({totals['legacy'] / seconds:.1f}x vs legacy)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import statistics
+from email import policy
+from email.parser import BytesParser
+
+from mailparse.ingest import MAIL_FOLDER, list_mail_files
+from mailparse.text import TEXT_BACKENDS, decode_html
+
+sys.stdout.reconfigure(encoding='utf-8')
+logging.basicConfig(level=logging.ERROR)
+
+def html_bodies(path):
+    """text/html parts of an .eml file, or the HTML body of a .msg file"""
+    if path.lower().endswith(".msg"):
+        import extract_msg
+        msg = extract_msg.Message(path)
+        try:
+            return [msg.htmlBody] if msg.htmlBody else []
+        finally:
+            msg.close()
+    with open(path, "rb") as f:
+        msg = BytesParser(policy=policy.default).parse(f)
+    return [part.get_content() for part in msg.walk() if part.get_content_type() == "text/html"]
+
+def outlook_thread(html, replies):
+    """A long Outlook-style reply chain: the body quoted `replies` times inside nested blockquotes"""
+    html = decode_html(html)
+    start = html.find("<body")
+    start = html.find(">", start) + 1 if start >= 0 else 0
+    end = html.rfind("</body>")
+    body = html[start:end if end > 0 else len(html)]
+    quoted = body
+    for _ in range(replies):
+        quoted = f'{body}<div style="border:none;border-top:solid #E1E1E1 1.0pt"><blockquote>{quoted}</blockquote></div>'
+    return html[:start] + quoted + html[end if end > 0 else len(html):]
+
+def time_backend(backend, html, repeat):
+    """Median seconds to extract the text of one body"""
+    timings = []
+    text = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = TEXT_BACKENDS[backend](html)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), text
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML-to-text backends on e-mail bodies")
+    parser.add_argument("paths", nargs="*", help="mail files or folders (default: data/emails/)")
+    parser.add_argument("--replies", type=int, default=30, help="also time a reply chain quoting each body this many times")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per backend and body (median is reported)")
+    args = parser.parse_args()
+
+    samples = []
+    for path in list_mail_files(args.paths or [MAIL_FOLDER]):
+        for n, html in enumerate(html_bodies(path)):
+            label = os.path.basename(path)[-36:]
+            samples.append((label, html))
+            if args.replies:
+                samples.append((f"{label[-26:]} x{args.replies} thread", outlook_thread(html, args.replies)))
+
+    if not samples:
+        print("No HTML bodies found")
+        return 1
+
+    totals = {name: 0.0 for name in TEXT_BACKENDS}
+    print(f"{'body':<40} {'KB':>7} {'backend':<11} {'ms':>9} {'MB/s':>7} {'vs bs4':>7}  same text")
+    for label, html in samples:
+        size = len(html.encode("utf-8") if isinstance(html, str) else html)
+        results = {backend: time_backend(backend, html, args.repeat) for backend in TEXT_BACKENDS}
+        reference_seconds = results["bs4"][0]
+        reference_text = results["lxml"][1]
+        for backend, (seconds, text) in results.items():
+            same = "-" if backend == "bs4" else ("yes" if text == reference_text else "NO")
+            print(f"{label:<40} {size / 1024:>7.1f} {backend:<11} {seconds * 1000:>9.2f} "
+                  f"{size / seconds / 1e6 if seconds else 0:>7.1f} {reference_seconds / seconds:>6.1f}x  {same}")
+            totals[backend] += seconds
+
+    print()
+    for backend, seconds in totals.items():
+        print(f"{backend:<11} total {seconds * 1000:9.2f} ms ({totals['bs4'] / seconds:.1f}x vs bs4)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
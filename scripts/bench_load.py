@@ -0,0 +1,138 @@
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+import logging
+import statistics
+from datetime import date, timedelta
+
+from ingestion.profiles import get_profile
+from ingestion.detect import detect_layout
+from ingestion.parser import parse_workbook, TRANSACTION_GROUPS
+from ingestion.batch import RecordBatch, record_count, service_codes
+from ingestion.loader import import_records
+from ingestion.storage import set_storage_backend
+
+sys.stdout.reconfigure(encoding='utf-8')
+# Parser warnings about footer rows would drown the table
+logging.basicConfig(level=logging.ERROR)
+
+DEFAULT_FOLDERS = ["scripts/input", "scripts/processed", "scripts/errors"]
+BENCH_ENTITY = "Load Benchmark"
+
+def synthetic_streams(records, services=200, seed=1):
+    """Prepaid/postpaid batches with about `records` records: `services` services over consecutive days"""
+    rng = random.Random(seed)
+    days = max(1, -(-records // (services * len(TRANSACTION_GROUPS))))
+    first = date(2024, 1, 1)
+    dates = [(first + timedelta(days=d)).strftime("%d.%m.%Y") for d in range(days)]
+    streams = {}
+    for group in TRANSACTION_GROUPS:
+        batch = RecordBatch("synthetic", group, dates)
+        for s in range(services):
+            price = rng.choice((20.0, 40.0, 60.0, 120.0, 146.4))
+            service = batch.add_service(f"S_{1000 + s}_Synthetic", str(1000 + s), price)
+            for d in range(days):
+                quantity = float(rng.randint(1, 500))
+                batch.append(service, d, quantity, round(quantity * price / 1.2, 2))
+        streams[group] = [batch]
+    return streams
+
+def resolve_fake(streams):
+    """Stamp made-up entity and service IDs, as the resolver would"""
+    for batches in streams.values():
+        mapping = {code: f"service-{code}" for code in service_codes(batches)}
+        for batch in batches:
+            batch.resolve("bench-entity", mapping)
+
+def resolve_postgres(profile, streams):
+    """Resolve against the real database, under a dedicated benchmark entity"""
+    from ingestion.db import get_db_connection, return_db_connection
+    from ingestion.resolver import get_or_create_entity, resolve_services
+
+    conn = get_db_connection()
+    try:
+        entity_id, _ = get_or_create_entity(conn, profile, BENCH_ENTITY)
+        for group, batches in streams.items():
+            mapping = resolve_services(conn, profile, entity_id, service_codes(batches), None, group.upper())
+            for batch in batches:
+                batch.resolve(entity_id, mapping)
+    finally:
+        return_db_connection(conn)
+
+def time_load(profile, streams, backend, repeat):
+    """Median seconds to load every group (first load inserts, later runs update)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for group, batches in streams.items():
+            import_records(profile, batches, group)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+def bench(label, profile, parse, repeat, postgres):
+    """Time parsing and loading of one input; returns (records, parse s, memory s, postgres s)"""
+    start = time.perf_counter()
+    streams = parse()
+    parse_seconds = time.perf_counter() - start
+    records = sum(record_count(batches) for batches in streams.values())
+
+    resolve_fake(streams)
+    set_storage_backend("memory")
+    memory_seconds, _ = time_load(profile, streams, "memory", repeat)
+
+    postgres_seconds = None
+    if postgres:
+        resolve_postgres(profile, streams)
+        set_storage_backend("postgres")
+        postgres_seconds, _ = time_load(profile, streams, "postgres", repeat)
+
+    db_share = f"{(postgres_seconds - memory_seconds) / postgres_seconds:>6.0%}" if postgres_seconds else f"{'-':>6}"
+    pg_ms = f"{postgres_seconds * 1000:>10.1f}" if postgres_seconds else f"{'-':>10}"
+    print(f"{label[-40:]:<40} {records:>8} {parse_seconds * 1000:>9.1f} {memory_seconds * 1000:>10.1f} "
+          f"{records / memory_seconds if memory_seconds else 0:>10.0f} {pg_ms} {db_share}")
+    return records, parse_seconds, memory_seconds, postgres_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing and loading without (or with) a database")
+    parser.add_argument("paths", nargs="*", help="report files or folders (default: scripts/input, processed, errors)")
+    parser.add_argument("--synthetic", type=int, metavar="RECORDS", help="load a synthetic report of about this many records instead")
+    parser.add_argument("--profile", default="parking", help="profile for synthetic records (default: parking)")
+    parser.add_argument("--repeat", type=int, default=3, help="load runs per input (median is reported)")
+    parser.add_argument(
+        "--postgres",
+        action="store_true",
+        help="also load into the configured PostgreSQL database (writes rows under a benchmark entity)"
+    )
+    args = parser.parse_args()
+
+    if args.postgres:
+        from ingestion.db import init_db_pool
+        init_db_pool()
+
+    print(f"{'input':<40} {'records':>8} {'parse ms':>9} {'memory ms':>10} {'rows/s':>10} {'pg ms':>10} {'db %':>6}")
+    if args.synthetic:
+        profile = get_profile(args.profile)
+        bench(f"synthetic {args.synthetic}", profile, lambda: synthetic_streams(args.synthetic), args.repeat, args.postgres)
+        return 0
+
+    files = []
+    for path in args.paths or DEFAULT_FOLDERS:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.xls*"))))
+        else:
+            files.append(path)
+
+    for input_file in files:
+        detection = detect_layout(input_file)
+        if not detection["profile"]:
+            continue
+        profile = get_profile(detection["profile"])
+        bench(os.path.basename(input_file), profile,
+              lambda: parse_workbook(profile, input_file), args.repeat, args.postgres)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import logging
+import statistics
+
+from ingestion.reader import READER_BACKENDS, backend_order
+from ingestion.parser import parse_sheet
+
+sys.stdout.reconfigure(encoding='utf-8')
+# Parser warnings about footer rows would drown the table
+logging.basicConfig(level=logging.ERROR)
+
+DEFAULT_FOLDERS = ["scripts/input", "scripts/processed", "scripts/errors"]
+
+def all_sheets(sheet_names):
+    """Select every sheet, so the benchmark covers summary and daily sheets alike"""
+    return list(enumerate(sheet_names))
+
+def time_backend(backend, input_file, repeat):
+    """Median seconds to read and parse every sheet of a file with one backend"""
+    timings = []
+    parsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = [
+            {group: list(batch.rows()) for group, batch in parse_sheet(rows).items()}
+            for _, _, rows in READER_BACKENDS[backend](input_file, all_sheets)
+        ]
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), parsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare spreadsheet reader backends on report files")
+    parser.add_argument("paths", nargs="*", help="report files or folders (default: scripts/input, processed, errors)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per backend and file (median is reported)")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths or DEFAULT_FOLDERS:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.xls*"))))
+        else:
+            files.append(path)
+
+    if not files:
+        print("No report files found")
+        return 1
+
+    totals = {name: 0.0 for name in READER_BACKENDS}
+    counted = {name: 0 for name in READER_BACKENDS}
+
+    print(f"{'file':<48} {'backend':<10} {'ms':>9} {'vs pandas':>10}  same rows")
+    for input_file in files:
+        results = {}
+        for backend in backend_order(input_file):
+            try:
+                results[backend] = time_backend(backend, input_file, args.repeat)
+            except Exception as e:
+                print(f"{os.path.basename(input_file)[-48:]:<48} {backend:<10} {'failed':>9}  {e}")
+
+        reference = results.get("pandas")
+        for backend, (seconds, parsed) in results.items():
+            speedup = f"{reference[0] / seconds:.1f}x" if reference and seconds else "-"
+            same = "yes" if not reference or parsed == reference[1] else "NO"
+            print(f"{os.path.basename(input_file)[-48:]:<48} {backend:<10} {seconds * 1000:>9.2f} {speedup:>10}  {same}")
+            totals[backend] += seconds
+            counted[backend] += 1
+
+    print()
+    for backend, seconds in totals.items():
+        if counted[backend]:
+            print(f"{backend:<10} total {seconds * 1000:9.2f} ms over {counted[backend]} files")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import sys
+import logging
+
+from mailparse.complaints import main
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+
+if __name__ == "__main__":
+    sys.exit(main())
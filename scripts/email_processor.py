@@ -1,12 +1,15 @@
-//scripts/email_processor.py
-
-import os
+import sys
 import logging
-from email import message_from_file
+import argparse
+from email import policy
+from email.parser import BytesParser
 from email.message import Message
 from email.header import decode_header
 from pathlib import Path
 
+from mailparse.scan import scan_file
+from mailparse.nested import iter_messages
+
 logging.basicConfig(
     filename="email_processor.log",
     level=logging.DEBUG,
@@ -46,13 +49,13 @@ def extract_body(msg: Message):
             logger.warning(f"Failed to decode single body: {e}")
     return None
 
-def extract_email_data(msg: Message):
+def extract_email_data(msg: Message, body=None):
     email_data = {
         "from": decode_mime_header(msg.get("From")),
         "to": decode_mime_header(msg.get("To")),
         "cc": decode_mime_header(msg.get("Cc")),
         "subject": decode_mime_header(msg.get("Subject")),
-        "body": extract_body(msg),
+        "body": body if body is not None else extract_body(msg),
     }
 
     if not all([email_data["from"], email_data["to"], email_data["subject"], email_data["body"]]):
@@ -63,31 +66,44 @@ def extract_email_data(msg: Message):
     return email_data
 
 def extract_all_emails(msg: Message):
+    # Embedded messages at any depth; a bundle's own text is only used when nothing is embedded
     emails = []
-    if msg.get_content_type() == "multipart/mixed":
-        for part in msg.walk():
-            if part.get_content_type() == "message/rfc822":
-                sub_msg = part.get_payload(0)  # This is a Message object
-                logger.debug("Found embedded message/rfc822.")
-                email_data = extract_email_data(sub_msg)
-                if email_data:
-                    emails.append(email_data)
-    else:
-        logger.debug("No embedded emails, treating as single message.")
-        email_data = extract_email_data(msg)
+    top = None
+    embedded = 0
+    for nested in iter_messages(msg):
+        if nested.depth == 0:
+            top = nested
+            continue
+        embedded += 1
+        logger.debug(f"Found embedded message at {'.'.join(str(n + 1) for n in nested.position)}.")
+        email_data = extract_email_data(nested.message, nested.text() or "")
+        if email_data:
+            emails.append(email_data)
+    if top is not None and not emails:
+        if embedded:
+            logger.debug(f"All {embedded} embedded emails incomplete, treating as single message.")
+        else:
+            logger.debug("No embedded emails, treating as single message.")
+        email_data = extract_email_data(msg, top.text() or "")
         if email_data:
             emails.append(email_data)
     return emails
 
-def process_email_data(filepath):
+def process_email_data(filepath, headers_only=False):
     logger.info(f"Starting email processing for file: {filepath}")
 
     if not Path(filepath).exists():
         logger.error(f"File not found: {filepath}")
         return
 
-    with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-        msg = message_from_file(f)
+    if headers_only:
+        # Only the header block is read; the body is not decoded
+        record = scan_file(filepath)
+        logger.info(f"{record.sender} | {record.to} | {record.cc or 'No CC'} | {record.subject} | {record.date}")
+        return
+
+    with open(filepath, "rb") as f:
+        msg = BytesParser(policy=policy.default).parse(f)
 
     emails = extract_all_emails(msg)
     logger.info(f"Successfully parsed {len(emails)} valid emails.")
@@ -97,9 +113,14 @@ def process_email_data(filepath):
 
     logger.info("Processing complete.")
 
+def main(argv=None):
+    """Command line entry point: log the messages in one .eml file"""
+    parser = argparse.ArgumentParser(description="Log the messages of an .eml file, including embedded ones")
+    parser.add_argument("path", help=".eml file to process")
+    parser.add_argument("--headers-only", action="store_true", help="only read the header block (sender, recipients, subject, date)")
+    args = parser.parse_args(argv)
+    process_email_data(args.path, headers_only=args.headers_only)
+    return 0
+
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python email_processor.py <path-to-eml-file>")
-        exit(1)
-    process_email_data(sys.argv[1])
+    sys.exit(main())
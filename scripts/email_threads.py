@@ -0,0 +1,16 @@
+import sys
+import logging
+
+from mailparse.thread import main
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Log to stderr: stdout may carry the conversations themselves
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    stream=sys.stderr
+)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,41 @@
-//scripts/eml_parse.py
-
 import os
-import pandas as pd
-from datetime import datetime
+import sys
 import extract_msg
 
-# Podesi putanju do foldera sa .msg fajlovima
-msg_directory = "E:/xampp-8-telekom/htdocs/fin-app-hub/scripts/email/"  # <- Izmeni ovo
-
-# Lista za čuvanje rezultata
-email_data = []
+from mailparse.record import MailRecord
+from mailparse.parse import iso_date
+from mailparse.output import sort_by_date, write_records
 
-# Prolazak kroz sve .msg fajlove u folderu
-for filename in os.listdir(msg_directory):
-    if filename.lower().endswith(".msg"):
-        file_path = os.path.join(msg_directory, filename)
-        try:
-            msg = extract_msg.Message(file_path)
-            msg_sender = msg.sender
-            msg_to = msg.to
-            msg_subject = msg.subject
-            msg_date = msg.date
-            msg_body = msg.body
+# Podesi putanju do foldera sa .msg fajlovima (ili je prosledi kao argument)
+msg_directory = sys.argv[1] if len(sys.argv) > 1 else "E:/xampp-8-telekom/htdocs/fin-app-hub/scripts/email/"  # <- Izmeni ovo
 
-            # Pretvaranje datuma u datetime za sortiranje
+def read_messages(directory):
+    """Poruke iz .msg fajlova, jedna po jedna"""
+    for filename in os.listdir(directory):
+        if filename.lower().endswith(".msg"):
+            file_path = os.path.join(directory, filename)
             try:
-                parsed_date = datetime.strptime(msg_date, "%a, %d %b %Y %H:%M:%S %z")
-            except Exception:
-                parsed_date = None
-
-            email_data.append({
-                "Subject": msg_subject,
-                "From": msg_sender,
-                "To": msg_to,
-                "Date": parsed_date,
-                "Body": msg_body.strip() if msg_body else ""
-            })
-
-        except Exception as e:
-            print(f"Greška u fajlu {filename}: {e}")
-
-# Sortiranje po datumu
-email_data_sorted = sorted(email_data, key=lambda x: x["Date"] or datetime.min)
-
-# Upis u CSV
-df = pd.DataFrame(email_data_sorted)
+                msg = extract_msg.Message(file_path)
+                try:
+                    yield MailRecord(
+                        file_path, "msg",
+                        subject=msg.subject,
+                        sender=msg.sender,
+                        to=msg.to,
+                        date=iso_date(msg.date),
+                        body=msg.body.strip() if msg.body else "",
+                    )
+                finally:
+                    msg.close()
+            except Exception as e:
+                print(f"Greška u fajlu {filename}: {e}")
+
+# Sortiranje po datumu i upis u CSV, bez držanja svih poruka u memoriji
 output_csv = os.path.join(msg_directory, "konverzacija.csv")
-df.to_csv(output_csv, index=False, encoding="utf-8-sig")
+write_records(
+    sort_by_date(read_messages(msg_directory)), output_csv,
+    fields=("subject", "sender", "to", "date", "body"),
+    header=("Subject", "From", "To", "Date", "Body"),
+)
 
 print(f"CSV fajl sačuvan: {output_csv}")
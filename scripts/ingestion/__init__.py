@@ -0,0 +1,22 @@
+"""Shared ingestion core for provider (VAS) and parking service Excel reports.
+
+The pipeline is split into reader, parser, resolver, loader and archiver
+stages; everything that differs between report kinds lives in the profiles
+declared in ``ingestion.profiles``.
+"""
+
+from .profiles import PROFILES, VAS_PROFILE, PARKING_PROFILE, get_profile
+from .detect import LAYOUTS, detect_layout
+from .engine import process_excel, run, main
+
+__all__ = [
+    "PROFILES",
+    "VAS_PROFILE",
+    "PARKING_PROFILE",
+    "get_profile",
+    "LAYOUTS",
+    "detect_layout",
+    "process_excel",
+    "run",
+    "main",
+]
@@ -0,0 +1,199 @@
+import os
+import gzip
+import shutil
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+
+from .profiles import PROJECT_ROOT, ARCHIVE_FOLDER, PROFILES, get_profile
+from .cache import file_digest
+
+# Processed reports are stored once per content hash, gzip-compressed, under
+# ARCHIVE_FOLDER/blobs/<first two hex digits>/<sha256>.gz. A small SQLite
+# index maps (profile, entity, period, file name) to the blob, so the same
+# workbook uploaded again (or for another month's re-run) only adds an index
+# row, and archiving a known file is an unlink instead of a copy.
+#
+# The index is the reference that used to be public/<archive_root>/<name>/
+# reports/<year>/<file>; restore_report() writes a report back out by that key.
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "reports" (
+    "profile" TEXT NOT NULL,
+    "entityId" TEXT NOT NULL,
+    "entityName" TEXT NOT NULL,
+    "period" TEXT NOT NULL,
+    "fileName" TEXT NOT NULL,
+    "digest" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "archivedAt" TEXT NOT NULL,
+    PRIMARY KEY ("profile", "entityId", "period", "fileName")
+);
+CREATE INDEX IF NOT EXISTS "reports_digest" ON "reports" ("digest");
+"""
+
+def blob_path(digest):
+    """Compressed blob of a report with this SHA-256"""
+    return os.path.join(ARCHIVE_FOLDER, "blobs", digest[:2], f"{digest}.gz")
+
+def open_index():
+    """Connection to the archive index, created on first use"""
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    index = sqlite3.connect(os.path.join(ARCHIVE_FOLDER, "index.sqlite3"), timeout=30)
+    index.execute("PRAGMA journal_mode=WAL")
+    index.executescript(INDEX_SCHEMA)
+    return index
+
+def store_blob(source_file, digest):
+    """Move a file into the blob store; returns (blob path, whether a new blob was written).
+
+    A blob that already exists is kept and the source is just removed. A new
+    one is compressed next to its final place and renamed in, so a crash never
+    leaves a partial blob behind.
+    """
+    target = blob_path(digest)
+    if os.path.exists(target):
+        os.remove(source_file)
+        return target, False
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(source_file, "rb") as fin, gzip.open(temp, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        os.replace(temp, target)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    os.remove(source_file)
+    return target, True
+
+def archive_report(profile, source_file, entity_id, entity_name, period, filename, digest=None):
+    """Archive a processed report under its entity and period; returns the blob path"""
+    digest = digest or file_digest(source_file)
+    size = os.path.getsize(source_file)
+    target, created = store_blob(source_file, digest)
+
+    index = open_index()
+    try:
+        with index:
+            index.execute(
+                'INSERT OR REPLACE INTO "reports" VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (profile["name"], entity_id, entity_name, period, filename, digest, size, datetime.now().isoformat())
+            )
+    finally:
+        index.close()
+
+    logging.info(f"Archived {filename} as {digest[:12]} ({'new blob' if created else 'already stored'})")
+    return target
+
+def find_reports(profile=None, entity=None, period=None):
+    """Index rows, optionally filtered by profile, entity ID or name, and period prefix (YYYY or YYYY-MM)"""
+    conditions, params = [], []
+    if profile:
+        conditions.append('"profile" = ?')
+        params.append(profile)
+    if entity:
+        conditions.append('("entityId" = ? OR LOWER("entityName") = LOWER(?))')
+        params += [entity, entity]
+    if period:
+        conditions.append('"period" LIKE ?')
+        params.append(f"{period}%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    index = open_index()
+    try:
+        index.row_factory = sqlite3.Row
+        return [dict(row) for row in index.execute(
+            f'SELECT * FROM "reports" {where} ORDER BY "profile", "entityName", "period", "fileName"', params
+        )]
+    finally:
+        index.close()
+
+def restore_report(digest, target):
+    """Decompress an archived report to a file"""
+    with gzip.open(blob_path(digest), "rb") as fin, open(target, "wb") as fout:
+        shutil.copyfileobj(fin, fout, 1024 * 1024)
+    return target
+
+def archive_stats():
+    """Report count, distinct blobs, original bytes and bytes on disk"""
+    index = open_index()
+    try:
+        reports, blobs, size = index.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT "digest"), COALESCE(SUM("size"), 0) FROM "reports"'
+        ).fetchone()
+        digests = [row[0] for row in index.execute('SELECT DISTINCT "digest" FROM "reports"')]
+    finally:
+        index.close()
+    stored = sum(os.path.getsize(blob_path(d)) for d in digests if os.path.exists(blob_path(d)))
+    return {"reports": reports, "blobs": blobs, "size": size, "stored": stored}
+
+def migrate_public(profile):
+    """Move the reports under public/<archive_root>/<name>/reports/<year>/ into the archive.
+
+    Those folders carry no entity ID, so the folder name stands in for it.
+    Returns the number of files archived.
+    """
+    root = os.path.join(PROJECT_ROOT, "public", profile["archive_root"])
+    count = 0
+    for dirpath, _, filenames in os.walk(root, topdown=False):
+        parts = os.path.relpath(dirpath, root).split(os.sep)
+        if len(parts) == 3 and parts[1] == "reports":
+            name, _, year = parts
+            for filename in filenames:
+                if filename.lower().endswith((".xls", ".xlsx")):
+                    archive_report(profile, os.path.join(dirpath, filename), name, name, year, filename)
+                    count += 1
+        if dirpath != root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return count
+
+def main(argv=None):
+    """Command line entry point of the report archive"""
+    parser = argparse.ArgumentParser(description="Content-addressed archive of processed reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="list archived reports")
+    listing.add_argument("--profile", choices=sorted(PROFILES))
+    listing.add_argument("--entity", help="provider / parking service / organization id or name")
+    listing.add_argument("--period", metavar="YYYY[-MM]")
+
+    restore = commands.add_parser("restore", help="write an archived report back to a file")
+    restore.add_argument("--profile", choices=sorted(PROFILES), required=True)
+    restore.add_argument("--entity", required=True, help="id or name the report is archived under")
+    restore.add_argument("--period", required=True, metavar="YYYY[-MM]")
+    restore.add_argument("filename")
+    restore.add_argument("--output", "-o", help="target file (default: the file name in the current folder)")
+
+    migrate = commands.add_parser("migrate", help="move reports from public/<archive root>/ into the archive")
+    migrate.add_argument("--profile", choices=sorted(PROFILES), help="only one profile (default: all)")
+
+    commands.add_parser("stats", help="show archive size and deduplication")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "list":
+            for row in find_reports(args.profile, args.entity, args.period):
+                print(f"{row['profile']}\t{row['entityName']}\t{row['period']}\t{row['fileName']}\t{row['digest'][:12]}\t{row['size']}")
+        elif args.command == "restore":
+            rows = [r for r in find_reports(args.profile, args.entity, args.period) if r["fileName"] == args.filename]
+            if not rows:
+                logging.error(f"{args.filename} is not archived under {args.entity} {args.period}")
+                return 1
+            target = restore_report(rows[0]["digest"], args.output or args.filename)
+            logging.info(f"Restored {args.filename} to {target}")
+        elif args.command == "migrate":
+            profiles = [get_profile(args.profile)] if args.profile else PROFILES.values()
+            for profile in profiles:
+                logging.info(f"Migrated {migrate_public(profile)} {profile['name']} reports into the archive")
+        else:
+            stats = archive_stats()
+            saved = 1 - stats["stored"] / stats["size"] if stats["size"] else 0
+            print(f"{stats['reports']} reports in {stats['blobs']} blobs, "
+                  f"{stats['size']} bytes stored as {stats['stored']} ({saved:.0%} saved)")
+        return 0
+    except Exception as e:
+        logging.error(f"Archive {args.command} failed: {e}")
+        return 1
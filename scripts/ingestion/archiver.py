@@ -0,0 +1,95 @@
+import os
+import shutil
+import logging
+from datetime import datetime
+
+from .db import get_db_connection, return_db_connection, log_to_database
+from .parser import extract_year_from_filename, convert_date_format
+from .profiles import ERROR_FOLDER
+from .archive import archive_report
+
+def report_period(streams, filename):
+    """YYYY-MM of a report's first dated record, or the year in its file name"""
+    dates = {date for batches in streams.values() for batch in batches for date in batch.dates}
+    months = [converted[:7] for converted in map(convert_date_format, dates) if converted]
+    return min(months) if months else extract_year_from_filename(filename)
+
+def move_to_error_folder(source_file):
+    """Move a file that could not be processed to the error folder"""
+    try:
+        error_file = os.path.join(ERROR_FOLDER, os.path.basename(source_file))
+        shutil.move(source_file, error_file)
+        logging.info(f"File moved to error folder: {error_file}")
+        return error_file
+    except Exception as move_error:
+        logging.error(f"Could not move file to error folder: {move_error}")
+        return None
+
+def move_file_to_entity_directory(profile, source_file, entity_id, entity_name, filename, user_id,
+                                  period=None, digest=None):
+    """Move a processed file into the report archive under its provider/parking service and period"""
+    table = profile["entity_table"]
+    conn = None
+    try:
+        period = period or extract_year_from_filename(filename)
+        target_file = archive_report(profile, source_file, entity_id, entity_name, period, filename, digest)
+
+        conn = get_db_connection()
+        if profile["track_import_status"]:
+            cur = conn.cursor()
+
+            update_sql = f"""
+            UPDATE "{table}"
+            SET
+                "originalFilePath" = %s,
+                "importStatus" = %s,
+                "updatedAt" = %s
+            WHERE "id" = %s
+            """
+
+            cur.execute(update_sql, (
+                target_file,
+                "completed",
+                datetime.now(),
+                entity_id
+            ))
+
+            conn.commit()
+            cur.close()
+
+        log_to_database(
+            conn,
+            entity_type=table,
+            entity_id=entity_id,
+            action="FILE_MOVED",
+            subject=f"File moved to {target_file}",
+            user_id=user_id
+        )
+
+        logging.info(f"File moved successfully: {source_file} -> {target_file}")
+        return target_file
+
+    except Exception as e:
+        logging.error(f"Error moving file {source_file}: {e}")
+        if os.path.exists(source_file):
+            move_to_error_folder(source_file)
+
+        if conn:
+            try:
+                log_to_database(
+                    conn,
+                    entity_type=table,
+                    entity_id=entity_id,
+                    action="FILE_MOVE_ERROR",
+                    subject=f"Failed to move file {filename}",
+                    description=str(e),
+                    severity="ERROR",
+                    user_id=user_id
+                )
+            except:
+                pass
+
+        return None
+    finally:
+        if conn:
+            return_db_connection(conn)
@@ -0,0 +1,92 @@
+import sys
+from array import array
+
+MISSING = float("nan")
+
+class RecordBatch:
+    """Transaction records of one sheet and group, stored column by column.
+
+    A report sheet repeats the same few services and header dates for every
+    quantity cell, so they are kept once in small lookup tables (services,
+    dates) and each record is two indexes into them plus its quantity and
+    amount in typed arrays. The provider/parking service and the service IDs
+    are stamped on the tables after resolution instead of on every record.
+
+    The totals the sheet itself declares (its TOTAL column per service row
+    and its TOTAL row per date) are kept alongside for validation.
+    """
+
+    __slots__ = (
+        "sheet", "group", "entity_id",
+        "service_names", "service_codes", "prices", "service_ids", "dates",
+        "total_quantities", "total_amounts", "sheet_totals",
+        "service_idx", "date_idx", "quantities", "amounts"
+    )
+
+    def __init__(self, sheet, group, dates):
+        self.sheet = sheet
+        self.group = group
+        self.entity_id = None
+        self.service_names = []
+        self.service_codes = []
+        self.prices = []
+        self.service_ids = []
+        self.dates = [sys.intern(d) if isinstance(d, str) else d for d in dates]
+        self.total_quantities = []
+        self.total_amounts = []
+        # (quantities, amounts) per date from the sheet's TOTAL row, over all groups
+        self.sheet_totals = None
+        self.service_idx = array("I")
+        self.date_idx = array("I")
+        self.quantities = array("d")
+        self.amounts = array("d")
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def add_service(self, service_name, service_code, price, total_quantity=None, total_amount=None):
+        """Register a service row and return its index for append()"""
+        self.service_names.append(sys.intern(service_name))
+        self.service_codes.append(sys.intern(service_code) if service_code else service_code)
+        self.prices.append(price)
+        self.service_ids.append(None)
+        self.total_quantities.append(total_quantity)
+        self.total_amounts.append(total_amount)
+        return len(self.service_names) - 1
+
+    def append(self, service, date, quantity, amount):
+        """Add one record by service and date index"""
+        self.service_idx.append(service)
+        self.date_idx.append(date)
+        self.quantities.append(quantity)
+        self.amounts.append(MISSING if amount is None else amount)
+
+    def resolve(self, entity_id, service_id_mapping):
+        """Stamp the provider/parking service and Service IDs after they are resolved"""
+        self.entity_id = entity_id
+        self.service_ids = [service_id_mapping.get(code) for code in self.service_codes]
+
+    def rows(self, dates=None):
+        """Yield (entityId, serviceId, serviceName, serviceCode, price, date, quantity, amount) per record.
+
+        dates optionally replaces the header date table, e.g. with the dates
+        already converted for the database.
+        """
+        names, codes, prices, ids = self.service_names, self.service_codes, self.prices, self.service_ids
+        dates = self.dates if dates is None else dates
+        for s, d, quantity, amount in zip(self.service_idx, self.date_idx, self.quantities, self.amounts):
+            yield (
+                self.entity_id, ids[s], names[s], codes[s], prices[s], dates[d],
+                quantity, None if amount != amount else amount
+            )
+
+def record_count(batches):
+    """Number of records in a list of batches"""
+    return sum(len(batch) for batch in batches)
+
+def service_codes(batches):
+    """Distinct service codes that have records in a list of batches"""
+    codes = set()
+    for batch in batches:
+        codes.update(batch.service_codes[s] for s in set(batch.service_idx))
+    return codes
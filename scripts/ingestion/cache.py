@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+from array import array
+
+import numpy as np
+
+from .profiles import CACHE_FOLDER
+from .batch import RecordBatch, record_count
+from .parser import PARSER_VERSION, parse_workbook
+from .progress import emit
+
+# Parsed workbooks are cached as NumPy .npz files named after the file's
+# content hash, the profile, the parsed groups and the parser version. A
+# retry after a failed database stage, or a file moved back from
+# scripts/errors/, then goes straight to loading. The cache is trimmed to
+# PARSE_CACHE_MAX_MB, evicting the least recently used entries first.
+CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+INDEX_DTYPE = np.dtype(f"u{array('I').itemsize}")
+
+cache_enabled = True
+
+def set_parse_cache(enabled):
+    """Turn the parsed-sheet cache on or off for this process"""
+    global cache_enabled
+    cache_enabled = enabled
+
+def file_digest(input_file):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(input_file, "rb") as fin:
+        for chunk in iter(lambda: fin.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(profile, digest, groups):
+    """Cache file for a workbook parsed with a profile"""
+    return os.path.join(CACHE_FOLDER, f"{digest}-{profile['name']}-{'-'.join(groups)}-v{PARSER_VERSION}.npz")
+
+COLUMNS = (
+    ("service_idx", INDEX_DTYPE),
+    ("date_idx", INDEX_DTYPE),
+    ("quantities", np.float64),
+    ("amounts", np.float64),
+)
+
+def save_parsed(path, streams):
+    """Write parsed streams to an .npz file.
+
+    The lookup tables of every batch go into one JSON metadata entry; each
+    record column is stored once, concatenated over all batches, so loading
+    reads five arrays no matter how many sheets the workbook has.
+    """
+    meta = []
+    columns = {name: [] for name, _ in COLUMNS}
+    for group, batches in streams.items():
+        for batch in batches:
+            meta.append({
+                "sheet": batch.sheet,
+                "group": group,
+                "size": len(batch),
+                "dates": batch.dates,
+                "service_names": batch.service_names,
+                "service_codes": batch.service_codes,
+                "prices": batch.prices,
+                "total_quantities": batch.total_quantities,
+                "total_amounts": batch.total_amounts,
+                "sheet_totals": batch.sheet_totals,
+            })
+            for name, dtype in COLUMNS:
+                columns[name].append(np.frombuffer(getattr(batch, name), dtype=dtype))
+
+    arrays = {
+        name: np.concatenate(columns[name]) if columns[name] else np.empty(0, dtype=dtype)
+        for name, dtype in COLUMNS
+    }
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    # Write under a temporary name so a crash never leaves a truncated entry behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fout:
+        np.savez(fout, meta=np.array(json.dumps({"groups": list(streams), "batches": meta})), **arrays)
+    os.replace(tmp_path, path)
+
+def load_parsed(path):
+    """Read parsed streams back from an .npz cache file"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {name: data[name] for name, _ in COLUMNS}
+
+    streams = {group: [] for group in meta["groups"]}
+    start = 0
+    for info in meta["batches"]:
+        stop = start + info["size"]
+        batch = RecordBatch(info["sheet"], info["group"], info["dates"])
+        batch.service_names = [sys.intern(name) for name in info["service_names"]]
+        batch.service_codes = [sys.intern(code) if code else code for code in info["service_codes"]]
+        batch.prices = info["prices"]
+        batch.service_ids = [None] * len(batch.service_names)
+        batch.total_quantities = info["total_quantities"]
+        batch.total_amounts = info["total_amounts"]
+        batch.sheet_totals = info["sheet_totals"]
+        for name, _ in COLUMNS:
+            getattr(batch, name).frombytes(arrays[name][start:stop].tobytes())
+        streams[info["group"]].append(batch)
+        start = stop
+    return streams
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """Delete least recently used cache entries until the cache fits in max_bytes"""
+    entries = []
+    for name in os.listdir(CACHE_FOLDER):
+        if name.endswith(".npz"):
+            stat = os.stat(os.path.join(CACHE_FOLDER, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(CACHE_FOLDER, name))
+        total -= size
+        logging.info(f"Evicted parse cache entry {name}")
+
+def parsed_records(streams):
+    """Total record count of parsed streams"""
+    return sum(record_count(batches) for batches in streams.values())
+
+def cached_parse(profile, input_file, groups, digest=None):
+    """Parse a workbook, reusing the cached result for identical content when there is one.
+
+    Sends the "parsed" progress event, with "cached" set when the result came from the cache.
+    """
+    if not cache_enabled:
+        streams = parse_workbook(profile, input_file, groups)
+        emit("parsed", records=parsed_records(streams))
+        return streams
+
+    path = None
+    try:
+        path = cache_path(profile, digest or file_digest(input_file), groups)
+        if os.path.exists(path):
+            streams = load_parsed(path)
+            # Loading counts as a use for LRU eviction
+            os.utime(path)
+            counts = ", ".join(f"{record_count(batches)} {group}" for group, batches in streams.items())
+            logging.info(f"Loaded parsed sheets of {os.path.basename(input_file)} from cache: {counts} records")
+            emit("parsed", records=parsed_records(streams), cached=True)
+            return streams
+    except Exception as e:
+        logging.warning(f"Parse cache unavailable for {os.path.basename(input_file)}: {e}")
+
+    streams = parse_workbook(profile, input_file, groups)
+    emit("parsed", records=parsed_records(streams))
+
+    if path:
+        try:
+            save_parsed(path, streams)
+            evict()
+        except Exception as e:
+            logging.warning(f"Could not write parse cache for {os.path.basename(input_file)}: {e}")
+    return streams
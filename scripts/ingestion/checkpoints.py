@@ -0,0 +1,221 @@
+import os
+import socket
+import logging
+from datetime import datetime, timedelta
+
+from .parser import TRANSACTION_GROUPS
+
+# Every imported file has one ImportCheckpoint row, keyed by content hash and
+# profile. It records how far the import got: the stage, and while loading,
+# the group and the number of its rows already committed. The offset is
+# written in the same transaction as each upsert batch, so a run that dies
+# resumes exactly after the last committed batch.
+CHECKPOINT_TABLE = "ImportCheckpoint"
+STAGES = ("parsed", "resolved", "loading", "loaded", "archived")
+
+# Imports whose owner stopped updating them for this long are considered dead
+STALE_AFTER = timedelta(minutes=int(os.getenv("IMPORT_STALE_MINUTES", "30")))
+
+CHECKPOINT_COLUMNS = ("id", "fileName", "stage", "group", "batchOffset", "totalRows", "status", "owner", "updatedAt")
+
+def owner_id():
+    """Identify this process as checkpoint owner"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def owner_alive(owner, updated_at):
+    """Whether the process owning an in-progress checkpoint may still be running"""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        if int(pid) == os.getpid():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+    # Owners on other hosts cannot be checked; trust them until they go stale
+    return datetime.now() - updated_at < STALE_AFTER
+
+def claim_checkpoint(conn, profile, file_hash, input_file, user_id):
+    """Get or create the checkpoint of a file and take ownership of it.
+
+    Returns the checkpoint as a dict, or None when another live run is
+    importing the same file.
+    """
+    try:
+        cur = conn.cursor()
+        now = datetime.now()
+        cur.execute(f'''
+            INSERT INTO "{CHECKPOINT_TABLE}" (
+                "id", "fileHash", "profile", "fileName", "filePath", "stage", "status",
+                "userId", "createdAt", "updatedAt"
+            )
+            VALUES (gen_random_uuid(), %s, %s, %s, %s, 'parsed', 'in_progress', %s, %s, %s)
+            ON CONFLICT ("fileHash", "profile") DO NOTHING
+        ''', (file_hash, profile["name"], os.path.basename(input_file), input_file, user_id, now, now))
+
+        cur.execute(f'''
+            SELECT {", ".join(f'"{c}"' for c in CHECKPOINT_COLUMNS)} FROM "{CHECKPOINT_TABLE}"
+            WHERE "fileHash" = %s AND "profile" = %s
+            FOR UPDATE
+        ''', (file_hash, profile["name"]))
+        checkpoint = dict(zip(CHECKPOINT_COLUMNS, cur.fetchone()))
+
+        mine = owner_id()
+        if (checkpoint["status"] == "in_progress" and checkpoint["owner"] not in (None, mine)
+                and owner_alive(checkpoint["owner"], checkpoint["updatedAt"])):
+            conn.rollback()
+            cur.close()
+            return None
+
+        status = "completed" if checkpoint["status"] == "completed" else "in_progress"
+        cur.execute(f'''
+            UPDATE "{CHECKPOINT_TABLE}"
+            SET "owner" = %s, "status" = %s, "filePath" = %s, "userId" = %s, "error" = NULL, "updatedAt" = %s
+            WHERE "id" = %s
+        ''', (mine, status, input_file, user_id, now, checkpoint["id"]))
+        conn.commit()
+        cur.close()
+
+        checkpoint["status"] = status
+        if checkpoint["stage"] != "parsed" or checkpoint["batchOffset"]:
+            logging.info(
+                f"Resuming {os.path.basename(input_file)} from stage {checkpoint['stage']}"
+                + (f" ({checkpoint['group']} row {checkpoint['batchOffset']} of {checkpoint['totalRows']})"
+                   if checkpoint["stage"] == "loading" else "")
+            )
+        return checkpoint
+
+    except Exception as e:
+        logging.error(f"Error claiming import checkpoint for {input_file}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        raise
+
+def clear_checkpoint(conn, profile, file_hash):
+    """Forget the checkpoint of a file so its next import starts from the beginning"""
+    cur = conn.cursor()
+    cur.execute(f'DELETE FROM "{CHECKPOINT_TABLE}" WHERE "fileHash" = %s AND "profile" = %s',
+                (file_hash, profile["name"]))
+    conn.commit()
+    cur.close()
+
+def set_stage(conn, checkpoint, stage, entity_id=None):
+    """Move a checkpoint to a later stage and commit"""
+    cur = conn.cursor()
+    cur.execute(f'''
+        UPDATE "{CHECKPOINT_TABLE}"
+        SET "stage" = %s, "entityId" = COALESCE(%s, "entityId"), "updatedAt" = %s
+        WHERE "id" = %s
+    ''', (stage, entity_id, datetime.now(), checkpoint["id"]))
+    conn.commit()
+    cur.close()
+    checkpoint["stage"] = stage
+
+def record_batch(cur, checkpoint, group, offset, total_rows):
+    """Record the rows committed so far; runs inside the upsert transaction, the caller commits"""
+    cur.execute(f'''
+        UPDATE "{CHECKPOINT_TABLE}"
+        SET "stage" = 'loading', "group" = %s, "batchOffset" = %s, "totalRows" = %s, "updatedAt" = %s
+        WHERE "id" = %s
+    ''', (group, offset, total_rows, datetime.now(), checkpoint["id"]))
+
+def finish_checkpoint(conn, checkpoint, status, error=None):
+    """Close a checkpoint as completed or failed, keeping its offset for a later resume"""
+    try:
+        cur = conn.cursor()
+        cur.execute(f'''
+            UPDATE "{CHECKPOINT_TABLE}"
+            SET "status" = %s, "error" = %s, "owner" = NULL, "updatedAt" = %s
+            WHERE "id" = %s
+        ''', (status, error, datetime.now(), checkpoint["id"]))
+        conn.commit()
+        cur.close()
+        checkpoint["status"] = status
+    except Exception as e:
+        logging.error(f"Error closing import checkpoint: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+
+def resume_offset(checkpoint, group, total_rows):
+    """Row offset to start loading a group from, or None when it is already loaded"""
+    if not checkpoint:
+        return 0
+    if checkpoint["status"] == "completed" or checkpoint["stage"] in ("loaded", "archived"):
+        return None
+    if checkpoint["stage"] != "loading" or not checkpoint["group"]:
+        return 0
+
+    order = list(TRANSACTION_GROUPS)
+    if order.index(group) < order.index(checkpoint["group"]):
+        return None
+    if group != checkpoint["group"]:
+        return 0
+    if checkpoint["totalRows"] != total_rows:
+        # The parsed content differs from what was checkpointed; upserts are idempotent, so start over
+        logging.warning(f"Checkpoint of {group} was taken over {checkpoint['totalRows']} rows, now {total_rows}; reloading")
+        return 0
+    return checkpoint["batchOffset"]
+
+def reap_stale(conn, profiles):
+    """Fail abandoned imports whose file is gone, and stale in_progress statuses.
+
+    Abandoned checkpoints whose file is still in place are left alone; the
+    run picks the file up and resumes it.
+    """
+    reaped = 0
+    try:
+        cur = conn.cursor()
+        cur.execute(f'''
+            SELECT "id", "filePath", "owner", "updatedAt" FROM "{CHECKPOINT_TABLE}"
+            WHERE "status" = 'in_progress'
+        ''')
+        for checkpoint_id, file_path, owner, updated_at in cur.fetchall():
+            if owner_alive(owner, updated_at) or os.path.exists(file_path):
+                continue
+            cur.execute(f'''
+                UPDATE "{CHECKPOINT_TABLE}"
+                SET "status" = 'failed', "error" = 'Abandoned import reaped', "owner" = NULL, "updatedAt" = %s
+                WHERE "id" = %s
+            ''', (datetime.now(), checkpoint_id))
+            reaped += 1
+            logging.warning(f"Reaped abandoned import of {os.path.basename(file_path)}")
+        conn.commit()
+    except Exception as e:
+        logging.error(f"Error reaping import checkpoints: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+
+    for profile in profiles:
+        if not profile["track_import_status"]:
+            continue
+        table = profile["entity_table"]
+        try:
+            cur = conn.cursor()
+            cur.execute(f'''
+                UPDATE "{table}"
+                SET "importStatus" = 'failed', "updatedAt" = %s
+                WHERE "importStatus" = 'in_progress' AND "lastImportDate" < %s
+            ''', (datetime.now(), datetime.now() - STALE_AFTER))
+            if cur.rowcount:
+                logging.warning(f"Marked {cur.rowcount} stale in_progress imports of {table} as failed")
+                reaped += cur.rowcount
+            conn.commit()
+            cur.close()
+        except Exception as e:
+            logging.error(f"Error reaping stale {table} imports: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+
+    return reaped
@@ -0,0 +1,182 @@
+import os
+import sys
+import uuid
+import logging
+import psycopg2
+from psycopg2 import pool
+from datetime import datetime
+
+connection_pool = None
+current_user_id = None
+
+def init_db_pool():
+    global connection_pool
+    db_params = get_db_params()
+    connection_pool = pool.SimpleConnectionPool(
+        1, 20, **db_params
+    )
+    logging.info("Database connection pool initialized")
+
+def get_db_connection():
+    global connection_pool
+    if not connection_pool:
+        init_db_pool()
+    return connection_pool.getconn()
+
+def return_db_connection(conn):
+    global connection_pool
+    connection_pool.putconn(conn)
+
+def close_db_pool():
+    global connection_pool
+    if connection_pool:
+        connection_pool.closeall()
+        connection_pool = None
+        logging.info("Database connection pool closed")
+
+def get_db_params():
+    """Get database parameters based on environment configuration"""
+    if os.getenv("USE_LOCAL_DB", "true").lower() == "true":
+        logging.info("Using LOCAL database configuration")
+        return {
+            "host": "localhost",
+            "port": "5432",
+            "dbname": "findatbas-copy",
+            "user": "postgres",
+            "password": "postgres",
+        }
+
+    logging.info("Using SUPABASE database configuration")
+    password = os.getenv("SUPABASE_PASSWORD")
+    if not password:
+        raise ValueError("SUPABASE_PASSWORD environment variable is not set")
+
+    return {
+        "host": "aws-0-eu-central-1.pooler.supabase.com",
+        "port": "6543",
+        "dbname": "postgres",
+        "user": "postgres.srrdkqjfynsdoqlxsohi",
+        "password": password,
+    }
+
+def test_database_connection():
+    """Test connection to database"""
+    try:
+        logging.info("Testing database connection...")
+        db_params = get_db_params()
+        conn = psycopg2.connect(**db_params)
+        cur = conn.cursor()
+        cur.execute("SELECT version();")
+        version = cur.fetchone()
+        logging.info(f"Connected to: {version[0]}")
+        cur.close()
+        conn.close()
+        return True
+    except ValueError as e:
+        logging.error(f"Configuration error: {e}")
+        return False
+    except Exception as e:
+        logging.error(f"Database connection failed: {e}")
+        return False
+
+def set_current_user(user_id):
+    """Set the user ID used for logging and auto-created records"""
+    global current_user_id
+    current_user_id = user_id
+
+def get_current_user():
+    """Get user ID from command line arguments or system"""
+    global current_user_id
+    if current_user_id:
+        return current_user_id
+
+    if len(sys.argv) > 1:
+        current_user_id = sys.argv[1]
+        logging.info(f"Using authenticated user ID: {current_user_id}")
+        return current_user_id
+
+    logging.warning("No user ID provided, falling back to system user")
+    current_user_id = get_or_create_system_user()
+    return current_user_id
+
+def get_or_create_system_user():
+    """Get or create system user for logging purposes"""
+    try:
+        db_params = get_db_params()
+        conn = psycopg2.connect(**db_params)
+        cur = conn.cursor()
+
+        cur.execute('SELECT "id" FROM "User" WHERE "email" = %s', ('system@internal.app',))
+        result = cur.fetchone()
+
+        if result:
+            user_id = result[0]
+            logging.debug(f"Found existing system user: {user_id}")
+            cur.close()
+            conn.close()
+            return user_id
+
+        cur.execute('''
+            INSERT INTO "User" ("id", "name", "email", "role", "isActive", "createdAt", "updatedAt")
+            VALUES (gen_random_uuid(), 'System User', 'system@internal.app', 'ADMIN', true, %s, %s)
+            RETURNING "id"
+        ''', (datetime.now(), datetime.now()))
+
+        user_id = cur.fetchone()[0]
+        conn.commit()
+        logging.info(f"Created system user: {user_id}")
+        cur.close()
+        conn.close()
+        return user_id
+
+    except Exception as e:
+        logging.error(f"Error getting/creating system user: {e}")
+        return None
+
+def log_to_database(conn, entity_type, entity_id, action, subject, description=None, severity='INFO', user_id=None):
+    """Log actions to the ActivityLog table"""
+    try:
+        cur = conn.cursor()
+
+        if not user_id:
+            user_id = get_current_user()
+            if not user_id:
+                logging.error("Cannot create log entry without valid user ID")
+                return
+
+        details = f"{subject}"
+        if description:
+            details += f": {description}"
+
+        log_id = str(uuid.uuid4())
+
+        log_sql = """
+        INSERT INTO "ActivityLog" (
+            "id", "action", "entityType", "entityId", "details",
+            "severity", "userId", "createdAt"
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+
+        now = datetime.now()
+        cur.execute(log_sql, (
+            log_id,
+            action,
+            entity_type,
+            entity_id,
+            details,
+            severity,
+            user_id,
+            now
+        ))
+
+        conn.commit()
+        logging.info(f"ActivityLog created: {log_id} - {action} - {entity_type}")
+        return log_id
+
+    except Exception as e:
+        logging.error(f"Failed to create ActivityLog: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None
@@ -0,0 +1,166 @@
+import os
+import re
+import logging
+
+from .reader import sniff_workbook
+
+# Registry of known report layouts, checked in order (first match wins).
+# A layout matches on the sheet count, the sheet names and a few cells from
+# the first rows; it either routes the file to a report profile or rejects
+# it with a reason. Only the sheet list and the rows referenced in "cells"
+# are read, never the whole workbook.
+#
+#   "min_sheets"/"max_sheets": allowed number of sheets
+#   "sheet_names": {sheet index: regex the sheet name must match}
+#   "cells": {(sheet index, row, column): regex the cell text must match}
+#   "profile": report profile name, or None for known but unsupported layouts
+#   "reject_reason": why a file with this layout is not imported here
+#   "entity_name": (sheet index, row, column, regex) whose first group names
+#       the provider/parking service when the filename does not
+LAYOUTS = [
+    {
+        "name": "mparking_merchant_report",
+        "description": "SDP micropayment merchant report for an mParking service",
+        "min_sheets": 4,
+        "sheet_names": {
+            0: r"mParking",
+            1: r"^VAS Report - ",
+            2: r"^VAS Prepaid Report - ",
+        },
+        "cells": {
+            (0, 1, 0): r"^Naziv grupe$",
+            (3, 0, 3): r"^\d{1,2}\.\s*\d{1,2}\.",
+        },
+        "profile": "parking",
+        "entity_name": (0, None, None, r"mParking_(.+)$"),
+    },
+    {
+        "name": "vas_merchant_report",
+        "description": "SDP micropayment merchant report for a VAS provider",
+        "min_sheets": 4,
+        "sheet_names": {
+            1: r"^VAS Report - ",
+            2: r"^VAS Prepaid Report - ",
+        },
+        "cells": {
+            (0, 1, 0): r"^Naziv grupe$",
+            (3, 0, 3): r"^\d{1,2}\.\s*\d{1,2}\.",
+        },
+        "profile": "vas",
+        "entity_name": (0, 0, 0, r"^(\w[^-]*?)\s+-\s+"),
+    },
+    {
+        "name": "merchant_report_summary_only",
+        "description": "SDP merchant report without per-service daily sheets",
+        "max_sheets": 3,
+        "sheet_names": {
+            1: r"^VAS Report - ",
+            2: r"^VAS Prepaid Report - ",
+        },
+        "cells": {
+            (0, 1, 0): r"^Naziv grupe$",
+        },
+        "profile": None,
+        "reject_reason": "report has only summary sheets, there are no daily transactions to import",
+    },
+    {
+        "name": "postpaid_tracking",
+        "description": "Postpaid tracking report (Ponuđač / Proizvod / Mesec pružanja usluge)",
+        "max_sheets": 1,
+        "cells": {
+            (0, 0, 0): r"^Ponuđač:",
+            (0, 4, 0): r"^Proizvod$",
+            (0, 4, 1): r"^Mesec pružanja usluge",
+        },
+        "profile": None,
+        "reject_reason": "postpaid tracking reports are imported by scripts/vas-import/PostpaidServiceProcessor.ts",
+    },
+]
+
+def sniff_plan(layouts=LAYOUTS):
+    """Sheets and number of leading rows the registry needs to look at"""
+    sheet_indexes = set()
+    max_row = 0
+    for layout in layouts:
+        for sheet_idx, row, _ in layout.get("cells", {}):
+            sheet_indexes.add(sheet_idx)
+            max_row = max(max_row, row)
+        name_rule = layout.get("entity_name")
+        if name_rule and name_rule[1] is not None:
+            sheet_indexes.add(name_rule[0])
+            max_row = max(max_row, name_rule[1])
+    return sorted(sheet_indexes), max_row + 1
+
+def layout_matches(layout, sheet_names, sniffed):
+    """Check one registry entry against a sniffed workbook"""
+    if len(sheet_names) < layout.get("min_sheets", 0):
+        return False
+    if "max_sheets" in layout and len(sheet_names) > layout["max_sheets"]:
+        return False
+
+    for sheet_idx, pattern in layout.get("sheet_names", {}).items():
+        if sheet_idx >= len(sheet_names) or not re.search(pattern, sheet_names[sheet_idx]):
+            return False
+
+    for (sheet_idx, row, col), pattern in layout.get("cells", {}).items():
+        rows = sniffed.get(sheet_idx, [])
+        if row >= len(rows) or col >= len(rows[row]):
+            return False
+        if not re.search(pattern, rows[row][col]):
+            return False
+
+    return True
+
+def entity_name_from_layout(layout, sheet_names, sniffed):
+    """Provider/parking service name taken from the workbook content"""
+    rule = layout.get("entity_name")
+    if not rule:
+        return None
+
+    sheet_idx, row, col, pattern = rule
+    if row is None:
+        text = sheet_names[sheet_idx] if sheet_idx < len(sheet_names) else ""
+    else:
+        rows = sniffed.get(sheet_idx, [])
+        text = rows[row][col] if row < len(rows) and col < len(rows[row]) else ""
+
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else None
+
+def detect_layout(input_file, layouts=LAYOUTS):
+    """Match a report against the layout registry by sniffing only its first rows.
+
+    Returns a dict with the matched layout name, the profile name (None when
+    the file should be rejected), a rejection reason and an optional entity
+    name read from the workbook.
+    """
+    filename = os.path.basename(input_file)
+    sheet_indexes, max_rows = sniff_plan(layouts)
+
+    try:
+        sheet_names, sniffed = sniff_workbook(input_file, sheet_indexes, max_rows)
+    except Exception as e:
+        logging.warning(f"Could not read {filename} as a workbook: {e}")
+        return {
+            "layout": None,
+            "profile": None,
+            "reason": f"not a readable Excel workbook: {e}",
+            "entity_name": None,
+        }
+
+    for layout in layouts:
+        if layout_matches(layout, sheet_names, sniffed):
+            logging.info(f"Detected layout '{layout['name']}' for {filename}")
+            return {
+                "layout": layout["name"],
+                "profile": layout.get("profile"),
+                "reason": layout.get("reject_reason"),
+                "entity_name": entity_name_from_layout(layout, sheet_names, sniffed),
+            }
+
+    return {
+        "layout": None,
+        "profile": None,
+        "reason": f"unknown report layout (sheets: {', '.join(sheet_names[:5])})",
+        "entity_name": None,
+    }
@@ -0,0 +1,487 @@
+import os
+import glob
+import json
+import time
+import logging
+import argparse
+
+from .db import (
+    init_db_pool, close_db_pool, get_db_connection, return_db_connection,
+    test_database_connection, get_current_user, set_current_user, log_to_database
+)
+from .profiles import (
+    PROFILES, FOLDER_PATH, PROCESSED_FOLDER, ERROR_FOLDER, DATA_FOLDER,
+    get_profile
+)
+from .detect import detect_layout
+from .reader import READER_BACKENDS, set_reader_backend
+from .parser import extract_entity_name, normalize_entity_name
+from .parser import TRANSACTION_GROUPS
+from .cache import cached_parse, set_parse_cache, file_digest
+from .checkpoints import (
+    STAGES, claim_checkpoint, clear_checkpoint, set_stage, finish_checkpoint, reap_stale
+)
+from .resolver import get_or_create_entity, find_entity, update_entity_file_info, resolve_services
+from .batch import record_count, service_codes
+from .sinks import SINK_NAMES, group_sinks, active_groups, load_stream, deliver_stream
+from .partitions import convert_to_partitioned, attach_partition, detach_partition
+from .validate import ValidationError, validate_streams, enforce, write_report
+from .archiver import move_file_to_entity_directory, move_to_error_folder, report_period
+from .progress import set_progress, set_context, emit
+
+def ensure_folders():
+    """Create folders if they don't exist"""
+    for folder in (FOLDER_PATH, PROCESSED_FOLDER, ERROR_FOLDER, DATA_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+
+def list_input_files(folder=FOLDER_PATH):
+    """Get all Excel files from the input folder"""
+    excel_files = glob.glob(os.path.join(folder, "*.xlsx"))
+    excel_files.extend(glob.glob(os.path.join(folder, "*.xls")))
+    return sorted(excel_files)
+
+def process_excel(profile, input_file, user_id, detected_name=None, sinks=None, file_hash=None, streams=None, entity=None):
+    """Parse one report (unless already parsed) and resolve its provider/parking service and services.
+
+    entity (an ID or name) names the entity the report belongs to instead of its file name.
+    """
+    conn = None
+    filename = os.path.basename(input_file)
+    sinks = sinks or group_sinks(profile)
+    try:
+        if streams is None:
+            streams = cached_parse(profile, input_file, active_groups(sinks), file_hash)
+        if not any(streams.values()):
+            logging.warning(f"No records parsed from {filename}")
+            return None
+
+        conn = get_db_connection()
+        log_to_database(
+            conn,
+            entity_type="System",
+            entity_id="start",
+            action="PROCESS_START",
+            subject=f"Started processing {filename}",
+            user_id=user_id
+        )
+
+        entity_name = entity
+        if not entity_name:
+            entity_name = extract_entity_name(profile, filename)
+            if entity_name.startswith("Unknown") and detected_name:
+                entity_name = normalize_entity_name(profile, detected_name)
+            logging.info(f"Extracted {profile['label']}: {entity_name}")
+
+        if entity or not profile["create_entities"]:
+            entity_id, entity_name = find_entity(conn, profile, entity_name)
+            entity_created = False
+        else:
+            entity_id, entity_created = get_or_create_entity(conn, profile, entity_name)
+        if not entity_id:
+            raise Exception(f"Could not get/create {profile['label']} for {entity or entity_name}")
+
+        if profile["track_import_status"]:
+            update_entity_file_info(
+                conn,
+                profile,
+                entity_id,
+                filename,
+                input_file,
+                os.path.getsize(input_file),
+                "in_progress",
+                user_id
+            )
+
+        if entity_created:
+            log_to_database(
+                conn,
+                entity_type=profile["entity_table"],
+                entity_id=entity_id,
+                action="CREATE",
+                subject=f"Created {profile['label']} for {entity_name}",
+                user_id=user_id
+            )
+
+        # Services are only created for groups that are loaded into the transaction table
+        service_id_mapping = {}
+        for group, batches in streams.items():
+            if sinks[group] != "transactions":
+                continue
+            codes = service_codes(batches) - set(service_id_mapping)
+            service_id_mapping.update(
+                resolve_services(conn, profile, entity_id, codes, user_id, group.upper())
+            )
+
+        for batches in streams.values():
+            for batch in batches:
+                batch.resolve(entity_id, service_id_mapping)
+
+        counts = ", ".join(f"{record_count(batches)} {group}" for group, batches in streams.items())
+        logging.info(f"Processed {input_file}: {counts} records")
+
+        return {
+            'profile': profile,
+            'streams': streams,
+            'entity_id': entity_id,
+            'entity_name': entity_name,
+            'filename': filename,
+            'current_user_id': user_id
+        }
+
+    except Exception as e:
+        logging.error(f"Error processing file {input_file}: {e}")
+        try:
+            if conn:
+                log_to_database(
+                    conn,
+                    entity_type="System",
+                    entity_id="error",
+                    action="PROCESS_ERROR",
+                    subject=f"Error processing {filename}",
+                    description=str(e),
+                    severity="ERROR",
+                    user_id=user_id
+                )
+        except Exception as log_error:
+            logging.error(f"Failed to log error: {log_error}")
+        raise
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+def import_file(profile, input_file, user_id, detected_name, sinks, restart=False, strict_validation=False, entity=None):
+    """Parse, resolve, load and archive one report under its import checkpoint.
+
+    The checkpoint advances with every stage and every committed batch; a
+    file whose import died part way is resumed from there (its parse comes
+    from the parse cache). The result carries the summed load counts and,
+    for a file whose content was imported before, "already_imported" and the
+    file name of that import. Returns None when another live run owns the file.
+    """
+    file_hash = file_digest(input_file)
+
+    # Parse and validate before any database work, so a broken file is rejected in milliseconds
+    streams = cached_parse(profile, input_file, active_groups(sinks), file_hash)
+    report = validate_streams(profile, streams, os.path.basename(input_file))
+    try:
+        enforce(report, strict_validation)
+    except ValidationError:
+        write_report(report, ERROR_FOLDER)
+        raise
+
+    conn = get_db_connection()
+    try:
+        if restart:
+            clear_checkpoint(conn, profile, file_hash)
+        checkpoint = claim_checkpoint(conn, profile, file_hash, input_file, user_id)
+    finally:
+        return_db_connection(conn)
+
+    if checkpoint is None:
+        logging.warning(f"Skipping {os.path.basename(input_file)}: another run is importing it")
+        return None
+    already_imported = checkpoint["status"] == "completed"
+
+    conn = get_db_connection()
+    try:
+        result = process_excel(profile, input_file, user_id, detected_name, sinks, file_hash, streams, entity)
+        if not result:
+            finish_checkpoint(conn, checkpoint, "failed", "No records parsed")
+            return {'streams': {}, 'filename': os.path.basename(input_file)}
+
+        set_stage(conn, checkpoint, max(checkpoint["stage"], "resolved", key=STAGES.index), result['entity_id'])
+
+        counts = {'inserted': 0, 'updated': 0, 'errors': 0}
+        for group in TRANSACTION_GROUPS:
+            if group in result['streams']:
+                loaded = load_stream(profile, group, result['streams'][group], sinks[group], checkpoint,
+                                     (result['filename'], user_id))
+                for key, value in (loaded or {}).items():
+                    counts[key] += value
+        set_stage(conn, checkpoint, "loaded")
+        result['counts'] = counts
+        if already_imported:
+            logging.info(f"{result['filename']} was imported before as {checkpoint['fileName']}, nothing loaded")
+            result['already_imported'] = checkpoint['fileName']
+
+        move_file_to_entity_directory(
+            profile,
+            input_file,
+            result['entity_id'],
+            result['entity_name'],
+            result['filename'],
+            user_id,
+            report_period(result['streams'], result['filename']),
+            file_hash
+        )
+        set_stage(conn, checkpoint, "archived")
+        finish_checkpoint(conn, checkpoint, "completed")
+        return result
+
+    except Exception as e:
+        # The offset stays, so moving the file back from scripts/errors/ resumes the load
+        finish_checkpoint(conn, checkpoint, "failed", str(e))
+        raise
+    finally:
+        return_db_connection(conn)
+
+def run(profile=None, files=None, sink_overrides=None, restart=False, strict_validation=False, entity=None):
+    """Process report files with a fixed profile, or route each file to its profile when none is given"""
+    ensure_folders()
+
+    if not test_database_connection():
+        logging.error("Database connection failed. Exiting.")
+        return False
+
+    init_db_pool()
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            logging.error("No valid user ID available for logging")
+            return False
+
+        conn = get_db_connection()
+        try:
+            reap_stale(conn, [profile] if profile else PROFILES.values())
+        finally:
+            return_db_connection(conn)
+
+        excel_files = files if files is not None else list_input_files()
+        if not excel_files:
+            logging.info("No Excel files found in input folder")
+            return True
+
+        logging.info(f"Found {len(excel_files)} Excel files to process")
+
+        streams_by_profile = {}
+        started = time.monotonic()
+        outcomes = {"imported": 0, "already_imported": 0, "failed": 0, "skipped": 0}
+        imported_records = 0
+        emit("start", files=len(excel_files))
+
+        for index, file_path in enumerate(excel_files, 1):
+            set_context(file=os.path.basename(file_path))
+            status, records, error = "failed", 0, None
+            done = {}
+            try:
+                detection = detect_layout(file_path)
+                if not detection["profile"]:
+                    error = detection["reason"]
+                    logging.warning(f"Rejected {os.path.basename(file_path)}: {error}")
+                    move_to_error_folder(file_path)
+                    continue
+
+                if profile and detection["profile"] not in profile["layout_profiles"]:
+                    status = "skipped"
+                    logging.info(f"Leaving {os.path.basename(file_path)} for the {detection['profile']} processor")
+                    continue
+
+                file_profile = profile or get_profile(detection["profile"])
+                emit("file", index=index, total=len(excel_files), profile=file_profile["name"])
+
+                try:
+                    logging.info(f"Processing {file_profile['name']} file: {os.path.basename(file_path)}")
+
+                    sinks = group_sinks(file_profile, sink_overrides)
+                    result = import_file(
+                        file_profile, file_path, user_id, detection["entity_name"], sinks, restart, strict_validation, entity
+                    )
+
+                    if result is None:
+                        status = "skipped"
+                        continue
+                    records = sum(record_count(batches) for batches in result['streams'].values())
+                    done = dict(result.get('counts', {}))
+                    if result.get('already_imported'):
+                        done['imported_as'] = result['already_imported']
+                    if records:
+                        status = "already_imported" if result.get('already_imported') else "imported"
+                        profile_streams = streams_by_profile.setdefault(file_profile["name"], {})
+                        for group, batches in result['streams'].items():
+                            profile_streams.setdefault(group, []).extend(batches)
+                        logging.info(f"Successfully processed and moved: {result['filename']}")
+                    else:
+                        error = "No records found"
+                        move_to_error_folder(file_path)
+                        logging.warning(f"No records found, moved to error folder: {os.path.basename(file_path)}")
+
+                except Exception as e:
+                    error = str(e)
+                    logging.error(f"Error processing file {os.path.basename(file_path)}: {e}")
+                    move_to_error_folder(file_path)
+                    continue
+            finally:
+                outcomes[status] += 1
+                imported_records += records
+                emit("file_done", status=status, records=records, **done, **({"error": error} if error else {}))
+                set_context(file=None)
+
+        emit("summary", files=len(excel_files), records=imported_records,
+             seconds=round(time.monotonic() - started, 2), **outcomes)
+
+        if not streams_by_profile:
+            logging.info("No records to save")
+            return True
+
+        for name, profile_streams in streams_by_profile.items():
+            file_profile = PROFILES[name]
+            sinks = group_sinks(file_profile, sink_overrides)
+            for group, batches in profile_streams.items():
+                deliver_stream(file_profile, group, batches, sinks[group])
+
+        return True
+
+    except Exception as e:
+        logging.error(f"Main process error: {e}")
+        raise
+    finally:
+        close_db_pool()
+
+def validate_files(profile=None, files=None, sink_overrides=None, strict_validation=False):
+    """Parse and validate report files without touching the database or moving them; prints one JSON report per file"""
+    ok = True
+    for file_path in (files if files is not None else list_input_files()):
+        detection = detect_layout(file_path)
+        if not detection["profile"] or (profile and detection["profile"] not in profile["layout_profiles"]):
+            continue
+        file_profile = profile or get_profile(detection["profile"])
+        sinks = group_sinks(file_profile, sink_overrides)
+        streams = cached_parse(file_profile, file_path, active_groups(sinks))
+        report = validate_streams(file_profile, streams, os.path.basename(file_path))
+        try:
+            enforce(report, strict_validation)
+        except ValidationError:
+            ok = False
+        print(json.dumps(report, ensure_ascii=False))
+    return ok
+
+def maintain(task, label):
+    """Run a maintenance task with a pooled connection; task(conn) commits its own work"""
+    if not test_database_connection():
+        logging.error("Database connection failed. Exiting.")
+        return False
+
+    init_db_pool()
+    conn = None
+    try:
+        conn = get_db_connection()
+        task(conn)
+        return True
+    except Exception as e:
+        logging.error(f"{label} failed: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            return_db_connection(conn)
+        close_db_pool()
+
+def partition(profile=None, attach=None, detach=None):
+    """Convert transaction tables to monthly partitions, or attach/detach one month of a profile's table.
+
+    Without a profile only the tables of profiles with "monthly_partitions" (VAS and parking) are converted.
+    """
+    def task(conn):
+        if attach:
+            attach_partition(conn, profile, attach)
+        elif detach:
+            detach_partition(conn, profile, detach)
+        else:
+            for file_profile in ([profile] if profile else
+                                 [p for p in PROFILES.values() if p["monthly_partitions"]]):
+                convert_to_partitioned(conn, file_profile)
+    return maintain(task, "Partition maintenance")
+
+def main(default_profile=None, argv=None):
+    """Command line entry point shared by the report processors"""
+    parser = argparse.ArgumentParser(description="Import provider and parking service Excel reports")
+    parser.add_argument("user_id", nargs="?", help="ID of the user running the import")
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES) + ["auto"],
+        default=default_profile or "auto",
+        help="report profile to use; 'auto' routes each file by its detected layout"
+    )
+    parser.add_argument(
+        "--entity",
+        help="ID or name of the provider/parking service/organization all files belong to (default: from each file name)"
+    )
+    parser.add_argument(
+        "--prepaid-sink",
+        choices=SINK_NAMES,
+        help="where prepaid records go (default: the profile setting, transactions)"
+    )
+    parser.add_argument(
+        "--postpaid-sink",
+        choices=SINK_NAMES,
+        help="where postpaid records go (default: the profile setting, csv)"
+    )
+    parser.add_argument(
+        "--reader",
+        choices=["auto"] + list(READER_BACKENDS),
+        default="auto",
+        help="spreadsheet reader backend; 'auto' picks by file extension and falls back on failure"
+    )
+    parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="always re-read the spreadsheets instead of reusing cached parses from scripts/cache/"
+    )
+    parser.add_argument(
+        "--strict-validation",
+        action="store_true",
+        help="reject files on validation warnings too (e.g. duplicate service/date keys)"
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="only parse and validate the files, printing a JSON report per file"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore import checkpoints and load the given files from the start"
+    )
+    parser.add_argument(
+        "--partition-tables",
+        action="store_true",
+        help="convert the VAS and parking transaction tables (or the --profile table) to monthly range partitions on date instead of importing"
+    )
+    parser.add_argument(
+        "--detach-partition",
+        metavar="YYYY-MM",
+        help="detach one month's partition of the profile's transaction table for archival"
+    )
+    parser.add_argument(
+        "--attach-partition",
+        metavar="YYYY-MM",
+        help="attach a previously detached month back to the profile's transaction table"
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="write JSON-lines progress events to stdout and the log to stderr"
+    )
+    parser.add_argument("files", nargs="*", help="report files to process (default: everything in scripts/input/)")
+    args = parser.parse_args(argv)
+
+    if args.user_id:
+        set_current_user(args.user_id)
+    set_reader_backend(args.reader)
+    set_parse_cache(not args.no_parse_cache)
+    set_progress(args.progress)
+
+    profile = None if args.profile == "auto" else get_profile(args.profile)
+    sink_overrides = {"prepaid": args.prepaid_sink, "postpaid": args.postpaid_sink}
+    if args.attach_partition or args.detach_partition:
+        if not profile:
+            parser.error("--attach-partition and --detach-partition need a --profile")
+        return 0 if partition(profile, args.attach_partition, args.detach_partition) else 1
+    if args.partition_tables:
+        return 0 if partition(profile) else 1
+    if args.validate_only:
+        return 0 if validate_files(profile, args.files or None, sink_overrides, args.strict_validation) else 1
+
+    ok = run(profile, args.files or None, sink_overrides, args.restart, args.strict_validation, args.entity)
+    return 0 if ok else 1
@@ -0,0 +1,175 @@
+import os
+import sys
+import logging
+import argparse
+from datetime import date, timedelta
+
+from .db import init_db_pool, get_db_connection, return_db_connection, close_db_pool
+from .profiles import PROFILES, get_profile
+from .parser import TRANSACTION_GROUPS
+from .partitions import month_bounds
+
+# Transactions are streamed out of the database instead of being loaded as a
+# whole: CSV goes through COPY ... TO STDOUT straight into the output file,
+# XLSX reads a named (server-side) cursor EXPORT_FETCH_SIZE rows at a time
+# into an openpyxl write-only workbook. Memory use does not grow with the
+# number of exported rows.
+EXPORT_FORMATS = ("csv", "xlsx")
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "5000"))
+
+# Excel's row limit; longer exports continue on a new sheet
+XLSX_MAX_ROWS = 1048576
+
+EXPORT_COLUMNS = ("date", "entity", "service", "group", "price", "quantity", "amount")
+
+def export_query(profile, entity=None, service=None, date_from=None, date_to=None, group=None):
+    """Build the export SELECT and its parameters for a profile's transactions.
+
+    entity matches the provider/parking service/organization id or name
+    (case-insensitive), service the service id or code; date_to is inclusive.
+    group is "prepaid" or "postpaid", mapped to the value the profile's group
+    column stores.
+    """
+    table = profile["transaction_table"]
+    entity_table = profile["entity_table"]
+    entity_key = profile["entity_key"]
+    group_column = profile["group_column"]
+    conditions = []
+    params = []
+    if entity:
+        conditions.append('(e."id" = %s OR LOWER(e."name") = LOWER(%s))')
+        params += [entity, entity]
+    if service:
+        conditions.append('(t."serviceId" = %s OR t."serviceName" = %s)')
+        params += [service, service]
+    if date_from:
+        conditions.append('t."date" >= %s')
+        params.append(date_from)
+    if date_to:
+        # Dates are stored as midnight timestamps; the bound is exclusive so partitions prune cleanly
+        conditions.append('t."date" < %s')
+        params.append(date_to + timedelta(days=1))
+    if group:
+        conditions.append(f't."{group_column}" = %s')
+        params.append(profile["group_values"][group] if profile["group_values"] else group)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f'''
+        SELECT to_char(t."date", 'YYYY-MM-DD') AS "date", e."name" AS "entity", t."serviceName" AS "service",
+               t."{group_column}" AS "group", t."price", t."quantity", t."amount"
+        FROM "{table}" t
+        JOIN "{entity_table}" e ON e."id" = t."{entity_key}"
+        {where}
+        ORDER BY t."date", e."name", t."serviceName", t."{group_column}"
+    '''
+    return sql, params
+
+def period_bounds(month=None, date_from=None, date_to=None):
+    """First and last export day from a YYYY-MM month and/or explicit YYYY-MM-DD dates"""
+    start = date.fromisoformat(date_from) if date_from else None
+    end = date.fromisoformat(date_to) if date_to else None
+    if month:
+        first, after = month_bounds(month)
+        start = max(start, first) if start else first
+        end = min(end, after - timedelta(days=1)) if end else after - timedelta(days=1)
+    return start, end
+
+def export_csv(conn, sql, params, output):
+    """Stream query results into a CSV file (or stdout for "-") with COPY TO STDOUT; returns the row count"""
+    cur = conn.cursor()
+    copy_sql = f"COPY ({cur.mogrify(sql, params).decode()}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+    if output == "-":
+        cur.copy_expert(copy_sql, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        with open(output, "wb") as fout:
+            # Same UTF-8 BOM as the importer's CSV output, so Excel opens Latin/Cyrillic names correctly
+            fout.write(b"\xef\xbb\xbf")
+            cur.copy_expert(copy_sql, fout)
+    rows = cur.rowcount
+    cur.close()
+    return rows
+
+def export_xlsx(conn, sql, params, output, title):
+    """Stream query results from a named server-side cursor into a write-only XLSX workbook; returns the row count"""
+    import openpyxl
+
+    book = openpyxl.Workbook(write_only=True)
+    cur = conn.cursor(name="transaction_export")
+    cur.itersize = EXPORT_FETCH_SIZE
+    cur.execute(sql, params)
+
+    rows = 0
+    sheet = None
+    sheet_rows = XLSX_MAX_ROWS
+    for row in cur:
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheet = book.create_sheet(title if sheet is None else f"{title} {len(book.worksheets) + 1}")
+            sheet.append(EXPORT_COLUMNS)
+            sheet_rows = 1
+        sheet.append(row)
+        sheet_rows += 1
+        rows += 1
+    cur.close()
+
+    if sheet is None:
+        book.create_sheet(title).append(EXPORT_COLUMNS)
+    book.save(output)
+    return rows
+
+def export_transactions(profile, output, fmt="csv", entity=None, service=None,
+                        date_from=None, date_to=None, group=None):
+    """Export a profile's transactions matching the filters; returns the number of exported rows"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (known: {', '.join(EXPORT_FORMATS)})")
+    if fmt == "xlsx" and output == "-":
+        raise ValueError("XLSX exports need an output file")
+
+    sql, params = export_query(profile, entity, service, date_from, date_to, group)
+    init_db_pool()
+    conn = None
+    try:
+        conn = get_db_connection()
+        # Read-only snapshot: a long export sees one consistent state while imports keep running
+        conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+        if fmt == "csv":
+            rows = export_csv(conn, sql, params, output)
+        else:
+            rows = export_xlsx(conn, sql, params, output, profile["transaction_table"])
+        conn.commit()
+        logging.info(f"Exported {rows} {profile['transaction_table']} rows to {output}")
+        return rows
+
+    except Exception as e:
+        logging.error(f"Export of {profile['transaction_table']} failed: {e}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            conn.set_session(readonly=False, isolation_level="DEFAULT")
+            return_db_connection(conn)
+        close_db_pool()
+
+def main(argv=None):
+    """Command line entry point of the transaction exporter"""
+    parser = argparse.ArgumentParser(description="Export parking, VAS or humanitarian transactions to CSV or XLSX")
+    parser.add_argument("--profile", choices=sorted(PROFILES), required=True, help="which transactions to export")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="output format")
+    parser.add_argument("--output", "-o", default="-", help="output file; '-' writes CSV to stdout")
+    parser.add_argument("--entity", help="provider / parking service / humanitarian organization id or name")
+    parser.add_argument("--service", help="service id or code")
+    parser.add_argument("--group", choices=TRANSACTION_GROUPS, help="only one transaction group")
+    parser.add_argument("--month", metavar="YYYY-MM", help="only one month")
+    parser.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD", help="first day to export")
+    parser.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD", help="last day to export")
+    args = parser.parse_args(argv)
+
+    try:
+        date_from, date_to = period_bounds(args.month, args.date_from, args.date_to)
+        export_transactions(get_profile(args.profile), args.output, args.format, args.entity,
+                            args.service, date_from, date_to, args.group)
+        return 0
+    except Exception as e:
+        logging.error(f"Export failed: {e}")
+        return 1
@@ -0,0 +1,137 @@
+import csv
+import logging
+from datetime import datetime
+
+from .parser import convert_date_format
+from .batch import record_count
+from .checkpoints import resume_offset
+from .storage import open_store
+from .progress import emit_rows
+
+BATCH_SIZE = 50
+
+def csv_fieldnames(profile):
+    """CSV columns for a report profile"""
+    return [profile["entity_key"], "serviceId", "group", "serviceName", "price", "date", "quantity", "amount"]
+
+def save_to_csv(profile, batches, output_file):
+    """Save record batches to CSV"""
+    if not record_count(batches):
+        return
+
+    try:
+        with open(output_file, "w", newline="", encoding="utf-8-sig") as fout:
+            writer = csv.writer(fout)
+            writer.writerow(csv_fieldnames(profile))
+            for batch in batches:
+                group = batch.group
+                writer.writerows(
+                    (entity_id, service_id, group, service_name, price, date, quantity, amount)
+                    for entity_id, service_id, service_name, _, price, date, quantity, amount in batch.rows()
+                )
+    except Exception as e:
+        logging.error(f"Error saving CSV: {e}")
+        raise
+
+def sanitize_records(profile, batches, group):
+    """Sanitize records and keep the last one per conflict key, like sequential upserts would.
+
+    Returns (rows, skipped) where each row is
+    (entityId, serviceId, date, group, serviceCode, price, quantity, amount).
+    """
+    unique = {}
+    skipped = 0
+    # Profiles whose unique key has the price instead of the group (one service listed at two prices)
+    price_key = "price" in profile["conflict_columns"]
+    for batch in batches:
+        if batch.group != group:
+            skipped += len(batch)
+            continue
+        # Header dates are converted once per sheet instead of once per record
+        dates = [convert_date_format(d) for d in batch.dates]
+        for entity_id, service_id, _, service_code, price, d, quantity, amount in batch.rows(dates):
+            if d and service_code and service_id and quantity > 0:
+                key = (entity_id, d, service_code, price if price_key else group)
+                unique[key] = (entity_id, service_id, d, group, service_code, price or 0, quantity, amount or 0)
+            else:
+                skipped += 1
+    return list(unique.values()), skipped
+
+def import_records(profile, batches, group="prepaid", checkpoint=None, source=None):
+    """Upsert one group's record batches into the profile's transaction table in batches.
+
+    With a checkpoint, loading starts after the rows a previous run already
+    committed, and the committed offset is recorded with every batch. Writes
+    go to the store of the current storage backend (see ingestion.storage).
+    """
+    store = None
+    try:
+        sanitized_data, skipped = sanitize_records(profile, batches, group)
+
+        if skipped:
+            logging.warning(f"Skipped {skipped} records without date, service or quantity")
+
+        if not sanitized_data:
+            return {'inserted': 0, 'updated': 0, 'errors': 0}
+
+        total = len(sanitized_data)
+        first = resume_offset(checkpoint, group, total)
+        if first is None:
+            logging.info(f"{group} records already loaded by a previous run, skipping")
+            return {'inserted': 0, 'updated': 0, 'errors': 0}
+        if first:
+            logging.info(f"Resuming {group} import at record {first} of {total}")
+
+        logging.info(f"First record data: {sanitized_data[0]}")
+
+        store = open_store()
+        store.prepare(profile, {row[2][:7] for row in sanitized_data})
+        inserted_count = 0
+        updated_count = 0
+        error_count = 0
+        now = datetime.now()
+
+        for start in range(first, total, BATCH_SIZE):
+            batch = sanitized_data[start:start + BATCH_SIZE]
+            try:
+                results = store.upsert(profile, batch, now, source)
+                if checkpoint:
+                    store.record_batch(checkpoint, group, start + len(batch), total)
+                store.commit()
+                batch_inserted = sum(1 for inserted in results if inserted)
+                inserted_count += batch_inserted
+                updated_count += len(results) - batch_inserted
+
+            except Exception as e:
+                # Retry the failed batch row by row so one bad record does not drop the rest
+                logging.error(f"Batch starting at record {start} failed, retrying row by row: {e}")
+                store.rollback()
+                for offset, row in enumerate(batch):
+                    try:
+                        result = store.upsert(profile, [row], now, source)
+                        if checkpoint:
+                            store.record_batch(checkpoint, group, start + offset + 1, total)
+                        store.commit()
+                        if result and result[0]:
+                            inserted_count += 1
+                        else:
+                            updated_count += 1
+                    except Exception as row_error:
+                        error_count += 1
+                        logging.error(f"Error on record {start + offset}: {row_error}")
+                        store.rollback()
+                        # A rejected row is skipped for good, so the checkpoint still moves past it
+                        if checkpoint:
+                            store.record_batch(checkpoint, group, start + offset + 1, total)
+                            store.commit()
+            emit_rows(group, start + len(batch), total)
+
+        logging.info(f"Import of {group} completed: {inserted_count} inserted, {updated_count} updated, {error_count} errors")
+        return {'inserted': inserted_count, 'updated': updated_count, 'errors': error_count}
+
+    except Exception as e:
+        logging.exception("IMPORT FAILURE:")
+        raise
+    finally:
+        if store:
+            store.close()
@@ -0,0 +1,208 @@
+import os
+import re
+import logging
+from datetime import datetime
+
+from .reader import iter_sheet_rows
+from .batch import RecordBatch
+from .progress import emit
+
+SERVICE_CODE_PATTERN = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+GROUP_KEYWORDS = ["prepaid", "postpaid", "total"]
+# Groups that carry transactions; "total" rows are the sum of both
+TRANSACTION_GROUPS = ("prepaid", "postpaid")
+# Bump whenever parse_sheet output changes, so cached parses are not reused
+PARSER_VERSION = 2
+
+def extract_service_code(service_name):
+    """Extract first four digits from serviceName"""
+    if not service_name:
+        return None
+
+    match = SERVICE_CODE_PATTERN.search(str(service_name))
+
+    if match:
+        extracted_code = match.group(1)
+        logging.debug(f"Extracted service code '{extracted_code}' from '{service_name}'")
+        return extracted_code
+    else:
+        logging.warning(f"No valid 4-digit code found in: {service_name}")
+        return None
+
+def convert_to_float(val):
+    """Convert value to float"""
+    if isinstance(val, str):
+        val = val.replace(",", "").strip()
+        try:
+            return float(val)
+        except ValueError:
+            return None
+    try:
+        return float(val)
+    except:
+        return None
+
+def clean_date(date_val):
+    """Clean date values"""
+    if isinstance(date_val, str):
+        date_val = date_val.strip()
+        date_val = re.sub(r'\s+', ' ', date_val)
+        date_val = date_val.replace(" ", "")
+        date_val = date_val.rstrip('.')
+    return date_val
+
+def convert_date_format(date_str):
+    """Convert date to YYYY-MM-DD format"""
+    if not date_str:
+        return None
+
+    try:
+        cleaned_date = ''.join(c for c in str(date_str) if c.isdigit() or c == '.')
+
+        if cleaned_date.count('.') == 2:
+            parts = cleaned_date.split('.')
+            if len(parts) == 3:
+                day, month, year = parts
+                if len(year) == 2:
+                    year = f'20{year}'
+                return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+
+        return None
+
+    except Exception as e:
+        return None
+
+def extract_year_from_filename(filename):
+    """Extract year from filename"""
+    try:
+        year_match = re.search(r'(\d{4})', filename)
+        if year_match:
+            year = int(year_match.group(1))
+            current_year = datetime.now().year
+            if 2000 <= year <= current_year + 1:
+                return str(year)
+
+        return str(datetime.now().year)
+    except Exception as e:
+        logging.warning(f"Could not extract year from filename {filename}: {e}")
+        return str(datetime.now().year)
+
+def normalize_entity_name(profile, name):
+    """Normalize a provider/parking service name the way the profile stores it"""
+    if profile["title_case_names"]:
+        name = name.replace("_", " ").title()
+        name = re.sub(r'\d{4,}', '', name).strip()
+    return name
+
+def extract_entity_name(profile, filename):
+    """Extract provider/parking service name from filename using the profile patterns"""
+    try:
+        for pattern in profile["name_patterns"]:
+            match = re.search(pattern, filename)
+            if match:
+                return normalize_entity_name(profile, match.group(1))
+
+        return f"Unknown_{os.path.basename(filename)[:10]}"
+
+    except Exception as e:
+        logging.error(f"Error extracting {profile['label']} name from {filename}: {e}")
+        return "Unknown"
+
+def parse_sheet(rows, groups=TRANSACTION_GROUPS, sheet_name=None, service_key="code"):
+    """Parse one report sheet into a record batch per group.
+
+    The sheet has dates in the header from column 3 on (optionally closed by a
+    TOTAL column), group marker rows ("prepaid", "postpaid", "total") and a
+    quantity row followed by an amount row for every service. Every requested
+    group is collected in the same pass over the rows. With service_key
+    "name" the full service name stands in for the service code.
+    """
+    if not rows:
+        return {group: RecordBatch(sheet_name, group, []) for group in groups}
+
+    header = [str(x).strip() for x in rows[0]]
+    has_total = header[-1].upper() == "TOTAL"
+    date_cols = [clean_date(d) for d in (header[3:-1] if has_total else header[3:])]
+    batches = {group: RecordBatch(sheet_name, group, date_cols) for group in groups}
+
+    current_group = "prepaid"
+
+    i = 1
+    while i < len(rows):
+        row = [str(x).strip() for x in rows[i]]
+        if not any(row):
+            i += 1
+            continue
+
+        if len(row) > 1 and "total" in row[1].lower():
+            i += 1
+            continue
+
+        if i == 1 and ("servis" in row[0].lower() or "izveštaj" in row[0].lower()):
+            i += 1
+            continue
+
+        for kw in GROUP_KEYWORDS:
+            if kw in row[0].lower():
+                current_group = kw
+                if row[0].upper() == "TOTAL" and len(row) > 3:
+                    # Grand total row of the sheet: quantities per date, amounts on the next row
+                    next_row = [str(x).strip() for x in rows[i + 1]] if i + 1 < len(rows) else []
+                    sheet_totals = (
+                        [convert_to_float(v) for v in (row[3:-1] if has_total else row[3:])],
+                        [convert_to_float(v) for v in (next_row[3:-1] if has_total else next_row[3:])]
+                    )
+                    for batch in batches.values():
+                        batch.sheet_totals = sheet_totals
+                i += 1
+                break
+        else:
+            if row[0]:
+                service_name = row[0]
+                service_code = service_name if service_key == "name" else extract_service_code(service_name)
+                price = convert_to_float(row[1])
+
+                quantity_values = row[3:-1] if has_total else row[3:]
+
+                if i + 1 < len(rows):
+                    next_row = [str(x).strip() for x in rows[i + 1]]
+                    amount_values = next_row[3:-1] if has_total else next_row[3:]
+                else:
+                    amount_values = []
+
+                batch = batches.get(current_group)
+                if batch is not None:
+                    service = batch.add_service(
+                        service_name, service_code, price,
+                        convert_to_float(row[-1]) if has_total else None,
+                        convert_to_float(next_row[-1]) if has_total and amount_values else None
+                    )
+                    for j in range(len(date_cols)):
+                        quantity = convert_to_float(quantity_values[j]) if j < len(quantity_values) else None
+                        if quantity is None or quantity <= 0:
+                            continue
+                        amount = convert_to_float(amount_values[j]) if j < len(amount_values) else None
+                        batch.append(service, j, quantity, amount)
+                i += 2
+            else:
+                i += 1
+
+    return batches
+
+def parse_workbook(profile, input_file, groups=TRANSACTION_GROUPS):
+    """Parse every sheet the profile selects in one pass, without touching the database.
+
+    Returns {group: [RecordBatch, ...]} with one batch per sheet that has records.
+    """
+    streams = {group: [] for group in groups}
+    sheets = list(iter_sheet_rows(profile, input_file))
+    for number, (sheet_idx, sheet_name, rows) in enumerate(sheets, 1):
+        sheet_batches = parse_sheet(rows, groups, sheet_name, profile["service_key"])
+        for group, batch in sheet_batches.items():
+            if len(batch):
+                streams[group].append(batch)
+        counts = ", ".join(f"{len(batch)} {group}" for group, batch in sheet_batches.items())
+        logging.info(f"Processed sheet {sheet_name}: {counts} records")
+        emit("sheet", index=number, total=len(sheets), sheet=sheet_name,
+             records=sum(len(batch) for batch in sheet_batches.values()))
+    return streams
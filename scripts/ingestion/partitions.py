@@ -0,0 +1,204 @@
+import re
+import logging
+from datetime import date
+
+# The transaction tables can be converted to monthly range partitions on
+# "date" (--partition-tables). The importer then creates the partition for
+# every report month on demand and upserts straight into it, so conflict
+# checks and scans stay within one month. Old months can be detached for
+# archival and attached again. Tables that are not partitioned are loaded
+# exactly as before.
+MONTH_PATTERN = re.compile(r"^(\d{4})-(\d{2})$")
+
+# Transaction table -> set of months known to have a partition, or None when
+# the table is not partitioned. Filled lazily per process.
+partition_cache = {}
+
+def partition_name(table, month):
+    """Partition table name for a YYYY-MM month"""
+    year, mon = month.split("-")
+    return f"{table}_p{year}_{mon}"
+
+def month_bounds(month):
+    """First day of a YYYY-MM month and of the month after it"""
+    match = MONTH_PATTERN.match(month)
+    if not match:
+        raise ValueError(f"Invalid month '{month}', expected YYYY-MM")
+    year, mon = int(match.group(1)), int(match.group(2))
+    start = date(year, mon, 1)
+    end = date(year + mon // 12, mon % 12 + 1, 1)
+    return start, end
+
+def is_partitioned(cur, table):
+    """Whether a table is range partitioned"""
+    cur.execute('''
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = %s
+    ''', (table,))
+    return cur.fetchone() is not None
+
+def attached_months(cur, table):
+    """Months that currently have a partition attached to a table"""
+    cur.execute('''
+        SELECT child.relname FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = %s
+    ''', (table,))
+    months = set()
+    for (name,) in cur.fetchall():
+        match = re.search(r"_p(\d{4})_(\d{2})$", name)
+        if match:
+            months.add(f"{match.group(1)}-{match.group(2)}")
+    return months
+
+def ensure_partitions(conn, profile, months):
+    """Create missing monthly partitions of a profile's transaction table and commit.
+
+    Returns False when the table is not partitioned (nothing to do).
+    """
+    table = profile["transaction_table"]
+    try:
+        cur = conn.cursor()
+        if table not in partition_cache:
+            partition_cache[table] = attached_months(cur, table) if is_partitioned(cur, table) else None
+        known = partition_cache[table]
+        if known is None:
+            cur.close()
+            return False
+
+        for month in sorted(set(months) - known):
+            start, end = month_bounds(month)
+            cur.execute("SELECT to_regclass(%s)", (f'"{partition_name(table, month)}"',))
+            if cur.fetchone()[0]:
+                # Loading next to a detached archive would split the month in two
+                raise ValueError(f"{partition_name(table, month)} is detached; attach it with --attach-partition {month} first")
+            cur.execute(f'''
+                CREATE TABLE "{partition_name(table, month)}"
+                PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)
+            ''', (start, end))
+            logging.info(f"Created partition {partition_name(table, month)}")
+        conn.commit()
+        known.update(months)
+        cur.close()
+        return True
+
+    except Exception as e:
+        logging.error(f"Error creating partitions of {table}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        raise
+
+def split_by_partition(profile, rows, partitioned):
+    """Group sanitized rows by target table: their month's partition, or the plain table"""
+    table = profile["transaction_table"]
+    if not partitioned:
+        return [(table, rows)]
+    targets = {}
+    for row in rows:
+        targets.setdefault(partition_name(table, row[2][:7]), []).append(row)
+    return list(targets.items())
+
+def detach_partition(conn, profile, month):
+    """Detach a month from a profile's transaction table, leaving it as a standalone table"""
+    table = profile["transaction_table"]
+    partition = partition_name(table, month)
+    cur = conn.cursor()
+    cur.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition}"')
+    conn.commit()
+    cur.close()
+    partition_cache.pop(table, None)
+    logging.info(f"Detached {partition} from {table}")
+
+def attach_partition(conn, profile, month):
+    """Attach a previously detached month table back to a profile's transaction table"""
+    table = profile["transaction_table"]
+    partition = partition_name(table, month)
+    start, end = month_bounds(month)
+    cur = conn.cursor()
+    cur.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{partition}" FOR VALUES FROM (%s) TO (%s)', (start, end))
+    conn.commit()
+    cur.close()
+    partition_cache.pop(table, None)
+    logging.info(f"Attached {partition} to {table}")
+
+def convert_to_partitioned(conn, profile):
+    """Turn a profile's transaction table into a table partitioned by month of "date".
+
+    Runs in one transaction: the old table is renamed to <table>_unpartitioned
+    (its indexes get an _old suffix), a partitioned copy takes over its name,
+    indexes and foreign keys, one partition per month of existing data is
+    created and the rows are copied. The primary key becomes ("id", "date"),
+    since keys of a partitioned table must contain the partition column. The
+    old table is kept for verification and can be dropped afterwards.
+    """
+    table = profile["transaction_table"]
+    old = f"{table}_unpartitioned"
+    try:
+        cur = conn.cursor()
+        if is_partitioned(cur, table):
+            logging.info(f"{table} is already partitioned")
+            return False
+
+        cur.execute('''
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE tablename = %s AND indexname <> %s
+        ''', (table, f"{table}_pkey"))
+        indexes = cur.fetchall()
+        cur.execute('''
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        ''', (f'"{table}"',))
+        foreign_keys = cur.fetchall()
+        cur.execute(f'''SELECT MIN("date"), MAX("date") FROM "{table}"''')
+        first, last = cur.fetchone()
+
+        cur.execute(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{table}_pkey" TO "{old}_pkey"')
+        for name, _ in indexes:
+            cur.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:59]}_old"')
+        for name, _ in foreign_keys:
+            cur.execute(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{name}" TO "{name[:59]}_old"')
+        cur.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+
+        cur.execute(f'''
+            CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE ("date")
+        ''')
+        cur.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "date")')
+        for _, definition in indexes:
+            cur.execute(definition)
+        for name, definition in foreign_keys:
+            cur.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+        months = []
+        if first:
+            month = date(first.year, first.month, 1)
+            while month <= date(last.year, last.month, 1):
+                months.append(month.strftime("%Y-%m"))
+                month = month_bounds(months[-1])[1]
+        for month in months:
+            start, end = month_bounds(month)
+            cur.execute(f'''
+                CREATE TABLE "{partition_name(table, month)}"
+                PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)
+            ''', (start, end))
+
+        cur.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+        copied = cur.rowcount
+        conn.commit()
+        cur.close()
+        partition_cache.pop(table, None)
+        logging.info(f"Partitioned {table} into {len(months)} monthly partitions ({copied} rows); "
+                     f"the original table is kept as {old}")
+        return True
+
+    except Exception as e:
+        logging.error(f"Error partitioning {table}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        raise
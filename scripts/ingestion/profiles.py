@@ -0,0 +1,163 @@
+import os
+
+# Folder paths shared by every report kind
+PROJECT_ROOT = os.getcwd()
+FOLDER_PATH = os.path.join(PROJECT_ROOT, "scripts/input/")
+PROCESSED_FOLDER = os.path.join(PROJECT_ROOT, "scripts/processed/")
+ERROR_FOLDER = os.path.join(PROJECT_ROOT, "scripts/errors/")
+DATA_FOLDER = os.path.join(PROJECT_ROOT, "scripts/data/")
+CACHE_FOLDER = os.path.join(PROJECT_ROOT, "scripts/cache/")
+ARCHIVE_FOLDER = os.getenv("REPORT_ARCHIVE_DIR", os.path.join(PROJECT_ROOT, "scripts/archive/"))
+
+# A report profile declares everything that differs between report kinds:
+# target tables, sheet selection, filename patterns and archive location.
+# The ingestion core (reader, parser, resolver, loader, archiver) only reads
+# these keys, so a fix in the core applies to every kind at once.
+#
+#   "layout_profiles": detected layouts (see detect.LAYOUTS) the profile imports
+#   "create_entities": create a missing provider/parking service and its contract
+#   "track_import_status": the entity table has the import status/file columns
+#   "service_key": what identifies a Service, the 4-digit "code" or the full "name"
+#   "conflict_columns": unique key of the transaction table besides the entity
+#   "price_vat_factor": amount = quantity * price / factor; None skips the amount check
+#   "group_column"/"group_values": column holding the group and its stored values
+#   "import_metadata": store file name, importing user and a description per row
+#   "contract_statuses": contract statuses services are linked under
+#   "monthly_partitions": --partition-tables converts the table when no --profile is given
+VAS_PROFILE = {
+    "name": "vas",
+    "label": "provider",
+    "entity_table": "Provider",
+    "entity_key": "providerId",
+    "transaction_table": "VasTransaction",
+    "store_service_code": True,
+    "touch_updated_at": True,
+    "service_type": "VAS",
+    "contract_type": "VAS",
+    "billing_type": "PREPAID",
+    # SDP report amounts are net of VAT
+    "price_vat_factor": 1.2,
+    # Sheets from index 3 (sheet 4) to the end of the workbook
+    "first_sheet": 3,
+    "last_sheet": None,
+    "name_patterns": [
+        r"Servis__MicropaymentMerchantReport_([A-Z]+)_Apps_\d+__\d+_\d+",
+        r"_mParking_([A-Za-z0-9]+)_\d+__\d+_",
+        r"Parking_([A-Za-z0-9]+)_\d{8}",
+    ],
+    "title_case_names": False,
+    "layout_profiles": ("vas",),
+    "create_entities": True,
+    "track_import_status": True,
+    "service_key": "code",
+    "conflict_columns": ("date", "serviceName", "group"),
+    "group_column": "group",
+    "group_values": None,
+    "import_metadata": False,
+    "contract_statuses": ("ACTIVE",),
+    "monthly_partitions": True,
+    # Where each group stream goes: "transactions" (upsert), "csv" or "none"
+    "group_sinks": {"prepaid": "transactions", "postpaid": "csv"},
+    "output_files": {
+        "prepaid": os.path.join(DATA_FOLDER, "vas_output.csv"),
+        "postpaid": os.path.join(DATA_FOLDER, "vas_postpaid_output.csv"),
+    },
+    "archive_root": "providers",
+}
+
+PARKING_PROFILE = {
+    "name": "parking",
+    "label": "parking service",
+    "entity_table": "ParkingService",
+    "entity_key": "parkingServiceId",
+    "transaction_table": "ParkingTransaction",
+    "store_service_code": False,
+    "touch_updated_at": False,
+    "service_type": "PARKING",
+    "contract_type": "PARKING",
+    "billing_type": "PREPAID",
+    # SDP report amounts are net of VAT
+    "price_vat_factor": 1.2,
+    # Only sheet index 3 (sheet 4)
+    "first_sheet": 3,
+    "last_sheet": 3,
+    "name_patterns": [
+        r"_mParking_(.+?)_\d+__\d+_",
+        r"Servis__MicropaymentMerchantReport_(.+?)__\d+_",
+        r"Parking_(.+?)_\d{8}",
+    ],
+    "title_case_names": True,
+    "layout_profiles": ("parking",),
+    "create_entities": True,
+    "track_import_status": True,
+    "service_key": "code",
+    "conflict_columns": ("date", "serviceName", "group"),
+    "group_column": "group",
+    "group_values": None,
+    "import_metadata": False,
+    "contract_statuses": ("ACTIVE",),
+    "monthly_partitions": True,
+    # Where each group stream goes: "transactions" (upsert), "csv" or "none"
+    "group_sinks": {"prepaid": "transactions", "postpaid": "csv"},
+    "output_files": {
+        "prepaid": os.path.join(DATA_FOLDER, "parking_output.csv"),
+        "postpaid": os.path.join(DATA_FOLDER, "parking_postpaid_output.csv"),
+    },
+    "archive_root": "parking-servis",
+}
+
+# Humanitarian organizations get the same SDP merchant report (prepaid data on
+# sheet 4) as VAS providers. Organizations and their contracts are maintained
+# by hand, so the import only looks them up; services are identified by their
+# full name and a transaction is unique per service name and price.
+HUMANITARIAN_PROFILE = {
+    "name": "humanitarian",
+    "label": "humanitarian organization",
+    "entity_table": "HumanitarianOrg",
+    "entity_key": "humanitarianOrgId",
+    "transaction_table": "HumanitarianTransaction",
+    "store_service_code": True,
+    "touch_updated_at": True,
+    "service_type": "HUMANITARIAN",
+    "contract_type": "HUMANITARIAN",
+    "billing_type": "PREPAID",
+    # Donation amounts are not quantity x price net of VAT, so they are not checked
+    "price_vat_factor": None,
+    # Only sheet index 3 (sheet 4)
+    "first_sheet": 3,
+    "last_sheet": 3,
+    "name_patterns": [
+        r"Servis__MicropaymentMerchantReport_(.+?)__\d+_",
+    ],
+    "title_case_names": False,
+    "layout_profiles": ("vas",),
+    "create_entities": False,
+    "track_import_status": False,
+    "service_key": "name",
+    "conflict_columns": ("date", "serviceName", "price"),
+    "group_column": "billingType",
+    "group_values": {"prepaid": "PREPAID", "postpaid": "POSTPAID"},
+    "import_metadata": True,
+    "contract_statuses": ("ACTIVE", "RENEWAL_IN_PROGRESS"),
+    "monthly_partitions": False,
+    # Where each group stream goes: "transactions" (upsert), "csv" or "none"
+    "group_sinks": {"prepaid": "transactions", "postpaid": "none"},
+    "output_files": {
+        "prepaid": os.path.join(DATA_FOLDER, "humanitarian_output.csv"),
+        "postpaid": os.path.join(DATA_FOLDER, "humanitarian_postpaid_output.csv"),
+    },
+    "archive_root": "humanitarian-orgs",
+}
+
+PROFILES = {
+    VAS_PROFILE["name"]: VAS_PROFILE,
+    PARKING_PROFILE["name"]: PARKING_PROFILE,
+    HUMANITARIAN_PROFILE["name"]: HUMANITARIAN_PROFILE,
+}
+
+def get_profile(name):
+    """Get report profile by name"""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown report profile: {name} (known: {', '.join(PROFILES)})")
@@ -0,0 +1,63 @@
+import sys
+import json
+import time
+import logging
+
+# With --progress the processors write one JSON object per line to stdout for
+# the web side to read incrementally, and the log goes to stderr:
+#
+#   {"event": "start", "files": 3}
+#   {"event": "file", "file": "x.xls", "index": 1, "total": 3, "profile": "parking"}
+#   {"event": "sheet", "file": "x.xls", "index": 1, "total": 2, "sheet": "...", "records": 182}
+#   {"event": "parsed", "file": "x.xls", "records": 189, "cached": true}
+#   {"event": "rows", "file": "x.xls", "group": "prepaid", "loaded": 500, "total": 87000}
+#   {"event": "file_done", "file": "x.xls", "status": "imported", "records": 189,
+#    "inserted": 150, "updated": 39, "errors": 0}
+#   {"event": "file_done", "file": "y.xls", "status": "already_imported", "records": 189,
+#    "inserted": 0, "updated": 0, "errors": 0, "imported_as": "y-2025-09-01.xls"}
+#   {"event": "summary", "files": 3, "imported": 2, "already_imported": 0, "failed": 1, "skipped": 0,
+#    "records": 410, "seconds": 2.4}
+#
+# "cached" is only present when the parse came from the parse cache.
+# "rows" events are sent at most every PROGRESS_INTERVAL seconds per group
+# (plus the final one), so the stream stays small however large the file.
+PROGRESS_INTERVAL = 0.5
+
+progress_stream = None
+context = {}
+last_sent = {}
+
+def set_progress(enabled):
+    """Send progress events to stdout and move the log handlers writing there to stderr"""
+    global progress_stream
+    progress_stream = sys.stdout if enabled else None
+    if enabled:
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
+
+def set_context(**fields):
+    """Fields added to every following event (e.g. the current file); None removes a field"""
+    for key, value in fields.items():
+        if value is None:
+            context.pop(key, None)
+        else:
+            context[key] = value
+
+def emit(event, **fields):
+    """Write one progress event, when progress output is on"""
+    if progress_stream is None:
+        return
+    progress_stream.write(json.dumps({"event": event, **context, **fields}, ensure_ascii=False, default=str) + "\n")
+    progress_stream.flush()
+
+def emit_rows(group, loaded, total):
+    """Report load progress of a group, throttled to one event per PROGRESS_INTERVAL except the last"""
+    if progress_stream is None:
+        return
+    key = (context.get("file"), group)
+    now = time.monotonic()
+    if loaded < total and now - last_sent.get(key, 0) < PROGRESS_INTERVAL:
+        return
+    last_sent[key] = now
+    emit("rows", group=group, loaded=loaded, total=total)
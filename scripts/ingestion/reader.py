@@ -0,0 +1,198 @@
+import os
+import sys
+import logging
+from datetime import date, datetime
+
+# Spreadsheet reader backends, tried in order per file extension. The first
+# backend that reads the file wins; import errors and read errors fall
+# through to the next one, and pandas is always the last resort.
+BACKEND_ORDER = {
+    ".xls": ["calamine", "xlrd", "pandas"],
+    ".xlsx": ["calamine", "openpyxl", "pandas"],
+}
+DEFAULT_BACKEND_ORDER = ["calamine", "pandas"]
+
+# Backend forced from the command line (--reader); None means pick by extension
+preferred_backend = None
+
+def set_reader_backend(name):
+    """Force a reader backend for every file ("auto" or None restores per-extension selection)"""
+    global preferred_backend
+    if name and name != "auto" and name not in READER_BACKENDS:
+        raise ValueError(f"Unknown reader backend: {name} (known: {', '.join(READER_BACKENDS)})")
+    preferred_backend = None if name == "auto" else name
+
+def backend_order(input_file, backend=None):
+    """Reader backends to try for a file, most preferred first"""
+    extension = os.path.splitext(input_file)[1].lower()
+    order = list(BACKEND_ORDER.get(extension, DEFAULT_BACKEND_ORDER))
+    forced = backend or preferred_backend
+    if forced:
+        order = [forced] + [name for name in order if name != forced]
+    return order
+
+def cell_text(value):
+    """Normalize a sniffed cell value to stripped text"""
+    if value is None:
+        return ""
+    return str(value).strip()
+
+def cell_value(value):
+    """Normalize a cell value the same way for every backend"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y")
+    if isinstance(value, date):
+        return value.strftime("%d.%m.%Y")
+    return value
+
+def repair_text(value):
+    """Undo UTF-16 text read as 8-bit characters.
+
+    The SDP .xls exports carry an inconsistent OLE2 header; calamine then
+    reads their UTF-16 strings byte by byte, leaving a NUL after every ASCII
+    character. Re-decoding the bytes gives the same text xlrd reads.
+    """
+    if isinstance(value, str) and "\x00" in value:
+        return value.encode("latin-1").decode("utf-16-le")
+    return value
+
+def read_calamine(input_file, select):
+    """Read sheets with the Rust-backed calamine reader"""
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(input_file)
+    for sheet_idx, sheet_name in select(workbook.sheet_names):
+        sheet = workbook.get_sheet_by_index(sheet_idx)
+        rows = [
+            [cell_value(repair_text(v)) for v in row]
+            for row in sheet.to_python(skip_empty_area=False)
+        ]
+        yield sheet_idx, sheet_name, rows
+
+def read_xlrd(input_file, select):
+    """Read legacy .xls sheets with xlrd, loading only the selected sheets"""
+    import xlrd
+
+    book = xlrd.open_workbook(input_file, on_demand=True, logfile=sys.stderr)
+    try:
+        for sheet_idx, sheet_name in select(book.sheet_names()):
+            sheet = book.sheet_by_index(sheet_idx)
+            rows = []
+            for r in range(sheet.nrows):
+                row = []
+                for cell in sheet.row(r):
+                    if cell.ctype == xlrd.XL_CELL_DATE:
+                        row.append(cell_value(xlrd.xldate.xldate_as_datetime(cell.value, book.datemode)))
+                    else:
+                        row.append(cell.value)
+                rows.append(row)
+            book.unload_sheet(sheet_idx)
+            yield sheet_idx, sheet_name, rows
+    finally:
+        book.release_resources()
+
+def read_openpyxl(input_file, select):
+    """Read .xlsx sheets with openpyxl in read-only mode"""
+    import openpyxl
+
+    book = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        for sheet_idx, sheet_name in select(list(book.sheetnames)):
+            sheet = book[sheet_name]
+            rows = [[cell_value(v) for v in row] for row in sheet.iter_rows(values_only=True)]
+            # Read-only sheets keep trailing empty rows; drop them like the other backends do
+            while rows and not any(v != "" for v in rows[-1]):
+                rows.pop()
+            yield sheet_idx, sheet_name, rows
+    finally:
+        book.close()
+
+def read_pandas(input_file, select):
+    """Read sheets with pandas' default engine"""
+    import pandas as pd
+
+    with pd.ExcelFile(input_file) as xls:
+        for sheet_idx, sheet_name in select(xls.sheet_names):
+            df = xls.parse(sheet_name=sheet_name, header=None)
+            rows = [[cell_value(v) for v in row] for row in df.fillna("").values.tolist()]
+            yield sheet_idx, sheet_name, rows
+
+READER_BACKENDS = {
+    "calamine": read_calamine,
+    "xlrd": read_xlrd,
+    "openpyxl": read_openpyxl,
+    "pandas": read_pandas,
+}
+
+def read_sheets(input_file, select, backend=None):
+    """Read the selected sheets of a workbook, falling back through the backends on failure.
+
+    Returns (backend name, [(sheet index, sheet name, rows), ...]); each
+    backend reads the whole selection before it counts as successful, so a
+    failure half way through never mixes rows from two backends.
+    """
+    errors = []
+    for name in backend_order(input_file, backend):
+        try:
+            sheets = list(READER_BACKENDS[name](input_file, select))
+            logging.debug(f"Read {os.path.basename(input_file)} with the {name} backend")
+            return name, sheets
+        except Exception as e:
+            logging.warning(f"Reader backend {name} failed for {os.path.basename(input_file)}: {e}")
+            errors.append(f"{name}: {e}")
+    raise Exception(f"No reader backend could read {input_file} ({'; '.join(errors)})")
+
+def select_sheets(profile, sheet_names):
+    """Select the sheets a report profile reads"""
+    first = profile["first_sheet"]
+    last = profile["last_sheet"]
+    stop = len(sheet_names) if last is None else min(last + 1, len(sheet_names))
+    return [(idx, sheet_names[idx]) for idx in range(first, stop)]
+
+def iter_sheet_rows(profile, input_file, backend=None):
+    """Yield (sheet index, sheet name, rows) for every sheet selected by the profile"""
+    _, sheets = read_sheets(input_file, lambda names: select_sheets(profile, names), backend)
+    for sheet_idx, sheet_name, rows in sheets:
+        logging.info(f"Processing sheet {sheet_idx + 1}: {sheet_name}")
+        yield sheet_idx, sheet_name, rows
+
+def sniff_workbook(input_file, sheet_indexes=(0,), max_rows=6):
+    """Read the sheet list and the first rows of a few sheets without loading the workbook.
+
+    Legacy .xls files are opened with xlrd on demand so only the requested
+    sheets are parsed; .xlsx files use openpyxl in read-only mode.
+    """
+    sniffed = {}
+    if input_file.lower().endswith(".xls"):
+        import xlrd
+        book = xlrd.open_workbook(input_file, on_demand=True, logfile=sys.stderr)
+        try:
+            sheet_names = book.sheet_names()
+            for idx in sheet_indexes:
+                if idx < len(sheet_names):
+                    sheet = book.sheet_by_index(idx)
+                    sniffed[idx] = [
+                        [cell_text(v) for v in sheet.row_values(r)]
+                        for r in range(min(max_rows, sheet.nrows))
+                    ]
+                    book.unload_sheet(idx)
+        finally:
+            book.release_resources()
+    else:
+        import openpyxl
+        book = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+        try:
+            sheet_names = list(book.sheetnames)
+            for idx in sheet_indexes:
+                if idx < len(sheet_names):
+                    sheet = book[sheet_names[idx]]
+                    sniffed[idx] = [
+                        [cell_text(v) for v in row]
+                        for row in sheet.iter_rows(max_row=max_rows, values_only=True)
+                    ]
+        finally:
+            book.close()
+
+    return sheet_names, sniffed
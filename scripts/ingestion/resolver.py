@@ -0,0 +1,311 @@
+import logging
+from datetime import datetime
+
+from .db import log_to_database
+
+# Service IDs are global (not per provider), so a resident process can keep
+# them across files and report kinds
+service_cache = {}
+
+def get_or_create_service(conn, service_code, service_type, billing_type='PREPAID'):
+    """Find or create the Service of a type by its name (the 4-digit code, or the full name)"""
+    cache_key = (service_code, service_type)
+    if cache_key in service_cache:
+        return service_cache[cache_key], False
+
+    try:
+        cur = conn.cursor()
+        created = False
+
+        cur.execute('SELECT "id" FROM "Service" WHERE "name" = %s AND "type" = %s', (service_code, service_type))
+        result = cur.fetchone()
+
+        if result:
+            service_id = result[0]
+            logging.info(f"Found existing service: {service_code} (ID: {service_id})")
+            cur.close()
+            service_cache[cache_key] = service_id
+            return service_id, created
+
+        created = True
+        cur.execute('''
+            INSERT INTO "Service" ("id", "name", "type", "billingType", "description", "isActive", "createdAt", "updatedAt")
+            VALUES (gen_random_uuid(), %s, %s, %s, %s, true, %s, %s)
+            RETURNING "id"
+        ''', (service_code, service_type, billing_type, f'Auto-created {service_type.lower()} service: {service_code}', datetime.now(), datetime.now()))
+
+        service_id = cur.fetchone()[0]
+        conn.commit()
+        logging.info(f"Created new service: {service_code} (ID: {service_id})")
+        cur.close()
+
+        service_cache[cache_key] = service_id
+        return service_id, created
+
+    except Exception as e:
+        logging.error(f"Error getting/creating service {service_code}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None, False
+
+def get_or_create_entity(conn, profile, name):
+    """Find or create the Provider/ParkingService a report belongs to"""
+    table = profile["entity_table"]
+    label = profile["label"]
+    try:
+        cur = conn.cursor()
+        created = False
+
+        cur.execute(f'SELECT "id" FROM "{table}" WHERE "name" = %s', (name,))
+        result = cur.fetchone()
+
+        if result:
+            entity_id = result[0]
+            logging.info(f"Found existing {label}: {name} (ID: {entity_id})")
+            cur.close()
+            return entity_id, created
+
+        created = True
+        cur.execute(f'''
+            INSERT INTO "{table}" ("id", "name", "isActive", "createdAt", "updatedAt")
+            VALUES (gen_random_uuid(), %s, true, %s, %s)
+            RETURNING "id"
+        ''', (name, datetime.now(), datetime.now()))
+
+        entity_id = cur.fetchone()[0]
+        conn.commit()
+        logging.info(f"Created new {label}: {name} (ID: {entity_id})")
+        cur.close()
+
+        return entity_id, created
+
+    except Exception as e:
+        logging.error(f"Error getting/creating {label} {name}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None, False
+
+def find_entity(conn, profile, key):
+    """Look up a provider/parking service/organization by ID or name (case-insensitive); returns (id, name)"""
+    table = profile["entity_table"]
+    try:
+        cur = conn.cursor()
+        cur.execute(f'''
+            SELECT "id", "name" FROM "{table}"
+            WHERE "id" = %s OR LOWER("name") = LOWER(%s)
+            ORDER BY ("id" = %s) DESC, ("name" = %s) DESC
+            LIMIT 1
+        ''', (key, key, key, key))
+        result = cur.fetchone()
+        cur.close()
+        if result:
+            logging.info(f"Found existing {profile['label']}: {result[1]} (ID: {result[0]})")
+            return result
+        logging.error(f"No {profile['label']} matches '{key}'")
+        return None, None
+
+    except Exception as e:
+        logging.error(f"Error looking up {profile['label']} {key}: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None, None
+
+def get_or_create_contract(conn, profile, entity_id, user_id):
+    """Create or get the active Contract for a Provider/ParkingService"""
+    entity_key = profile["entity_key"]
+    contract_type = profile["contract_type"]
+    label = profile["label"]
+    try:
+        cur = conn.cursor()
+        created = False
+
+        if not user_id:
+            logging.error("Cannot create contract without current user")
+            return None, created
+
+        cur.execute(f'''
+            SELECT "id" FROM "Contract"
+            WHERE "{entity_key}" = %s AND "type" = %s AND "status"::text = ANY(%s)
+            ORDER BY "createdAt" DESC
+        ''', (entity_id, contract_type, list(profile["contract_statuses"])))
+
+        result = cur.fetchone()
+        if result:
+            contract_id = result[0]
+            logging.info(f"Found existing contract for {label}: {contract_id}")
+            cur.close()
+            return contract_id, created
+
+        if not profile["create_entities"]:
+            logging.warning(f"No active contract for {label} {entity_id}; services are not linked")
+            cur.close()
+            return None, created
+
+        created = True
+        now = datetime.now()
+        cur.execute(f'''
+            INSERT INTO "Contract" (
+                "id", "name", "contractNumber", "type", "status", "startDate", "endDate",
+                "revenuePercentage", "{entity_key}", "createdAt", "updatedAt", "createdById"
+            )
+            VALUES (gen_random_uuid(), %s, %s, %s, 'ACTIVE', %s, %s, %s, %s, %s, %s, %s)
+            RETURNING "id"
+        ''', (
+            f'Auto-generated contract for {label}',
+            f'AUTO-{contract_type}-{entity_id[:8]}-{now.strftime("%Y%m%d")}',
+            contract_type,
+            now,
+            now.replace(year=now.year + 1),
+            10.0,
+            entity_id,
+            now,
+            now,
+            user_id
+        ))
+
+        contract_id = cur.fetchone()[0]
+        conn.commit()
+        logging.info(f"Created new contract: {contract_id}")
+        cur.close()
+
+        return contract_id, created
+
+    except Exception as e:
+        logging.error(f"Error creating contract: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None, False
+
+def get_or_create_service_contract(conn, service_id, contract_id):
+    """Create connection between Service and Contract"""
+    try:
+        cur = conn.cursor()
+        created = False
+
+        cur.execute('''
+            SELECT "id" FROM "ServiceContract"
+            WHERE "contractId" = %s AND "serviceId" = %s
+        ''', (contract_id, service_id))
+
+        result = cur.fetchone()
+        if result:
+            service_contract_id = result[0]
+            logging.info(f"ServiceContract already exists: {service_contract_id}")
+            cur.close()
+            return service_contract_id, created
+
+        created = True
+        cur.execute('''
+            INSERT INTO "ServiceContract" ("id", "contractId", "serviceId", "createdAt", "updatedAt")
+            VALUES (gen_random_uuid(), %s, %s, %s, %s)
+            RETURNING "id"
+        ''', (contract_id, service_id, datetime.now(), datetime.now()))
+
+        service_contract_id = cur.fetchone()[0]
+        conn.commit()
+        logging.info(f"Created ServiceContract: {service_contract_id}")
+        cur.close()
+
+        return service_contract_id, created
+
+    except Exception as e:
+        logging.error(f"Error creating service contract: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None, False
+
+def update_entity_file_info(conn, profile, entity_id, filename, file_path, file_size, import_status, user_id):
+    """Update Provider/ParkingService with file information"""
+    table = profile["entity_table"]
+    try:
+        cur = conn.cursor()
+
+        mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" if filename.endswith('.xlsx') else "application/vnd.ms-excel"
+
+        update_sql = f"""
+        UPDATE "{table}"
+        SET
+            "originalFileName" = %s,
+            "originalFilePath" = %s,
+            "fileSize" = %s,
+            "mimeType" = %s,
+            "lastImportDate" = %s,
+            "importedBy" = %s,
+            "importStatus" = %s,
+            "updatedAt" = %s
+        WHERE "id" = %s
+        """
+
+        cur.execute(update_sql, (
+            filename,
+            file_path,
+            file_size,
+            mime_type,
+            datetime.now(),
+            user_id,
+            import_status,
+            datetime.now(),
+            entity_id
+        ))
+
+        conn.commit()
+        logging.info(f"Updated {table} file info for: {entity_id}")
+        cur.close()
+
+    except Exception as e:
+        logging.error(f"Error updating {table} file info: {e}")
+        try:
+            conn.rollback()
+        except:
+            pass
+
+def resolve_services(conn, profile, entity_id, service_codes, user_id, billing_type=None):
+    """Resolve service codes to Service IDs and link them to the entity contract"""
+    service_id_mapping = {}
+    contract_id = None
+    contract_checked = False
+
+    for service_code in sorted(code for code in service_codes if code):
+        service_id, service_created = get_or_create_service(
+            conn, service_code, profile["service_type"], billing_type or profile["billing_type"]
+        )
+        if not service_id:
+            continue
+        service_id_mapping[service_code] = service_id
+
+        if service_created:
+            log_to_database(
+                conn,
+                entity_type="Service",
+                entity_id=service_id,
+                action="CREATE",
+                subject=f"Created service {service_code}",
+                user_id=user_id
+            )
+
+        if not contract_checked:
+            contract_id, _ = get_or_create_contract(conn, profile, entity_id, user_id)
+            contract_checked = True
+        if contract_id:
+            service_contract_id, sc_created = get_or_create_service_contract(conn, service_id, contract_id)
+            if sc_created:
+                log_to_database(
+                    conn,
+                    entity_type="ServiceContract",
+                    entity_id=service_contract_id,
+                    action="CREATE",
+                    subject=f"Created service contract for {service_code}",
+                    user_id=user_id
+                )
+
+    return service_id_mapping
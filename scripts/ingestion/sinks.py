@@ -0,0 +1,40 @@
+import logging
+
+from .loader import save_to_csv, import_records
+from .parser import TRANSACTION_GROUPS
+from .batch import record_count
+
+SINK_NAMES = ("transactions", "csv", "none")
+
+def group_sinks(profile, overrides=None):
+    """Sink name per group for a profile, with optional overrides (e.g. from the command line)"""
+    sinks = dict(profile["group_sinks"])
+    sinks.update({group: sink for group, sink in (overrides or {}).items() if sink})
+    for group in TRANSACTION_GROUPS:
+        sinks.setdefault(group, "none")
+        if sinks[group] not in SINK_NAMES:
+            raise ValueError(f"Unknown sink '{sinks[group]}' for {group} (known: {', '.join(SINK_NAMES)})")
+    return sinks
+
+def active_groups(sinks):
+    """Groups the parser has to collect for the given sinks"""
+    return tuple(group for group in TRANSACTION_GROUPS if sinks.get(group, "none") != "none")
+
+def load_stream(profile, group, batches, sink, checkpoint=None, source=None):
+    """Load one file's group stream into the transaction table when its sink asks for it"""
+    if sink != "transactions" or not record_count(batches):
+        return None
+
+    result = import_records(profile, batches, group, checkpoint, source)
+    logging.info(f"Data import of {group} records to {profile['transaction_table']} completed")
+    return result
+
+def deliver_stream(profile, group, batches, sink):
+    """Write one group stream (a list of record batches of every file) to its CSV output"""
+    count = record_count(batches)
+    if not count or sink == "none":
+        return
+
+    output_file = profile["output_files"][group]
+    save_to_csv(profile, batches, output_file)
+    logging.info(f"Saved {count} {group} records to {output_file}")
@@ -0,0 +1,237 @@
+import logging
+
+from .parser import SERVICE_CODE_PATTERN
+from .checkpoints import record_batch
+from .partitions import ensure_partitions, split_by_partition
+
+# The load stage (loader.import_records) talks to the database only through
+# a store:
+#
+#   prepare(profile, months)        get the table ready for rows of these YYYY-MM months
+#   upsert(profile, rows, now, source) -> [inserted?]  upsert sanitized rows
+#   record_batch(checkpoint, group, offset, total)      checkpoint progress, same transaction
+#   commit() / rollback() / close()
+#
+# "postgres" is the real database. "memory" keeps tables and checkpoint
+# offsets in dicts and honors the same unique keys and ON CONFLICT
+# semantics, so loads can be benchmarked and load-tested without PostgreSQL.
+#
+# The store covers the load stage only. Provider/service resolution
+# (resolver.py), checkpoint claiming and closing (checkpoints.py), audit
+# logging (db.log_to_database) and engine.run itself still use the pooled
+# psycopg2 connection directly, so a full import always needs PostgreSQL;
+# the memory backend serves loads driven without the engine, as bench_load
+# does. psycopg2 is only imported when a PostgresStore is used.
+
+def service_code_of(service_name):
+    """4-digit code in a service name, or None"""
+    match = SERVICE_CODE_PATTERN.search(service_name)
+    return match.group(1) if match else None
+
+def record_columns(profile):
+    """Transaction table columns written for a record, in record_values order ("id" comes first and is generated)"""
+    columns = [profile["entity_key"], "date", profile["group_column"], "serviceName",
+               "price", "quantity", "amount", "createdAt", "serviceId"]
+    if profile["store_service_code"]:
+        columns.append("serviceCode")
+    if profile["touch_updated_at"]:
+        columns.append("updatedAt")
+    if profile["import_metadata"]:
+        columns += ["description", "importedFileName", "importedById"]
+    return columns
+
+def update_columns(profile):
+    """Columns an upsert overwrites when the row already exists"""
+    columns = ["price", "quantity", "amount"]
+    if profile["touch_updated_at"]:
+        columns.append("updatedAt")
+    if profile["import_metadata"]:
+        columns += ["importedFileName", "importedById"]
+    return columns
+
+def build_upsert(profile, table=None):
+    """Build the upsert statement and row template for a profile's transaction table (or one of its partitions)"""
+    table = table or profile["transaction_table"]
+    columns = ['"id"'] + [f'"{c}"' for c in record_columns(profile)]
+    updates = [f'"{c}" = EXCLUDED."{c}"' for c in update_columns(profile)]
+
+    placeholders = ", ".join(["%s"] * (len(columns) - 1))
+    template = f"(gen_random_uuid(), {placeholders})"
+    conflict = ", ".join(f'"{c}"' for c in (profile["entity_key"],) + tuple(profile["conflict_columns"]))
+
+    upsert_sql = f"""
+    INSERT INTO "{table}" ({", ".join(columns)})
+    VALUES %s
+    ON CONFLICT ({conflict})
+    DO UPDATE SET {", ".join(updates)}
+    RETURNING (xmax = 0) AS inserted
+    """
+    return upsert_sql, template
+
+def record_values(profile, row, now, source=None):
+    """Values tuple for one sanitized row, in record_columns order.
+
+    source is the (file name, user ID) a profile with import metadata stores.
+    """
+    entity_id, service_id, date, group, service_code, price, quantity, amount = row
+    group_value = profile["group_values"][group] if profile["group_values"] else group
+    values = [entity_id, date, group_value, service_code, price, quantity, amount, now, service_id]
+    if profile["store_service_code"]:
+        # Name-keyed services still store the 4-digit code when their name has one
+        values.append(service_code_of(service_code) if profile["service_key"] == "name" else service_code)
+    if profile["touch_updated_at"]:
+        values.append(now)
+    if profile["import_metadata"]:
+        file_name, user_id = source or (None, None)
+        values += [f"{service_code} @ {price:g} RSD", file_name, user_id]
+    return tuple(values)
+
+def upsert_rows(cur, profile, rows, now, partitioned=False, statements=None, source=None):
+    """Upsert sanitized rows.
+
+    On a partitioned table every month's rows go straight into that month's
+    partition, so the conflict check only touches one month's index.
+    """
+    from psycopg2.extras import execute_values
+
+    statements = {} if statements is None else statements
+    results = []
+    for table, part in split_by_partition(profile, rows, partitioned):
+        if table not in statements:
+            statements[table] = build_upsert(profile, table)
+        upsert_sql, template = statements[table]
+        values = [record_values(profile, row, now, source) for row in part]
+        results.extend(execute_values(cur, upsert_sql, values, template=template, page_size=len(values), fetch=True))
+    return results
+
+class PostgresStore:
+    """Store backed by a pooled PostgreSQL connection"""
+
+    def __init__(self):
+        from .db import get_db_connection
+
+        self.conn = get_db_connection()
+        self.cur = self.conn.cursor()
+        self.partitioned = False
+        self.statements = {}
+
+    def prepare(self, profile, months):
+        self.partitioned = ensure_partitions(self.conn, profile, months)
+        self.statements = {}
+
+    def upsert(self, profile, rows, now, source=None):
+        results = upsert_rows(self.cur, profile, rows, now, self.partitioned, self.statements, source)
+        return [r[0] for r in results]
+
+    def record_batch(self, checkpoint, group, offset, total):
+        record_batch(self.cur, checkpoint, group, offset, total)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+        self.cur = self.conn.cursor()
+
+    def close(self):
+        from .db import return_db_connection
+
+        self.cur.close()
+        return_db_connection(self.conn)
+
+# Columns the real tables declare NOT NULL among those a load writes
+REQUIRED_COLUMNS = ("date", "serviceName", "price", "quantity", "amount", "serviceId")
+
+class MemoryStore:
+    """Store that keeps everything in dicts, with PostgreSQL's unique key and conflict behavior.
+
+    tables: {table: {unique key: {column: value}}}
+    checkpoints: {checkpoint id: (group, offset, total)}
+
+    Like ON CONFLICT DO UPDATE, an upsert that hits the same key twice fails
+    as a whole, and so does a row with a missing required value. Changes are
+    kept in an undo log until commit(), so rollback() restores the last
+    committed state.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.checkpoints = {}
+        self.undo = []
+
+    def prepare(self, profile, months):
+        self.tables.setdefault(profile["transaction_table"], {})
+
+    def key(self, profile, record):
+        return (record[profile["entity_key"]],) + tuple(record[c] for c in profile["conflict_columns"])
+
+    def upsert(self, profile, rows, now, source=None):
+        table = self.tables.setdefault(profile["transaction_table"], {})
+        columns = record_columns(profile)
+        updates = update_columns(profile)
+        required = (profile["entity_key"], profile["group_column"]) + REQUIRED_COLUMNS
+
+        records = [dict(zip(columns, record_values(profile, row, now, source))) for row in rows]
+        keys = [self.key(profile, record) for record in records]
+        if len(set(keys)) != len(keys):
+            raise ValueError("ON CONFLICT DO UPDATE command cannot affect row a second time")
+        for record in records:
+            missing = [c for c in required if record[c] is None]
+            if missing:
+                raise ValueError(f'null value in column "{missing[0]}" of relation "{profile["transaction_table"]}"')
+
+        results = []
+        for record, key in zip(records, keys):
+            old = table.get(key)
+            self.undo.append((table, key, old))
+            if old is None:
+                table[key] = record
+                results.append(True)
+            else:
+                table[key] = dict(old, **{c: record[c] for c in updates})
+                results.append(False)
+        return results
+
+    def record_batch(self, checkpoint, group, offset, total):
+        self.undo.append((self.checkpoints, checkpoint["id"], self.checkpoints.get(checkpoint["id"])))
+        self.checkpoints[checkpoint["id"]] = (group, offset, total)
+
+    def commit(self):
+        self.undo = []
+
+    def rollback(self):
+        for target, key, old in reversed(self.undo):
+            if old is None:
+                target.pop(key, None)
+            else:
+                target[key] = old
+        self.undo = []
+
+    def close(self):
+        self.rollback()
+
+STORAGE_BACKENDS = {
+    "postgres": PostgresStore,
+    "memory": MemoryStore,
+}
+
+storage_backend = "postgres"
+memory_store = None
+
+def set_storage_backend(name):
+    """Choose where the load stage writes for this process ("postgres" or "memory")"""
+    global storage_backend, memory_store
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name} (known: {', '.join(STORAGE_BACKENDS)})")
+    storage_backend = name
+    memory_store = None
+
+def open_store():
+    """Open a store on the current backend; the in-memory store lives as long as the process"""
+    global memory_store
+    if storage_backend == "memory":
+        if memory_store is None:
+            memory_store = MemoryStore()
+            logging.info("Loading into the in-memory store")
+        return memory_store
+    return PostgresStore()
@@ -0,0 +1,251 @@
+import os
+import json
+import logging
+from datetime import date
+
+import numpy as np
+
+from .parser import convert_date_format
+from .cache import INDEX_DTYPE
+
+# Amounts are rounded to two decimals per cell, so a sum of n cells may be
+# off by up to half a cent per cell
+CELL_ROUNDING = 0.005
+AMOUNT_TOLERANCE = 0.01
+
+# Severity per check. Errors reject the file before any database work;
+# warnings are reported and, with strict validation, reject it as well.
+# Duplicate conflict keys are only a warning by default: SDP reports list
+# the same service code at two prices (e.g. parking zones), and the loader
+# keeps the last row per key like sequential upserts always did.
+CHECKS = {
+    "header_dates": "error",
+    "amount_mismatch": "error",
+    "missing_amounts": "warning",
+    "total_column": "error",
+    "total_row": "error",
+    "duplicate_keys": "warning",
+}
+
+EXAMPLES = 3
+
+class ValidationError(Exception):
+    """A parsed report failed validation; carries the validation report"""
+
+    def __init__(self, report):
+        self.report = report
+        failed = ", ".join(f"{name} ({check['count']})" for name, check in report["checks"].items()
+                           if check["severity"] == "error")
+        super().__init__(f"Validation failed for {report['file']}: {failed}")
+
+def close(actual, expected, cells=1):
+    """Element-wise comparison allowing for the rounding of `cells` summed amounts"""
+    return np.abs(actual - expected) <= AMOUNT_TOLERANCE + CELL_ROUNDING * cells
+
+def header_date(value):
+    """ISO date for a header date, or None when it is not a real calendar date"""
+    iso = convert_date_format(value)
+    try:
+        return date.fromisoformat(iso).isoformat() if iso else None
+    except ValueError:
+        return None
+
+def as_array(values):
+    """Float array with None as NaN"""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+def batch_columns(batch):
+    """Zero-copy NumPy views of a batch's record columns"""
+    return (
+        np.frombuffer(batch.service_idx, dtype=INDEX_DTYPE) if len(batch) else np.empty(0, dtype=np.intp),
+        np.frombuffer(batch.date_idx, dtype=INDEX_DTYPE) if len(batch) else np.empty(0, dtype=np.intp),
+        np.frombuffer(batch.quantities, dtype=np.float64),
+        np.frombuffer(batch.amounts, dtype=np.float64),
+    )
+
+def check_header_dates(batch, examples):
+    """Header dates that records point at but that do not parse"""
+    iso = [header_date(d) for d in batch.dates]
+    bad = [j for j, d in enumerate(iso) if d is None]
+    if not bad or not len(batch):
+        return 0
+    _, date_idx, _, _ = batch_columns(batch)
+    hits = np.isin(date_idx, bad)
+    count = int(hits.sum())
+    if count:
+        examples.extend(f"{batch.sheet}: header date '{batch.dates[j]}'" for j in bad[:EXAMPLES])
+    return count
+
+def check_amounts(batch, examples, vat_factor):
+    """Records whose amount is not quantity x price net of VAT (amount = quantity * price / vat_factor)"""
+    service_idx, date_idx, quantities, amounts = batch_columns(batch)
+    if not len(batch):
+        return 0
+    prices = as_array(batch.prices)[service_idx]
+    expected = quantities * prices / vat_factor
+    bad = ~close(amounts, expected)
+    # Rows without a price or an amount cannot be checked; missing amounts are reported on their own
+    bad &= ~np.isnan(prices) & ~np.isnan(amounts)
+    for r in np.flatnonzero(bad)[:EXAMPLES]:
+        examples.append(
+            f"{batch.sheet}/{batch.group}: {batch.service_names[service_idx[r]]} {batch.dates[date_idx[r]]} "
+            f"{quantities[r]:g} x {prices[r]:g} -> {amounts[r]:g}, expected {expected[r]:.2f}"
+        )
+    return int(bad.sum())
+
+def check_missing_amounts(batch, examples):
+    """Records with a quantity but no amount; they are loaded with amount 0"""
+    service_idx, date_idx, quantities, amounts = batch_columns(batch)
+    missing = np.isnan(amounts)
+    for r in np.flatnonzero(missing)[:EXAMPLES]:
+        examples.append(
+            f"{batch.sheet}/{batch.group}: {batch.service_names[service_idx[r]]} {batch.dates[date_idx[r]]} "
+            f"quantity {quantities[r]:g} without an amount"
+        )
+    return int(missing.sum())
+
+def check_total_column(batch, examples):
+    """Service rows whose records do not add up to the row's TOTAL column"""
+    service_idx, _, quantities, amounts = batch_columns(batch)
+    services = len(batch.service_names)
+    declared_quantity = as_array(batch.total_quantities)
+    declared_amount = as_array(batch.total_amounts)
+    quantity_sum = np.bincount(service_idx, weights=quantities, minlength=services)
+    amount_sum = np.bincount(service_idx, weights=np.nan_to_num(amounts), minlength=services)
+
+    cells = len(batch.dates)
+    bad = (~np.isnan(declared_quantity) & ~close(quantity_sum, declared_quantity)) | \
+          (~np.isnan(declared_amount) & ~close(amount_sum, declared_amount, cells))
+    for s in np.flatnonzero(bad)[:EXAMPLES]:
+        examples.append(
+            f"{batch.sheet}/{batch.group}: {batch.service_names[s]} sums to {quantity_sum[s]:g} / {amount_sum[s]:.2f}, "
+            f"TOTAL column says {declared_quantity[s]:g} / {declared_amount[s]:.2f}"
+        )
+    return int(bad.sum())
+
+def check_total_row(sheet_batches, examples):
+    """Dates whose records over all groups do not add up to the sheet's TOTAL row"""
+    first = sheet_batches[0]
+    if not first.sheet_totals:
+        return 0
+    dates = len(first.dates)
+    declared_quantity = as_array(first.sheet_totals[0])[:dates]
+    declared_amount = as_array(first.sheet_totals[1])[:dates]
+    quantity_sum = np.zeros(dates)
+    amount_sum = np.zeros(dates)
+    for batch in sheet_batches:
+        _, date_idx, quantities, amounts = batch_columns(batch)
+        quantity_sum += np.bincount(date_idx, weights=quantities, minlength=dates)
+        amount_sum += np.bincount(date_idx, weights=np.nan_to_num(amounts), minlength=dates)
+
+    quantity_sum = quantity_sum[:len(declared_quantity)]
+    amount_sum = amount_sum[:len(declared_amount)]
+    bad = (~np.isnan(declared_quantity) & ~close(quantity_sum, declared_quantity))
+    cells = sum(len(batch.service_names) for batch in sheet_batches)
+    bad_amount = (~np.isnan(declared_amount) & ~close(amount_sum, declared_amount, cells))
+    size = min(len(bad), len(bad_amount))
+    bad = bad[:size] | bad_amount[:size]
+    for j in np.flatnonzero(bad)[:EXAMPLES]:
+        examples.append(
+            f"{first.sheet}: {first.dates[j]} sums to {quantity_sum[j]:g} / {amount_sum[j]:.2f}, "
+            f"TOTAL row says {declared_quantity[j]:g} / {declared_amount[j]:.2f}"
+        )
+    return int(bad.sum())
+
+def service_key(batch, s, columns):
+    """Conflict key values of a service row, for the conflict columns other than the date"""
+    values = {"serviceName": batch.service_codes[s], "price": batch.prices[s], "group": batch.group}
+    return tuple(values[column] for column in columns)
+
+def check_duplicates(batches, examples, conflict_columns):
+    """Records that share a conflict key (the profile's conflict columns) with another record of the group"""
+    columns = [column for column in conflict_columns if column != "date"]
+    key_ids = {}
+    date_ids = {}
+    keys = []
+    for batch in batches:
+        service_idx, date_idx, _, _ = batch_columns(batch)
+        if not len(batch):
+            continue
+        # Records without a service code never reach the database
+        services = np.array([
+            key_ids.setdefault(service_key(batch, s, columns), len(key_ids)) if code else -1
+            for s, code in enumerate(batch.service_codes)
+        ])
+        dates = np.array([date_ids.setdefault(convert_date_format(d), len(date_ids)) for d in batch.dates])
+        record_services = services[service_idx]
+        record_dates = dates[date_idx]
+        keep = record_services >= 0
+        keys.append(record_services[keep].astype(np.int64) * (1 << 32) + record_dates[keep])
+    if not keys:
+        return 0
+
+    unique, counts = np.unique(np.concatenate(keys), return_counts=True)
+    duplicated = counts > 1
+    if duplicated.any():
+        services = {v: k for k, v in key_ids.items()}
+        dates = {v: k for k, v in date_ids.items()}
+        for key, count in zip(unique[duplicated][:EXAMPLES], counts[duplicated][:EXAMPLES]):
+            service = " / ".join(f"{value:g}" if isinstance(value, float) else str(value)
+                                 for value in services[int(key >> 32)])
+            examples.append(f"service {service} on {dates[int(key & 0xFFFFFFFF)]}: {count} rows")
+    return int((counts[duplicated] - 1).sum())
+
+def validate_streams(profile, streams, filename):
+    """Validate parsed streams and return a compact report.
+
+    The report lists, per check, its severity, the number of offending
+    records/rows and a few examples; "ok" is False when an error check failed.
+    Amounts are only checked against quantity x price for profiles with a
+    "price_vat_factor".
+    """
+    vat_factor = profile["price_vat_factor"]
+    found = {name: [0, []] for name in CHECKS}
+    sheets = {}
+    for group, batches in streams.items():
+        for batch in batches:
+            sheets.setdefault(batch.sheet, []).append(batch)
+            for name, check in (("header_dates", check_header_dates),
+                                ("missing_amounts", check_missing_amounts),
+                                ("total_column", check_total_column)):
+                found[name][0] += check(batch, found[name][1])
+            if vat_factor:
+                found["amount_mismatch"][0] += check_amounts(batch, found["amount_mismatch"][1], vat_factor)
+        found["duplicate_keys"][0] += check_duplicates(batches, found["duplicate_keys"][1],
+                                                       profile["conflict_columns"])
+
+    # The TOTAL row covers prepaid and postpaid together, so it is only checked when both were parsed
+    if {"prepaid", "postpaid"} <= set(streams):
+        for sheet_batches in sheets.values():
+            found["total_row"][0] += check_total_row(sheet_batches, found["total_row"][1])
+
+    checks = {
+        name: {"severity": CHECKS[name], "count": count, "examples": examples[:EXAMPLES]}
+        for name, (count, examples) in found.items() if count
+    }
+    return {
+        "file": filename,
+        "records": sum(len(b) for batches in streams.values() for b in batches),
+        "ok": not any(check["severity"] == "error" for check in checks.values()),
+        "checks": checks,
+    }
+
+def enforce(report, strict=False):
+    """Log a validation report and raise ValidationError when it rejects the file"""
+    for name, check in report["checks"].items():
+        log = logging.error if check["severity"] == "error" else logging.warning
+        log(f"Validation {name}: {check['count']} in {report['file']}; e.g. {'; '.join(check['examples'])}")
+
+    if strict and report["checks"]:
+        for check in report["checks"].values():
+            check["severity"] = "error"
+        report["ok"] = False
+    if not report["ok"]:
+        raise ValidationError(report)
+
+def write_report(report, folder):
+    """Save a validation report as JSON next to the rejected file"""
+    path = os.path.join(folder, f"{report['file']}.validation.json")
+    with open(path, "w", encoding="utf-8") as fout:
+        json.dump(report, fout, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,21 @@
+"""Parsing of complaint e-mails (.eml and .msg) into normalized records.
+
+The parsers for both formats return the same ``MailRecord``; ``ingest``
+runs them over whole mail folders in a process pool and ``thread`` groups
+the parsed messages into conversations.
+"""
+
+from .record import MailRecord
+from .parse import MAIL_EXTENSIONS, parse_file
+from .ingest import list_mail_files, parse_files, main
+from .thread import thread_records
+
+__all__ = [
+    "MailRecord",
+    "MAIL_EXTENSIONS",
+    "parse_file",
+    "list_mail_files",
+    "parse_files",
+    "thread_records",
+    "main",
+]
@@ -0,0 +1,109 @@
+import os
+import re
+import json
+import logging
+
+# Message bodies are cleaned with two rule sets, each compiled into a single
+# case-insensitive regex:
+#
+#   "cut"  - lines where the quoted history, signature or disclaimer tail
+#            starts; the body ends at the first one (rules may span lines,
+#            e.g. an Outlook "From:" line followed by "Sent:")
+#   "drop" - single footer lines (links, addresses, separators) removed
+#            wherever they are
+#
+# Rules are regexes matched at the start of a line, after leading blanks.
+# A different rule set can be loaded from a JSON file with the same two keys
+# (--rules or MAIL_CLEAN_RULES). A body that is nothing but quoted history
+# keeps it.
+# Headers a mail client puts above the quoted message (thread.py uses them too)
+REPLY_HEADERS = [
+    r"-{3,}\s*(?:Original Message|Izvorna poruka|Originalna poruka)\s*-{3,}",
+    r"(?:From|Od|Šalje):[^\n]*\n[^\S\n]*(?:Sent|Sent date|Date|Poslato|Datum|To|Za):",
+    r"On [^\n]{1,200} wrote:\s*$",
+    r"[^\n]{1,200} (?:je )?napisao(?:/la|\(la\))?:\s*$",
+]
+
+DEFAULT_RULES = {
+    "cut": [
+        r"--\s*$",
+        *REPLY_HEADERS,
+        r"Poverljive informacije",
+        r"Skrećemo vam pažnju",
+        r"Sačuvajmo drveće",
+        r"Save a tree",
+    ],
+    "drop": [
+        r"\*{3,}",
+        r"_{10,}\s*$",
+        r"─────────────",
+        r"Adresa:",
+        r"• m:",
+        r"<?https?://",
+        r"<mailto:[^\n]*>",
+        r"Ako nije neophodno",
+        r"Najlakši način",
+    ],
+}
+
+CLEAN_RULES_PATH = os.getenv("MAIL_CLEAN_RULES")
+
+def load_rules(path):
+    """Rule set from a JSON file with "cut" and "drop" lists of regexes"""
+    with open(path, encoding="utf-8") as fin:
+        rules = json.load(fin)
+    unknown = set(rules) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"Unknown rule sets in {path}: {', '.join(sorted(unknown))}")
+    return {name: list(rules.get(name, [])) for name in DEFAULT_RULES}
+
+def combine(patterns, rest):
+    """One multiline regex matching any of the patterns at a line start, followed by rest"""
+    if not patterns:
+        return None
+    alternatives = "|".join(f"(?:{pattern})" for pattern in patterns)
+    return re.compile(rf"^[^\S\n]*(?:{alternatives}){rest}", re.IGNORECASE | re.MULTILINE)
+
+class BodyCleaner:
+    """Compiled cut and drop rules"""
+
+    def __init__(self, rules=None):
+        rules = rules or DEFAULT_RULES
+        self.cut = combine(rules.get("cut", []), "")
+        # The rest of a dropped line goes with it
+        self.drop = combine(rules.get("drop", []), r"[^\n]*")
+
+    def lines(self, text):
+        """Stripped non-empty lines of text that no drop rule matches"""
+        if self.drop is not None:
+            text = self.drop.sub("", text)
+        return [line for line in (line.strip() for line in text.splitlines()) if line]
+
+    def clean(self, text):
+        """Body up to the quoted/signature tail, without footer and empty lines"""
+        if not text:
+            return ""
+        match = self.cut.search(text) if self.cut is not None else None
+        lines = self.lines(text[:match.start()]) if match else []
+        if not lines:
+            lines = self.lines(text)
+        return "\n".join(lines)
+
+rules_path = None
+cleaner = BodyCleaner()
+
+def set_clean_rules(path):
+    """Clean bodies with the rules in a JSON file (None restores the default rules)"""
+    global rules_path, cleaner
+    cleaner = BodyCleaner(load_rules(path) if path else None)
+    rules_path = path
+
+if CLEAN_RULES_PATH:
+    try:
+        set_clean_rules(CLEAN_RULES_PATH)
+    except (OSError, ValueError, re.error) as e:
+        logging.error(f"Cannot load mail clean rules {CLEAN_RULES_PATH}: {e}")
+
+def clean_body(text):
+    """Body up to the quoted/signature tail, without footer, disclaimer and empty lines"""
+    return cleaner.clean(text)
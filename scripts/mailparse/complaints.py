@@ -0,0 +1,279 @@
+import io
+import csv
+import hashlib
+import logging
+import argparse
+from datetime import timedelta
+from email.utils import getaddresses
+
+from .index import INDEX_PATH, open_index, indexed_records
+from .thread import thread_records
+
+# Indexed mail becomes complaints in one transaction: each conversation is
+# one Complaint (its first message) and the replies are its Comments. The
+# messages are COPYed into a temporary table and everything after that is
+# set-based SQL:
+#
+#   - messages whose Message-ID is already on a Complaint or Comment are dropped
+#   - a conversation any of whose Message-IDs (including References) is
+#     already imported gets its new replies added to that complaint
+#   - the other conversations get a new complaint
+#
+# Senders are matched to a provider or humanitarian organization in memory,
+# by address, then domain, then display name, against tables loaded once.
+# Domains shared by many senders (webmail, our own) never match by domain.
+SHARED_DOMAINS = frozenset((
+    "gmail.com", "yahoo.com", "hotmail.com", "outlook.com", "live.com", "icloud.com",
+    "telekom.rs", "mts.rs",
+))
+
+# A reply without known Message-IDs joins a conversation by subject only if
+# it shares its sender and a recipient with it or is sent within this window
+SUBJECT_WINDOW = timedelta(days=7)
+
+STAGING_SQL = """
+CREATE TEMP TABLE "mail_import" (
+    "messageId" TEXT NOT NULL,
+    "threadKey" TEXT NOT NULL,
+    "position" INTEGER NOT NULL,
+    "title" TEXT,
+    "sender" TEXT,
+    "body" TEXT,
+    "sentAt" TIMESTAMPTZ,
+    "providerId" TEXT,
+    "humanitarianOrgId" TEXT
+) ON COMMIT DROP;
+CREATE TEMP TABLE "mail_thread_ids" (
+    "threadKey" TEXT NOT NULL,
+    "messageId" TEXT NOT NULL
+) ON COMMIT DROP;
+"""
+
+IMPORT_COLUMNS = ("messageId", "threadKey", "position", "title", "sender", "body", "sentAt",
+                  "providerId", "humanitarianOrgId")
+
+# Complaint description and comment text: "Od: sender" and the cleaned body
+MESSAGE_TEXT = """concat_ws(E'\\n\\n', 'Od: ' || i."sender", coalesce(i."body", ''))"""
+
+def address_parts(sender):
+    """(address, domain, display name) of a From header, lowercased"""
+    name, address = (getaddresses([sender or ""]) or [("", "")])[0]
+    address = address.lower()
+    domain = address.rpartition("@")[2] if "@" in address else ""
+    return address, domain, " ".join(name.split()).lower()
+
+class SenderMatcher:
+    """Provider / humanitarian organization of a sender, from in-memory lookups"""
+
+    def __init__(self, parties):
+        # parties: (kind, id, name, email) with kind "provider" or "humanitarian"
+        self.by_address = {}
+        self.by_domain = {}
+        self.by_name = {}
+        for kind, party_id, name, email in parties:
+            party = (kind, party_id)
+            if name:
+                self.by_name.setdefault(" ".join(name.split()).lower(), party)
+            for address in (email or "").replace(";", ",").split(","):
+                address = address.strip().lower()
+                if "@" not in address:
+                    continue
+                self.by_address.setdefault(address, party)
+                domain = address.rpartition("@")[2]
+                if domain not in SHARED_DOMAINS:
+                    self.by_domain.setdefault(domain, party)
+
+    def match(self, sender):
+        """(kind, id) of the party a sender belongs to, or None"""
+        address, domain, name = address_parts(sender)
+        return (self.by_address.get(address)
+                or (self.by_domain.get(domain) if domain not in SHARED_DOMAINS else None)
+                or self.by_name.get(name))
+
+def load_parties(cur):
+    """Active providers and humanitarian organizations as (kind, id, name, email)"""
+    cur.execute('SELECT \'provider\', "id", "name", "email" FROM "Provider" WHERE "isActive" IS NOT FALSE')
+    parties = cur.fetchall()
+    cur.execute('SELECT \'humanitarian\', "id", "name", "email" FROM "HumanitarianOrg" WHERE "isActive" IS NOT FALSE')
+    return parties + cur.fetchall()
+
+def message_key(record):
+    """Message-ID of a record, or a stable stand-in for a message without one"""
+    if record.message_id:
+        return record.message_id
+    digest = hashlib.sha256("\0".join(
+        value or "" for value in (record.sender, record.date, record.subject, record.body)
+    ).encode("utf-8")).hexdigest()
+    return f"<{digest[:40]}@email-import>"
+
+def staging_rows(conversations, matcher):
+    """Rows for mail_import and mail_thread_ids; copies of a message are kept once"""
+    messages = []
+    thread_ids = []
+    seen = set()
+    for members in conversations:
+        keys = [message_key(record) for record in members]
+        thread_key = keys[0]
+        party = next(filter(None, (matcher.match(record.sender) for record in members)), None)
+        provider_id = party[1] if party and party[0] == "provider" else None
+        humanitarian_id = party[1] if party and party[0] == "humanitarian" else None
+
+        ids = set()
+        for record, key in zip(members, keys):
+            ids.add(key)
+            ids.update(record.references)
+            if record.in_reply_to:
+                ids.add(record.in_reply_to)
+            if key in seen:
+                continue
+            seen.add(key)
+            messages.append((key, thread_key, len(messages), record.subject, record.sender, record.body,
+                             record.date, provider_id, humanitarian_id))
+        thread_ids.extend((thread_key, mid) for mid in ids)
+    return messages, thread_ids
+
+def copy_rows(cur, table, columns, rows):
+    """COPY rows into a table through an in-memory CSV buffer"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cur.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+def import_conversations(conn, conversations, user_id, matcher):
+    """Insert conversations as complaints and comments in one transaction; returns counts"""
+    messages, thread_ids = staging_rows(conversations, matcher)
+    counts = {"messages": len(messages), "duplicates": 0, "complaints": 0, "comments": 0}
+    if not messages:
+        return counts
+
+    cur = conn.cursor()
+    try:
+        cur.execute(STAGING_SQL)
+        copy_rows(cur, "mail_import", IMPORT_COLUMNS, messages)
+        copy_rows(cur, "mail_thread_ids", ("threadKey", "messageId"), thread_ids)
+        cur.execute('CREATE INDEX ON "mail_thread_ids" ("messageId")')
+        cur.execute('ANALYZE "mail_import"; ANALYZE "mail_thread_ids"')
+
+        # Messages imported before
+        cur.execute('''
+            DELETE FROM "mail_import" i
+            WHERE EXISTS (SELECT 1 FROM "Complaint" c WHERE c."emailMessageId" = i."messageId")
+               OR EXISTS (SELECT 1 FROM "Comment" cm WHERE cm."emailMessageId" = i."messageId")
+        ''')
+        counts["duplicates"] = cur.rowcount
+
+        # The complaint of each conversation: an existing one it refers to, else a new ID
+        cur.execute('''
+            CREATE TEMP TABLE "mail_thread" ON COMMIT DROP AS
+            SELECT k."threadKey", known."complaintId", known."complaintId" IS NULL AS "created"
+            FROM (SELECT DISTINCT "threadKey" FROM "mail_import") k
+            LEFT JOIN (
+                SELECT DISTINCT ON (t."threadKey") t."threadKey", coalesce(c."id", cm."complaintId") AS "complaintId"
+                FROM "mail_thread_ids" t
+                LEFT JOIN "Complaint" c ON c."emailMessageId" = t."messageId"
+                LEFT JOIN "Comment" cm ON cm."emailMessageId" = t."messageId"
+                WHERE c."id" IS NOT NULL OR cm."id" IS NOT NULL
+                ORDER BY t."threadKey", c."createdAt" NULLS LAST
+            ) known USING ("threadKey")
+        ''')
+        cur.execute('UPDATE "mail_thread" SET "complaintId" = gen_random_uuid()::text WHERE "created"')
+
+        cur.execute(f'''
+            INSERT INTO "Complaint" ("id", "title", "description", "providerId", "humanitarianOrgId",
+                                     "submittedById", "createdAt", "updatedAt", "emailMessageId")
+            SELECT DISTINCT ON (i."threadKey")
+                   t."complaintId", coalesce(nullif(i."title", ''), '(bez naslova)'), {MESSAGE_TEXT},
+                   i."providerId", i."humanitarianOrgId", %s,
+                   coalesce(i."sentAt" AT TIME ZONE 'UTC', now()), now(), i."messageId"
+            FROM "mail_import" i
+            JOIN "mail_thread" t USING ("threadKey")
+            WHERE t."created"
+            ORDER BY i."threadKey", i."position"
+        ''', (user_id,))
+        counts["complaints"] = cur.rowcount
+
+        cur.execute(f'''
+            INSERT INTO "Comment" ("id", "text", "complaintId", "userId", "createdAt", "updatedAt", "emailMessageId")
+            SELECT gen_random_uuid()::text, {MESSAGE_TEXT}, t."complaintId", %s,
+                   coalesce(i."sentAt" AT TIME ZONE 'UTC', now()), now(), i."messageId"
+            FROM "mail_import" i
+            JOIN "mail_thread" t USING ("threadKey")
+            WHERE NOT EXISTS (SELECT 1 FROM "Complaint" c WHERE c."emailMessageId" = i."messageId")
+        ''', (user_id,))
+        counts["comments"] = cur.rowcount
+    finally:
+        cur.close()
+    return counts
+
+def main(argv=None):
+    """Command line entry point: import indexed e-mails as complaints"""
+    from ingestion.db import (
+        init_db_pool, get_db_connection, return_db_connection, close_db_pool,
+        test_database_connection, set_current_user, get_current_user, log_to_database,
+    )
+
+    parser = argparse.ArgumentParser(description="Import indexed e-mails as complaints and comments (run email_ingest.py first)")
+    parser.add_argument("user_id", nargs="?", help="ID of the user the complaints are submitted by (default: system user)")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index of parsed messages (default: data/email-index.sqlite3)")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="only messages sent on or after this date (UTC)")
+    parser.add_argument("--until", metavar="YYYY-MM-DD", help="only messages sent before this date (UTC)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be imported and roll back")
+    args = parser.parse_args(argv)
+
+    index = open_index(args.index)
+    try:
+        records = [
+            record for record in indexed_records(index)
+            if (not args.since or (record.date or "") >= args.since)
+            and (not args.until or (record.date and record.date < args.until))
+        ]
+    finally:
+        index.close()
+    conversations = thread_records(records, subject_window=SUBJECT_WINDOW)
+    logging.info(f"{len(records)} messages in {len(conversations)} conversations")
+    if not conversations:
+        return 0
+
+    if not test_database_connection():
+        logging.error("Database connection failed. Exiting.")
+        return 1
+    if args.user_id:
+        set_current_user(args.user_id)
+    init_db_pool()
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            logging.error("No valid user ID available for the imported complaints")
+            return 1
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            matcher = SenderMatcher(load_parties(cur))
+            cur.close()
+            counts = import_conversations(conn, conversations, user_id, matcher)
+            if args.dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            logging.info(f"{'Would import' if args.dry_run else 'Imported'} {counts['complaints']} complaints and "
+                         f"{counts['comments']} comments; {counts['duplicates']} of {counts['messages']} messages "
+                         f"were already imported")
+            if not args.dry_run:
+                log_to_database(
+                    conn,
+                    entity_type="Complaint",
+                    entity_id="email-import",
+                    action="EMAIL_IMPORT",
+                    subject=f"Imported {counts['complaints']} complaints and {counts['comments']} comments from e-mail",
+                    user_id=user_id
+                )
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"E-mail import failed: {e}")
+            return 1
+        finally:
+            return_db_connection(conn)
+    finally:
+        close_db_pool()
+    return 0
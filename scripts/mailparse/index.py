@@ -0,0 +1,198 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+
+from .record import MailRecord
+from .parse import PARSER_VERSION
+
+# Parsed messages are kept in a SQLite index keyed by file path. A file
+# whose size and mtime are unchanged is not read at all; one whose stat
+# changed is hashed, and only parsed when its content is new. A copy of an
+# indexed file under another name takes the stored fields of the original.
+# Rows written by an older PARSER_VERSION are parsed again. Outputs are then
+# generated from the index, so a run over a growing archive costs O(new files).
+# An FTS5 table over subject, sender and body is kept in step by triggers;
+# see search.py for queries.
+INDEX_PATH = os.getenv("MAIL_INDEX_PATH", os.path.join(os.getcwd(), "data", "email-index.sqlite3"))
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS "messages" (
+    "path" TEXT PRIMARY KEY,
+    "size" INTEGER NOT NULL,
+    "mtime" INTEGER NOT NULL,
+    "digest" TEXT NOT NULL,
+    "parserVersion" INTEGER NOT NULL,
+    "source" TEXT,
+    "messageId" TEXT,
+    "inReplyTo" TEXT,
+    "references" TEXT,
+    "subject" TEXT,
+    "sender" TEXT,
+    "to" TEXT,
+    "cc" TEXT,
+    "date" TEXT,
+    "body" TEXT,
+    "attachments" TEXT,
+    "error" TEXT
+);
+CREATE INDEX IF NOT EXISTS "messages_digest" ON "messages" ("digest");
+CREATE INDEX IF NOT EXISTS "messages_date" ON "messages" ("date");
+CREATE INDEX IF NOT EXISTS "messages_message_id" ON "messages" ("messageId");
+"""
+
+# External-content full-text index: the text lives in "messages" only.
+# remove_diacritics folds š/č/ć/ž/đ, so "posta" also finds "pošta".
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS "messages_fts" USING fts5(
+    "subject", "sender", "body",
+    content='messages', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS "messages_fts_insert" AFTER INSERT ON "messages" BEGIN
+    INSERT INTO "messages_fts" ("rowid", "subject", "sender", "body")
+    VALUES (new."rowid", new."subject", new."sender", new."body");
+END;
+CREATE TRIGGER IF NOT EXISTS "messages_fts_delete" AFTER DELETE ON "messages" BEGIN
+    INSERT INTO "messages_fts" ("messages_fts", "rowid", "subject", "sender", "body")
+    VALUES ('delete', old."rowid", old."subject", old."sender", old."body");
+END;
+CREATE TRIGGER IF NOT EXISTS "messages_fts_update" AFTER UPDATE ON "messages" BEGIN
+    INSERT INTO "messages_fts" ("messages_fts", "rowid", "subject", "sender", "body")
+    VALUES ('delete', old."rowid", old."subject", old."sender", old."body");
+    INSERT INTO "messages_fts" ("rowid", "subject", "sender", "body")
+    VALUES (new."rowid", new."subject", new."sender", new."body");
+END;
+"""
+
+# Record fields after path and the index columns holding them
+RECORD_COLUMNS = (
+    ("source", "source"), ("message_id", "messageId"), ("in_reply_to", "inReplyTo"),
+    ("references", "references"), ("subject", "subject"), ("sender", "sender"), ("to", "to"),
+    ("cc", "cc"), ("date", "date"), ("body", "body"), ("attachments", "attachments"), ("error", "error"),
+)
+
+COMMIT_EVERY = 500
+
+def open_index(path=INDEX_PATH):
+    """Connection to the mail index, created on first use"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index = sqlite3.connect(path, timeout=30)
+    index.execute("PRAGMA journal_mode=WAL")
+    index.executescript(INDEX_SCHEMA)
+    has_fts = index.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).fetchone()
+    index.executescript(FTS_SCHEMA)
+    if not has_fts:
+        # Index created before full-text search: fill it from the stored rows
+        index.execute("""INSERT INTO "messages_fts" ("messages_fts") VALUES ('rebuild')""")
+        index.commit()
+    return index
+
+def content_digest(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fin:
+        for chunk in iter(lambda: fin.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def record_row(record):
+    """Index column values of a record, in RECORD_COLUMNS order"""
+    values = []
+    for field, _ in RECORD_COLUMNS:
+        value = getattr(record, field)
+        if field == "references":
+            value = " ".join(value)
+        elif field == "attachments":
+            value = json.dumps(list(value), ensure_ascii=False)
+        values.append(value)
+    return values
+
+def row_record(path, row):
+    """MailRecord from index column values in RECORD_COLUMNS order"""
+    fields = dict(zip((field for field, _ in RECORD_COLUMNS), row))
+    fields["references"] = (fields["references"] or "").split()
+    fields["attachments"] = json.loads(fields["attachments"] or "[]")
+    return MailRecord(path, fields.pop("source"), **fields)
+
+def store(index, path, stat, digest, values):
+    """Insert or update the index row of a file.
+
+    An upsert rather than INSERT OR REPLACE: the implicit delete of REPLACE
+    does not fire triggers, which would leave stale full-text entries.
+    """
+    names = ["size", "mtime", "digest", "parserVersion"] + [column for _, column in RECORD_COLUMNS]
+    columns = ", ".join(f'"{column}"' for column in names)
+    updates = ", ".join(f'"{column}" = excluded."{column}"' for column in names)
+    placeholders = ", ".join(["?"] * (1 + len(names)))
+    index.execute(
+        f'INSERT INTO "messages" ("path", {columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ("path") DO UPDATE SET {updates}',
+        [path, stat.st_size, stat.st_mtime_ns, digest, PARSER_VERSION] + list(values)
+    )
+
+def sync_index(index, files, parse, roots=()):
+    """Bring the index up to date with the given files.
+
+    parse(paths) yields a MailRecord per path (e.g. ingest.parse_files).
+    Rows of files under one of the roots (scanned folders) that are no
+    longer there are deleted. Returns counts of unchanged, copied, parsed
+    and pruned files.
+    """
+    known = {path: (size, mtime, digest, version) for path, size, mtime, digest, version
+             in index.execute('SELECT "path", "size", "mtime", "digest", "parserVersion" FROM "messages"')}
+    columns = ", ".join(f'"{column}"' for _, column in RECORD_COLUMNS)
+    counts = {"unchanged": 0, "copied": 0, "parsed": 0, "pruned": 0}
+    to_parse = {}
+
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logging.warning(f"Cannot read {path}: {e}")
+            continue
+        entry = known.get(path)
+        if entry and entry[3] == PARSER_VERSION and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            counts["unchanged"] += 1
+            continue
+
+        digest = content_digest(path)
+        same = index.execute(
+            f'SELECT {columns} FROM "messages" WHERE "digest" = ? AND "parserVersion" = ? LIMIT 1',
+            (digest, PARSER_VERSION)
+        ).fetchone()
+        if same:
+            # Same content already parsed (unchanged file touched, or a copy): reuse its fields
+            store(index, path, stat, digest, same)
+            counts["copied" if not entry or entry[2] != digest else "unchanged"] += 1
+        else:
+            to_parse[path] = (stat, digest)
+
+    for n, record in enumerate(parse(list(to_parse)), 1):
+        stat, digest = to_parse[record.path]
+        store(index, record.path, stat, digest, record_row(record))
+        counts["parsed"] += 1
+        if n % COMMIT_EVERY == 0:
+            index.commit()
+
+    present = set(files)
+    prefixes = tuple(os.path.join(root, "") for root in roots)
+    gone = [path for path in known if path not in present and prefixes and path.startswith(prefixes)]
+    index.executemany('DELETE FROM "messages" WHERE "path" = ?', [(path,) for path in gone])
+    counts["pruned"] = len(gone)
+
+    index.commit()
+    return counts
+
+def indexed_records(index, paths=None, order_by_date=True):
+    """MailRecords in the index (optionally only the given paths), oldest first by default"""
+    columns = ", ".join(f'"{column}"' for _, column in RECORD_COLUMNS)
+    order = 'ORDER BY "date" IS NULL DESC, "date", "path"' if order_by_date else ""
+    cursor = index.execute(f'SELECT "path", {columns} FROM "messages" WHERE "error" IS NULL {order}')
+    wanted = set(paths) if paths is not None else None
+    for row in cursor:
+        if wanted is None or row[0] in wanted:
+            yield row_record(row[0], row[1:])
@@ -0,0 +1,115 @@
+import os
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from . import clean
+from .parse import MAIL_EXTENSIONS, parse_file
+from .scan import scan_file
+from .output import OUTPUT_FORMATS, sort_by_date, write_records
+from .index import INDEX_PATH, open_index, sync_index, indexed_records
+
+# Where app/api/emails/upload/route.ts stores uploaded messages
+MAIL_FOLDER = os.path.join(os.getcwd(), "data", "emails")
+
+# Parsed records waiting to be written are bounded by the in-flight limit, so
+# a backlog of thousands of files never sits in memory at once
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+IN_FLIGHT_PER_WORKER = 4
+
+def list_mail_files(paths):
+    """.eml/.msg files among the given files and folders (folders are searched recursively)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.abspath(os.path.join(dirpath, name)) for name in filenames
+                             if name.lower().endswith(MAIL_EXTENSIONS))
+        elif path.lower().endswith(MAIL_EXTENSIONS):
+            files.append(os.path.abspath(path))
+        else:
+            logging.warning(f"Skipping {path}: not an .eml or .msg file")
+    return sorted(files)
+
+def parse_files(files, workers=DEFAULT_WORKERS, max_in_flight=None, parse=parse_file):
+    """Yield a MailRecord per file, in completion order.
+
+    With more than one worker the files are parsed in a process pool that
+    never has more than max_in_flight files submitted and not yet consumed.
+    parse is parse_file, or scan_file for headers only.
+    """
+    if workers <= 1 or len(files) <= 1:
+        for path in files:
+            yield parse(path)
+        return
+
+    max_in_flight = max_in_flight or workers * IN_FLIGHT_PER_WORKER
+    pending = set()
+    remaining = iter(files)
+    with ProcessPoolExecutor(max_workers=workers, initializer=clean.set_clean_rules,
+                             initargs=(clean.rules_path,)) as pool:
+        for path in remaining:
+            pending.add(pool.submit(parse, path))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def main(argv=None):
+    """Command line entry point of the mail ingester"""
+    parser = argparse.ArgumentParser(description="Parse .eml and .msg files into normalized records")
+    parser.add_argument("paths", nargs="*", help="files or folders to parse (default: data/emails/)")
+    parser.add_argument("--output", "-o", default="-", help="output file; '-' writes to stdout")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv", help="output format (default: csv)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parser processes (1 parses in this process)")
+    parser.add_argument("--max-in-flight", type=int, help="files submitted to the pool at once (default: 4 per worker)")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index of parsed messages (default: data/email-index.sqlite3)")
+    parser.add_argument("--no-index", action="store_true", help="parse every file again and write records in completion order")
+    parser.add_argument("--sort", action="store_true",
+                        help="with --no-index or --headers-only, order records by date (external sort, bounded memory)")
+    parser.add_argument("--headers-only", action="store_true",
+                        help="read only the headers (no body or attachments) for a quick listing; implies --no-index")
+    parser.add_argument("--rules", default=clean.CLEAN_RULES_PATH, help="JSON file of body cleaning rules (default: built-in rules)")
+    args = parser.parse_args(argv)
+
+    if args.rules:
+        clean.set_clean_rules(args.rules)
+
+    paths = args.paths or [MAIL_FOLDER]
+    files = list_mail_files(paths)
+    if not files:
+        logging.info("No .eml or .msg files found")
+        return 0
+
+    def parse(batch):
+        return parse_files(batch, args.workers, args.max_in_flight)
+
+    if args.headers_only or args.no_index:
+        if args.headers_only:
+            logging.info(f"Scanning headers of {len(files)} mail files")
+            records = parse_files(files, args.workers, args.max_in_flight, scan_file)
+        else:
+            logging.info(f"Parsing {len(files)} mail files with {args.workers} workers")
+            records = parse(files)
+        if args.sort:
+            records = sort_by_date(records)
+        written, failed = write_records(records, args.output, args.format)
+    else:
+        index = open_index(args.index)
+        try:
+            roots = [os.path.abspath(path) for path in paths if os.path.isdir(path)]
+            counts = sync_index(index, files, parse, roots)
+            logging.info(f"Index {args.index}: {counts['parsed']} parsed, {counts['unchanged']} unchanged, "
+                         f"{counts['copied']} copies, {counts['pruned']} removed")
+            written, _ = write_records(indexed_records(index, files), args.output, args.format)
+            present = set(files)
+            failed = sum(1 for (path,) in index.execute('SELECT "path" FROM "messages" WHERE "error" IS NOT NULL')
+                         if path in present)
+        finally:
+            index.close()
+    logging.info(f"Wrote {written} messages to {args.output}, {failed} files failed")
+    return 1 if failed and not written else 0
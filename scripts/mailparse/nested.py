@@ -0,0 +1,122 @@
+import logging
+from email import policy
+from email.parser import BytesParser
+
+from .clean import clean_body
+from .text import html_to_text
+
+# Forwarded complaints often arrive as a bundle: a message with others
+# attached (message/rfc822 parts, or .eml files attached as octet-stream),
+# which may carry attachments of their own. iter_messages walks the whole
+# tree depth-first with an explicit stack and yields each message as it is
+# reached; nothing is decoded until text() is called. Nesting deeper than
+# MAX_DEPTH is not followed, and once MAX_DECODED_BYTES of payload (counted
+# encoded, across the whole tree) have been decoded the rest is skipped.
+MAX_DEPTH = 10
+MAX_DECODED_BYTES = 50 * 1024 * 1024
+
+ATTACHED_MESSAGE_EXTENSIONS = (".eml",)
+
+class DecodeBudget:
+    """Payload bytes that may still be decoded for one tree"""
+
+    __slots__ = ("remaining", "exhausted")
+
+    def __init__(self, max_bytes=MAX_DECODED_BYTES):
+        self.remaining = max_bytes
+        self.exhausted = False
+
+    def take(self, part):
+        """Charge the encoded size of a part; False (and logged once) when over budget"""
+        size = len(part.get_payload() or "")
+        if size > self.remaining:
+            if not self.exhausted:
+                logging.warning("Nested message decode limit reached, skipping the remaining payloads")
+            self.exhausted = True
+            return False
+        self.remaining -= size
+        return True
+
+def own_parts(msg):
+    """Parts of a message, not descending into the messages attached to it"""
+    stack = [msg]
+    while stack:
+        part = stack.pop()
+        yield part
+        if part is not msg and part.get_content_type() == "message/rfc822":
+            continue
+        if part.is_multipart():
+            stack.extend(reversed(part.get_payload()))
+
+def is_attached_message_file(part):
+    """An .eml file attached as a plain attachment"""
+    filename = (part.get_filename() or "").lower()
+    return part.get_content_type() != "message/rfc822" and filename.endswith(ATTACHED_MESSAGE_EXTENSIONS)
+
+def is_attached_message(part):
+    """A message/rfc822 part or an attached .eml file"""
+    return part.get_content_type() == "message/rfc822" or is_attached_message_file(part)
+
+class NestedMessage:
+    """A message found in the tree; its body is decoded on demand"""
+
+    __slots__ = ("message", "depth", "position", "budget")
+
+    def __init__(self, message, depth, position, budget):
+        self.message = message
+        self.depth = depth
+        # Child indexes from the top message, e.g. (1, 0)
+        self.position = position
+        self.budget = budget
+
+    def text(self):
+        """Cleaned text body (the first text/plain part, else text/html), or None past the decode limit"""
+        html = None
+        for part in own_parts(self.message):
+            if part.is_multipart() or part.get_content_disposition() == "attachment":
+                continue
+            ctype = part.get_content_type()
+            if ctype == "text/plain" or (ctype == "text/html" and html is None):
+                if not self.budget.take(part):
+                    return None
+                if ctype == "text/plain":
+                    return clean_body(part.get_content())
+                html = part.get_content()
+        return clean_body(html_to_text(html)) if html else ""
+
+    def children(self):
+        """Messages attached directly to this one; attached .eml files are parsed as they are reached"""
+        n = 0
+        for part in own_parts(self.message):
+            if part is self.message or not is_attached_message(part):
+                continue
+            if part.get_content_type() == "message/rfc822":
+                payload = part.get_payload()
+                child = payload[0] if payload else None
+            else:
+                if not self.budget.take(part):
+                    return
+                child = BytesParser(policy=policy.default).parsebytes(part.get_payload(decode=True) or b"")
+            if child is not None:
+                yield NestedMessage(child, self.depth + 1, self.position + (n,), self.budget)
+                n += 1
+
+def iter_messages(msg, max_depth=MAX_DEPTH, max_bytes=MAX_DECODED_BYTES):
+    """Yield the message and every message attached inside it, depth-first.
+
+    Each level is a generator on the stack, so an attached message is only
+    parsed when the walk reaches it.
+    """
+    top = NestedMessage(msg, 0, (), DecodeBudget(max_bytes))
+    yield top
+    stack = [top.children()]
+    while stack:
+        nested = next(stack[-1], None)
+        if nested is None:
+            stack.pop()
+            continue
+        yield nested
+        if nested.depth < max_depth:
+            stack.append(nested.children())
+        elif any(is_attached_message(part) for part in own_parts(nested.message) if part is not nested.message):
+            logging.warning(f"Not following messages nested deeper than {max_depth} levels")
@@ -0,0 +1,95 @@
+import sys
+import csv
+import json
+import heapq
+import pickle
+import tempfile
+
+from .record import MailRecord
+
+# Records are written one at a time as they arrive, as CSV or JSON lines.
+# Sorting by date is an external merge sort: runs of SORT_RUN records are
+# sorted in memory and spilled to temporary files, which are then merged
+# lazily, so memory stays bounded by the run size for any mailbox.
+OUTPUT_FORMATS = ("csv", "jsonl")
+SORT_RUN = 10000
+
+def date_key(record):
+    """Sort key: undated records first, then by date (ISO 8601 in UTC) and path"""
+    return (record.date is not None, record.date or "", record.path or "")
+
+def spill(run, tmpdir):
+    """Write a sorted run of records to a temporary file, rewound for reading"""
+    fout = tempfile.TemporaryFile(dir=tmpdir)
+    for record in run:
+        pickle.dump(record, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    fout.seek(0)
+    return fout
+
+def read_run(fin):
+    """Records of a spilled run, in order"""
+    while True:
+        try:
+            yield pickle.load(fin)
+        except EOFError:
+            return
+
+def sort_by_date(records, run_size=SORT_RUN, tmpdir=None):
+    """Yield records ordered by date, holding at most run_size of them in memory"""
+    runs = []
+    run = []
+    try:
+        for record in records:
+            run.append(record)
+            if len(run) >= run_size:
+                run.sort(key=date_key)
+                runs.append(spill(run, tmpdir))
+                run = []
+        run.sort(key=date_key)
+        if not runs:
+            yield from run
+            return
+        if run:
+            runs.append(spill(run, tmpdir))
+            run = []
+        yield from heapq.merge(*(read_run(fin) for fin in runs), key=date_key)
+    finally:
+        for fin in runs:
+            fin.close()
+
+def record_values(record, fields):
+    """Output values of a record, tuple fields joined with spaces"""
+    return [" ".join(value) if isinstance(value, tuple) else value
+            for value in (getattr(record, field) for field in fields)]
+
+def write_records(records, output, fmt="csv", fields=MailRecord.FIELDS, header=None):
+    """Write records to a CSV or JSON lines file (or stdout for '-') as they arrive.
+
+    Records with an error are counted and skipped. header renames the
+    fields in the output. Returns (written, failed).
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {fmt} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    fout = sys.stdout if output == "-" else open(output, "w", newline="", encoding=encoding)
+    names = list(header or fields)
+    written = failed = 0
+    try:
+        if fmt == "csv":
+            writer = csv.writer(fout)
+            writer.writerow(names)
+        for record in records:
+            if record.error:
+                failed += 1
+                continue
+            if fmt == "csv":
+                writer.writerow(record_values(record, fields))
+            else:
+                values = (getattr(record, field) for field in fields)
+                row = dict(zip(names, (list(v) if isinstance(v, tuple) else v for v in values)))
+                fout.write(json.dumps(row, ensure_ascii=False) + "\n")
+            written += 1
+    finally:
+        if fout is not sys.stdout:
+            fout.close()
+    return written, failed
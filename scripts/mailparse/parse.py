@@ -0,0 +1,117 @@
+import os
+import re
+import logging
+from datetime import datetime, timezone
+from email import policy
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime
+
+from .record import MailRecord
+from .clean import clean_body
+from .text import html_to_text
+
+MAIL_EXTENSIONS = (".eml", ".msg")
+
+# Bump when parsing or cleaning changes what a record holds, so indexed
+# messages are parsed again
+PARSER_VERSION = 3
+
+# extract_msg logs every optional stream it does not find at INFO
+logging.getLogger("extract_msg").setLevel(logging.WARNING)
+
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+
+def message_ids(value):
+    """Message-IDs in a References/In-Reply-To header, in order"""
+    return MESSAGE_ID_PATTERN.findall(str(value)) if value else []
+
+def iso_date(value):
+    """ISO 8601 string of a Date header or datetime in UTC (so strings sort by time), or None"""
+    if not value:
+        return None
+    try:
+        date = value if isinstance(value, datetime) else parsedate_to_datetime(str(value))
+        if date.tzinfo:
+            date = date.astimezone(timezone.utc)
+        return date.isoformat()
+    except Exception:
+        return None
+
+def header_text(value):
+    """Decoded header text with folding whitespace collapsed"""
+    return " ".join(str(value).split()) if value else None
+
+def eml_body(msg):
+    """Plain text body of an e-mail: the first text/plain part, else the first text/html part as text"""
+    html = None
+    for part in msg.walk():
+        if part.is_multipart() or part.get_content_disposition() == "attachment":
+            continue
+        ctype = part.get_content_type()
+        if ctype == "text/plain":
+            return part.get_content()
+        if ctype == "text/html" and html is None:
+            html = part.get_content()
+    return html_to_text(html) if html else ""
+
+def parse_eml(path):
+    """Parse an RFC 822 .eml file"""
+    with open(path, "rb") as f:
+        msg = BytesParser(policy=policy.default).parse(f)
+
+    in_reply_to = message_ids(msg.get("In-Reply-To"))
+    return MailRecord(
+        path, "eml",
+        message_id=next(iter(message_ids(msg.get("Message-ID"))), None),
+        in_reply_to=in_reply_to[0] if in_reply_to else None,
+        references=message_ids(msg.get("References")),
+        subject=header_text(msg.get("Subject")),
+        sender=header_text(msg.get("From")),
+        to=header_text(msg.get("To")),
+        cc=header_text(msg.get("Cc")),
+        date=iso_date(msg.get("Date")),
+        body=clean_body(eml_body(msg)),
+        attachments=[part.get_filename() for part in msg.iter_attachments() if part.get_filename()],
+    )
+
+def parse_msg(path):
+    """Parse an Outlook .msg file"""
+    import extract_msg
+
+    msg = extract_msg.Message(path)
+    try:
+        header = msg.header
+        in_reply_to = message_ids(msg.inReplyTo or (header.get("In-Reply-To") if header else None))
+        body = msg.body
+        if not body and msg.htmlBody:
+            body = html_to_text(msg.htmlBody)
+        return MailRecord(
+            path, "msg",
+            message_id=next(iter(message_ids(msg.messageId)), None),
+            in_reply_to=in_reply_to[0] if in_reply_to else None,
+            references=message_ids(header.get("References") if header else None),
+            subject=header_text(msg.subject),
+            sender=header_text(msg.sender),
+            to=header_text(msg.to),
+            cc=header_text(msg.cc),
+            date=iso_date(msg.date),
+            body=clean_body(body),
+            attachments=[a.longFilename or a.shortFilename for a in msg.attachments
+                         if getattr(a, "longFilename", None) or getattr(a, "shortFilename", None)],
+        )
+    finally:
+        msg.close()
+
+PARSERS = {
+    ".eml": parse_eml,
+    ".msg": parse_msg,
+}
+
+def parse_file(path):
+    """Parse one .eml or .msg file; a file that fails comes back as a record with error set"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        return PARSERS[ext](path)
+    except Exception as e:
+        logging.error(f"Error parsing {os.path.basename(path)}: {e}")
+        return MailRecord(path, ext.lstrip("."), error=str(e))
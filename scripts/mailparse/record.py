@@ -0,0 +1,33 @@
+class MailRecord:
+    """One parsed message, the same for .eml and .msg sources.
+
+    Addresses are kept as the decoded header text; date is an ISO 8601
+    string (or None when the message has no usable date) so records pickle
+    cheaply between pool processes and serialize as they are.
+    """
+
+    __slots__ = (
+        "path", "source", "message_id", "in_reply_to", "references",
+        "subject", "sender", "to", "cc", "date", "body", "attachments", "error",
+    )
+
+    # Output columns, in order
+    FIELDS = __slots__
+
+    def __init__(self, path, source, **fields):
+        self.path = path
+        self.source = source
+        for name in self.__slots__[2:]:
+            setattr(self, name, fields.get(name))
+        self.references = tuple(self.references or ())
+        self.attachments = tuple(self.attachments or ())
+
+    def as_dict(self):
+        """Plain dict of the record, lists for the tuple fields"""
+        return {
+            name: list(value) if isinstance(value, tuple) else value
+            for name, value in ((name, getattr(self, name)) for name in self.FIELDS)
+        }
+
+    def __repr__(self):
+        return f"MailRecord({self.path!r}, subject={self.subject!r}, date={self.date!r})"
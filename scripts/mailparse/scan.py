@@ -0,0 +1,85 @@
+import os
+import logging
+from email import policy
+from email.parser import BytesParser
+
+from .record import MailRecord
+from .parse import message_ids, header_text, iso_date
+
+# Triage reads only the header block of an .eml file (up to the first empty
+# line) and parses it with headersonly=True, so listing or routing a batch
+# costs a few KB per message whatever the attachments weigh. Bodies and
+# attachments are left for parse_file when a message is actually opened;
+# scanned records have body None and no attachments.
+READ_CHUNK = 16 * 1024
+MAX_HEADER_BYTES = 1024 * 1024
+
+def read_header_block(path):
+    """Bytes of an .eml file up to and including the blank line ending its headers"""
+    block = b""
+    with open(path, "rb") as fin:
+        while len(block) < MAX_HEADER_BYTES:
+            chunk = fin.read(READ_CHUNK)
+            if not chunk:
+                break
+            # Look back over the chunk boundary for the terminator
+            start = max(0, len(block) - 3)
+            block += chunk
+            for terminator in (b"\r\n\r\n", b"\n\n"):
+                end = block.find(terminator, start)
+                if end >= 0:
+                    return block[:end + len(terminator)]
+    return block
+
+def record_headers(path, source, headers):
+    """MailRecord of the routing headers, without body and attachments"""
+    in_reply_to = message_ids(headers.get("In-Reply-To"))
+    return MailRecord(
+        path, source,
+        message_id=next(iter(message_ids(headers.get("Message-ID"))), None),
+        in_reply_to=in_reply_to[0] if in_reply_to else None,
+        references=message_ids(headers.get("References")),
+        subject=header_text(headers.get("Subject")),
+        sender=header_text(headers.get("From")),
+        to=header_text(headers.get("To")),
+        cc=header_text(headers.get("Cc")),
+        date=iso_date(headers.get("Date")),
+    )
+
+def scan_eml(path):
+    """Headers of an .eml file"""
+    headers = BytesParser(policy=policy.default).parsebytes(read_header_block(path), headersonly=True)
+    return record_headers(path, "eml", headers)
+
+def scan_msg(path):
+    """Headers of an Outlook .msg file; attachments are not loaded"""
+    import extract_msg
+
+    msg = extract_msg.Message(path, delayAttachments=True)
+    try:
+        header = msg.header
+        record = record_headers(path, "msg", header) if header else MailRecord(path, "msg")
+        # The MAPI properties are authoritative when the transport header is missing or partial
+        record.message_id = record.message_id or next(iter(message_ids(msg.messageId)), None)
+        record.subject = record.subject or header_text(msg.subject)
+        record.sender = record.sender or header_text(msg.sender)
+        record.to = record.to or header_text(msg.to)
+        record.cc = record.cc or header_text(msg.cc)
+        record.date = record.date or iso_date(msg.date)
+        return record
+    finally:
+        msg.close()
+
+SCANNERS = {
+    ".eml": scan_eml,
+    ".msg": scan_msg,
+}
+
+def scan_file(path):
+    """Headers of one .eml or .msg file; a file that fails comes back as a record with error set"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        return SCANNERS[ext](path)
+    except Exception as e:
+        logging.error(f"Error scanning {os.path.basename(path)}: {e}")
+        return MailRecord(path, ext.lstrip("."), error=str(e))
@@ -0,0 +1,70 @@
+import re
+import json
+import logging
+import argparse
+
+from .index import INDEX_PATH, open_index
+
+# Ranked lookups in the full-text index the ingester keeps (index.py).
+# Results are ordered by bm25 with a hit in the subject weighing most, then
+# the sender, then the body. Plain queries match every word (case and
+# diacritics ignored, the last word as a prefix); --raw passes FTS5 query
+# syntax (OR, NOT, "phrases", column:term) through.
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def fts_query(text):
+    """FTS5 query matching every word of plain text, the last one as a prefix"""
+    terms = TERM_PATTERN.findall(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search(index, query, limit=20, raw=False):
+    """Best matching indexed messages as dicts, best first"""
+    match = query if raw else fts_query(query)
+    if not match:
+        return []
+    weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+    cursor = index.execute(
+        f'''SELECT m."path", m."messageId", m."date", m."subject", m."sender",
+                   snippet("messages_fts", 2, '[', ']', '…', 12), bm25("messages_fts", {weights}) AS rank
+            FROM "messages_fts" JOIN "messages" m ON m."rowid" = "messages_fts"."rowid"
+            WHERE "messages_fts" MATCH ? AND m."error" IS NULL
+            ORDER BY rank LIMIT ?''',
+        (match, limit)
+    )
+    columns = ("path", "message_id", "date", "subject", "sender", "snippet", "rank")
+    return [dict(zip(columns, row)) for row in cursor]
+
+def main(argv=None):
+    """Command line entry point: search the mail index"""
+    parser = argparse.ArgumentParser(description="Full-text search over indexed e-mails (run email_ingest.py first)")
+    parser.add_argument("query", help="words to find in subject, sender or body")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index of parsed messages (default: data/email-index.sqlite3)")
+    parser.add_argument("--limit", type=int, default=20, help="number of results (default: 20)")
+    parser.add_argument("--raw", action="store_true", help="the query is FTS5 syntax")
+    parser.add_argument("--json", action="store_true", help="one JSON object per result")
+    args = parser.parse_args(argv)
+
+    index = open_index(args.index)
+    try:
+        results = search(index, args.query, args.limit, args.raw)
+    except Exception as e:
+        logging.error(f"Search failed: {e}")
+        return 1
+    finally:
+        index.close()
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        else:
+            print(f"{result['date'] or '-':<25} {(result['sender'] or '')[:40]:<40} {result['subject'] or ''}")
+            print(f"    {result['path']}")
+            print(f"    {' '.join((result['snippet'] or '').split())}")
+    logging.info(f"{len(results)} results for {args.query!r}")
+    return 0
@@ -0,0 +1,176 @@
+import re
+import codecs
+import logging
+from html.parser import HTMLParser
+
+# HTML bodies are turned into text in one streaming pass: the content of
+# script/style/title/xml elements is dropped, block elements start a new
+# line and whitespace (including &nbsp;) is collapsed as text arrives. Text
+# backends are tried in TEXT_BACKEND_ORDER; lxml walks the tree libxml2
+# builds in C, htmlparser is the pure-Python fallback.
+SKIP_TAGS = frozenset(("script", "style", "title", "xml", "template"))
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tbody", "thead",
+    "tfoot", "tr", "ul",
+))
+CELL_TAGS = frozenset(("td", "th"))
+
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+def decode_html(html):
+    """str of an HTML body; bytes are decoded by their meta charset, else as UTF-8"""
+    if isinstance(html, str):
+        return html
+    match = META_CHARSET.search(html[:4096])
+    encoding = "utf-8"
+    if match:
+        try:
+            encoding = codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return html.decode(encoding, errors="replace")
+
+class TextCollector:
+    """Accumulates text into lines, collapsing whitespace on the way"""
+
+    __slots__ = ("lines", "words", "space")
+
+    def __init__(self):
+        self.lines = []
+        self.words = []
+        self.space = False
+
+    def text(self, data):
+        if not data:
+            return
+        words = data.split()
+        if not words:
+            self.space = True
+            return
+        if self.words and (self.space or data[0].isspace()):
+            self.words.append(" ")
+        for i, word in enumerate(words):
+            if i:
+                self.words.append(" ")
+            self.words.append(word)
+        self.space = data[-1].isspace()
+
+    def gap(self):
+        """Separate table cells on the same line"""
+        self.space = True
+
+    def newline(self):
+        if self.words:
+            self.lines.append("".join(self.words))
+            self.words = []
+        self.space = False
+
+    def result(self):
+        self.newline()
+        return "\n".join(self.lines)
+
+def text_lxml(html):
+    """Text of an HTML document, walking the lxml tree"""
+    from lxml import etree
+
+    html = decode_html(html)
+    if html.lstrip().startswith("<?xml"):
+        # lxml refuses str input that declares an encoding
+        html = html[html.index("?>") + 2:]
+    root = etree.HTML(html)
+    out = TextCollector()
+    if root is None:
+        return ""
+
+    walker = etree.iterwalk(root, events=("start", "end", "comment", "pi"))
+    for event, element in walker:
+        if event in ("comment", "pi"):
+            out.text(element.tail)
+            continue
+        tag = element.tag.lower() if isinstance(element.tag, str) else ""
+        if event == "start":
+            if tag in SKIP_TAGS:
+                # The end event still comes, with the element's tail
+                walker.skip_subtree()
+                continue
+            if tag in BLOCK_TAGS:
+                out.newline()
+            elif tag in CELL_TAGS:
+                out.gap()
+            out.text(element.text)
+        else:
+            if tag in BLOCK_TAGS:
+                out.newline()
+            elif tag in CELL_TAGS:
+                out.gap()
+            out.text(element.tail)
+    return out.result()
+
+class TextParser(HTMLParser):
+    """html.parser handler feeding a TextCollector"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = TextCollector()
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.out.newline()
+        elif tag in CELL_TAGS:
+            self.out.gap()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.out.newline()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.out.newline()
+        elif tag in CELL_TAGS:
+            self.out.gap()
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.out.text(data)
+
+def text_htmlparser(html):
+    """Text of an HTML document with the standard library's streaming parser"""
+    parser = TextParser()
+    parser.feed(decode_html(html))
+    parser.close()
+    return parser.out.result()
+
+def text_bs4(html):
+    """BeautifulSoup html.parser get_text(), the previous implementation (kept for benchmarks)"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser").get_text()
+
+TEXT_BACKENDS = {
+    "lxml": text_lxml,
+    "htmlparser": text_htmlparser,
+    "bs4": text_bs4,
+}
+
+TEXT_BACKEND_ORDER = ["lxml", "htmlparser"]
+
+def html_to_text(html, backend=None):
+    """Visible text of an HTML body, one line per block, whitespace collapsed"""
+    if not html:
+        return ""
+    errors = []
+    for name in [backend] if backend else TEXT_BACKEND_ORDER:
+        try:
+            return TEXT_BACKENDS[name](html)
+        except ImportError as e:
+            errors.append(f"{name}: {e}")
+        except Exception as e:
+            logging.warning(f"HTML text backend {name} failed: {e}")
+            errors.append(f"{name}: {e}")
+    raise Exception(f"No HTML text backend could read the body ({'; '.join(errors)})")
@@ -0,0 +1,224 @@
+import re
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+from email.utils import getaddresses
+
+from .index import INDEX_PATH, open_index, indexed_records
+from .clean import REPLY_HEADERS, combine
+
+# Messages are grouped into conversations in one pass over the records:
+# every Message-ID a record names (its own, In-Reply-To, References) is
+# looked up in a hash index, and the threads found are merged (union-find).
+# A reply (a Re:/Fwd: subject, or In-Reply-To/References) none of whose IDs
+# is known joins the latest thread of its normalized subject; any other
+# message starts a conversation of its own, however generic its subject.
+# With a subject window (the complaint import) such a reply must also share
+# its sender and a recipient with the thread, or be sent within the window
+# of the thread's latest message; otherwise it starts a new conversation.
+# Quoted history repeated across replies is removed by hashing runs of
+# QUOTE_RUN consecutive non-blank lines; only quoted lines (a ">" marker, or
+# below a reply header) are removed, so a greeting or signature that every
+# message repeats stays. Threading and deduplication are O(total lines).
+QUOTE_RUN = 3
+
+SUBJECT_PREFIX = re.compile(
+    r"^(?:\s*(?:re|fw|fwd|aw|sv|wg|tr|odg|odgovor|prosledi|prosleđeno)\s*(?:\[\d+\])?\s*[:：])+",
+    re.IGNORECASE
+)
+# Subjects too generic to join unrelated messages on
+EMPTY_SUBJECTS = frozenset(("", "(no subject)", "no subject", "(bez naslova)", "bez naslova"))
+
+REPLY_HEADER = combine(REPLY_HEADERS, "")
+
+def normalize_subject(subject):
+    """Subject without reply/forward prefixes, lowercased with whitespace collapsed (None if generic)"""
+    if not subject:
+        return None
+    subject = " ".join(SUBJECT_PREFIX.sub("", subject).split()).lower()
+    return None if subject in EMPTY_SUBJECTS else subject
+
+def is_reply(record):
+    """Whether a message answers or forwards another: a prefixed subject, In-Reply-To or References"""
+    return bool(record.in_reply_to or record.references
+                or (record.subject and SUBJECT_PREFIX.match(record.subject)))
+
+def parse_date(value):
+    """Naive UTC datetime of a record's ISO date, or None"""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None) if value else None
+    except ValueError:
+        return None
+
+def participants(record):
+    """Lowercased sender address and set of recipient addresses of a record"""
+    sender = [address.lower() for _, address in getaddresses([record.sender or ""]) if address]
+    recipients = {address.lower() for _, address in getaddresses([record.to or "", record.cc or ""]) if address}
+    return (sender[0] if sender else None), recipients
+
+def thread_records(records, subject_window=None):
+    """Conversations among the records: lists of records, each in date order, oldest conversation first.
+
+    With subject_window (a timedelta), a reply joined only by its subject
+    must share its sender and a recipient with the thread, or be dated
+    within the window of the thread's latest message.
+    """
+    parent = []
+    people = []
+    latest = []
+    by_id = {}
+    by_subject = {}
+    placed = []
+
+    def find(thread):
+        while parent[thread] != thread:
+            parent[thread] = parent[parent[thread]]
+            thread = parent[thread]
+        return thread
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        # The older thread keeps its number
+        if a > b:
+            a, b = b, a
+        parent[b] = a
+        people[a] |= people[b]
+        latest[a] = max(filter(None, (latest[a], latest[b])), default=None)
+        return a
+
+    def related(thread, sender, recipients, date):
+        """Whether a reply matched only by subject may join the thread"""
+        if subject_window is None:
+            return True
+        if sender in people[thread] and recipients & people[thread]:
+            return True
+        return bool(date and latest[thread] and abs(date - latest[thread]) <= subject_window)
+
+    for record in records:
+        ids = [mid for mid in (*record.references, record.in_reply_to, record.message_id) if mid]
+        thread = None
+        for mid in ids:
+            known = by_id.get(mid)
+            if known is not None:
+                thread = known if thread is None else union(thread, known)
+        sender, recipients = participants(record)
+        date = parse_date(record.date)
+        subject = normalize_subject(record.subject)
+        if thread is None and subject in by_subject and is_reply(record):
+            thread = next((found for found in map(find, reversed(by_subject[subject]))
+                           if related(found, sender, recipients, date)), None)
+        if thread is None:
+            thread = len(parent)
+            parent.append(thread)
+            people.append(set())
+            latest.append(None)
+            if subject:
+                by_subject.setdefault(subject, []).append(thread)
+        thread = find(thread)
+        people[thread].update(recipients, filter(None, (sender,)))
+        latest[thread] = max(filter(None, (latest[thread], date)), default=None)
+        for mid in ids:
+            by_id[mid] = thread
+        placed.append((thread, record))
+
+    threads = {}
+    for thread, record in placed:
+        threads.setdefault(find(thread), []).append(record)
+    conversations = [sorted(members, key=lambda record: record.date or "") for members in threads.values()]
+    conversations.sort(key=lambda members: members[0].date or "")
+    return conversations
+
+def line_key(line):
+    """A body line compared without quote markers, case and spacing"""
+    return " ".join(line.lstrip(" >").split()).lower()
+
+def quoted_lines(body, lines):
+    """Per line, whether it is quoted: it has a ">" marker or comes after the first reply header"""
+    header = REPLY_HEADER.search(body) if REPLY_HEADER else None
+    first = body.count("\n", 0, header.start()) if header else len(lines)
+    return [i >= first or line.lstrip().startswith(">") for i, line in enumerate(lines)]
+
+def dedup_quoted(bodies):
+    """Bodies of a conversation in order, without quoted runs of QUOTE_RUN or more lines seen in an earlier body.
+
+    Runs are taken over non-blank lines, and a run is only removed when all
+    of its lines are quoted.
+    """
+    seen = set()
+    result = []
+    for body in bodies:
+        body = body or ""
+        lines = body.splitlines()
+        keys = [line_key(line) for line in lines]
+        quoted = quoted_lines(body, lines)
+        filled = [i for i, key in enumerate(keys) if key]
+        removed = [False] * len(lines)
+        runs = []
+        for j in range(len(filled) - QUOTE_RUN + 1):
+            run_lines = filled[j:j + QUOTE_RUN]
+            run = tuple(keys[i] for i in run_lines)
+            if run in seen and all(quoted[i] for i in run_lines):
+                for i in run_lines:
+                    removed[i] = True
+            runs.append(run)
+        seen.update(runs)
+        # Quoted blank lines go with the quoted text above them
+        previous = False
+        for i, key in enumerate(keys):
+            if key:
+                previous = removed[i]
+            elif quoted[i] and previous:
+                removed[i] = True
+        result.append("\n".join(line for line, dropped in zip(lines, removed) if not dropped))
+    return result
+
+def thread_dict(members):
+    """Compact JSON-ready form of a conversation"""
+    first = members[0]
+    senders = []
+    for record in members:
+        if record.sender and record.sender not in senders:
+            senders.append(record.sender)
+    return {
+        "thread": next((record.message_id for record in members if record.message_id), first.path),
+        "subject": first.subject,
+        "first": first.date,
+        "last": members[-1].date,
+        "count": len(members),
+        "senders": senders,
+        "messages": [
+            {"message_id": record.message_id, "date": record.date, "sender": record.sender,
+             "path": record.path, "body": body}
+            for record, body in zip(members, dedup_quoted(record.body for record in members))
+        ],
+    }
+
+def main(argv=None):
+    """Command line entry point: the conversations in the mail index as JSON lines"""
+    parser = argparse.ArgumentParser(description="Group indexed e-mails into conversations (run email_ingest.py first)")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index of parsed messages (default: data/email-index.sqlite3)")
+    parser.add_argument("--output", "-o", default="-", help="JSON lines output file; '-' writes to stdout")
+    parser.add_argument("--min-messages", type=int, default=1, help="only write conversations with at least this many messages")
+    args = parser.parse_args(argv)
+
+    index = open_index(args.index)
+    try:
+        conversations = thread_records(indexed_records(index))
+    finally:
+        index.close()
+
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    written = 0
+    try:
+        for members in conversations:
+            if len(members) < args.min_messages:
+                continue
+            fout.write(json.dumps(thread_dict(members), ensure_ascii=False) + "\n")
+            written += 1
+    finally:
+        if fout is not sys.stdout:
+            fout.close()
+    logging.info(f"Wrote {written} conversations from {sum(len(members) for members in conversations)} messages to {args.output}")
+    return 0
@@ -1,10 +1,10 @@
-//scripts/parsemail.py
-
+import sys
 import email
 from email.header import decode_header
-from bs4 import BeautifulSoup
 import re
 
+from mailparse.text import html_to_text
+
 def decode_header_value(value):
     decoded_parts = decode_header(value)
     decoded_str = ''.join([part.decode(encoding if encoding else 'utf-8') if isinstance(part, bytes) else part for part, encoding in decoded_parts])
@@ -27,6 +27,7 @@ def parse_email(raw_email):
     email_date = msg.get('Date')
 
     body = ""
+    is_html = False
     
     if msg.is_multipart():
         print("This email is multipart.")
@@ -38,18 +39,20 @@ def parse_email(raw_email):
             # Look for text/plain or text/html parts
             if 'text/plain' in content_type:
                 body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+                is_html = False
                 break
             elif 'text/html' in content_type and not body:
                 body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+                is_html = True
     
     else:
         # If not multipart, just get the plain text body
         body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
+        is_html = msg.get_content_type() == 'text/html'
 
-    # If body is HTML, clean it and get the text
-    if body:
-        soup = BeautifulSoup(body, 'html.parser')
-        body = soup.get_text()
+    # Only a real text/html part goes through HTML-to-text extraction
+    if body and is_html:
+        body = html_to_text(body)
 
     # Clean up body by removing unnecessary spaces
     body = clean_body(body)
@@ -72,7 +75,7 @@ def process_email_file(file_path):
     print("Date:", email_date)
     print("Body:", body)
 
-# Provide the path to your email file
-email_file_path = 'E:/xampp-8-telekom/htdocs/fin-app-hub/data/emails/nekifajl.eml'  # Update this with your file path
+# Provide the path to your email file (or pass it as the first argument)
+email_file_path = sys.argv[1] if len(sys.argv) > 1 else 'E:/xampp-8-telekom/htdocs/fin-app-hub/data/emails/nekifajl.eml'  # Update this with your file path
 
 process_email_file(email_file_path)
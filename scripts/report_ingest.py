@@ -0,0 +1,18 @@
+import sys
+import logging
+
+from ingestion import main
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+
+# One process for every report kind: each file in scripts/input/ is routed
+# to its report profile (use --profile to force one)
+if __name__ == "__main__":
+    sys.exit(main())